@@ -35,11 +35,15 @@ class InstallationLogger(Plugin):
         config_dir = self.get_config_dir()
         self.log_file = config_dir / "installation_log.txt"
 
+        # Keep one handle open instead of reopening per event. It is line
+        # buffered so each event reaches the file as soon as it is logged;
+        # the CLI exits without unloading plugins
+        self._log = open(self.log_file, 'a', buffering=1)
+
         # Write header
-        with open(self.log_file, 'a') as f:
-            f.write(f"\n{'='*60}\n")
-            f.write(f"Installation Logger Plugin Started\n")
-            f.write(f"{'='*60}\n\n")
+        self._log.write(f"\n{'='*60}\n")
+        self._log.write(f"Installation Logger Plugin Started\n")
+        self._log.write(f"{'='*60}\n\n")
 
         # Register event handlers
         self.register_handler(EventType.INSTALL_STARTED, self.on_install_started)
@@ -53,10 +57,10 @@ class InstallationLogger(Plugin):
     async def on_unload(self):
         """Called when plugin is unloaded"""
         if self.log_file:
-            with open(self.log_file, 'a') as f:
-                f.write(f"\n{'='*60}\n")
-                f.write(f"Installation Logger Plugin Stopped\n")
-                f.write(f"{'='*60}\n\n")
+            self._log.write(f"\n{'='*60}\n")
+            self._log.write(f"Installation Logger Plugin Stopped\n")
+            self._log.write(f"{'='*60}\n\n")
+            self._log.close()
 
         self.log_info("Plugin unloaded")
 
@@ -65,8 +69,7 @@ class InstallationLogger(Plugin):
         app_name = event.data.get('app', 'Unknown')
         timestamp = event.timestamp
 
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{timestamp}] 🚀 STARTED: {app_name}\n")
+        self._log.write(f"[{timestamp}] 🚀 STARTED: {app_name}\n")
 
         self.log_debug(f"Logged install start: {app_name}")
 
@@ -75,8 +78,7 @@ class InstallationLogger(Plugin):
         app_name = event.data.get('app', 'Unknown')
         timestamp = event.timestamp
 
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{timestamp}] ✅ COMPLETED: {app_name}\n")
+        self._log.write(f"[{timestamp}] ✅ COMPLETED: {app_name}\n")
 
         self.log_debug(f"Logged install completion: {app_name}")
 
@@ -86,8 +88,7 @@ class InstallationLogger(Plugin):
         error = event.data.get('error', 'Unknown error')
         timestamp = event.timestamp
 
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{timestamp}] ❌ FAILED: {app_name} - {error}\n")
+        self._log.write(f"[{timestamp}] ❌ FAILED: {app_name} - {error}\n")
 
         self.log_debug(f"Logged install failure: {app_name}")
 
@@ -96,13 +97,11 @@ class InstallationLogger(Plugin):
         app_name = event.data.get('app', 'Unknown')
         timestamp = event.timestamp
 
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{timestamp}] 📥 DOWNLOAD STARTED: {app_name}\n")
+        self._log.write(f"[{timestamp}] 📥 DOWNLOAD STARTED: {app_name}\n")
 
     async def on_download_completed(self, event: Event):
         """Log when download completes"""
         app_name = event.data.get('app', 'Unknown')
         timestamp = event.timestamp
 
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{timestamp}] 📦 DOWNLOAD COMPLETED: {app_name}\n")
+        self._log.write(f"[{timestamp}] 📦 DOWNLOAD COMPLETED: {app_name}\n")
@@ -8,6 +8,7 @@ from .platform_detection import (
     PlatformType,
     Architecture,
     get_platform,
+    invalidate_platform_cache,
     is_wsl,
     is_wsl2,
     is_macos,
@@ -45,6 +46,7 @@ __all__ = [
     'PlatformType',
     'Architecture',
     'get_platform',
+    'invalidate_platform_cache',
     'is_wsl',
     'is_wsl2',
     'is_macos',
@@ -14,6 +14,7 @@ class Config:
     Default configuration:
     - parallel_install: false
     - auto_rollback: true
+    - max_snapshots: 50
     - cloud_sync_enabled: true
     - event_history_limit: 100
     - plugin_auto_load: true
@@ -22,6 +23,7 @@ class Config:
     DEFAULT_CONFIG = {
         'parallel_install': False,
         'auto_rollback': True,
+        'max_snapshots': 50,
         'cloud_sync_enabled': True,
         'event_history_limit': 100,
         'plugin_auto_load': True,
@@ -96,6 +98,9 @@ parallel_install: false
 # Automatically create rollback points before installations
 auto_rollback: true
 
+# Maximum number of rollback snapshots to keep (oldest are dropped)
+max_snapshots: 50
+
 # Enable cloud synchronization
 cloud_sync_enabled: true
 
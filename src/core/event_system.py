@@ -60,6 +60,7 @@ class EventType(Enum):
 
     # Plugin Events
     PLUGIN_LOADED = "plugin.loaded"
+    PLUGINS_LOADED = "plugins.loaded"  # Batch from load_all_plugins
     PLUGIN_UNLOADED = "plugin.unloaded"
     PLUGIN_ERROR = "plugin.error"
 
@@ -132,19 +133,25 @@ class EventBus:
 
     def off(self, event_type: EventType, handler: Callable):
         """Unregister event handler"""
+        self.off_many(event_type, [handler])
+
+    def off_many(self, event_type: EventType, handlers: List[Callable]):
+        """Unregister several handlers for one event type in a single pass"""
+        removed = set(handlers)
+
         # Remove from sync listeners
         if event_type in self._sync_listeners:
             self._sync_listeners[event_type] = [
-                (p, h) for p, h in self._sync_listeners[event_type] if h != handler
+                (p, h) for p, h in self._sync_listeners[event_type] if h not in removed
             ]
 
         # Remove from async listeners
         if event_type in self._async_listeners:
             self._async_listeners[event_type] = [
-                (p, h) for p, h in self._async_listeners[event_type] if h != handler
+                (p, h) for p, h in self._async_listeners[event_type] if h not in removed
             ]
 
-        logger.debug(f"Unregistered handler for {event_type.value}")
+        logger.debug(f"Unregistered {len(removed)} handler(s) for {event_type.value}")
 
     async def emit(self, event: Event):
         """
@@ -3,10 +3,18 @@ Installation History Tracker for Koala's Forge
 Tracks all package installation, update, and uninstall operations
 """
 
-import json
+import mmap
+import threading
+from array import array
+from operator import attrgetter
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
+
+from . import json_utils
+
+# Resolved once at import; the home directory doesn't move at runtime
+_HISTORY_DIR = Path.home() / '.koalas-forge' / 'history'
 
 
 class HistoryEntry:
@@ -23,6 +31,14 @@ class HistoryEntry:
         self.timestamp = timestamp or datetime.now().isoformat()
         self.success = success
         self.details = details or {}
+        self._ts: Optional[datetime] = None
+
+    @property
+    def ts(self) -> datetime:
+        """Timestamp as a datetime, parsed once on first access"""
+        if self._ts is None:
+            self._ts = datetime.fromisoformat(self.timestamp)
+        return self._ts
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -50,10 +66,19 @@ class InstallHistory:
     """Manages installation history"""
 
     def __init__(self):
-        self.history_dir = Path.home() / '.koalas-forge' / 'history'
-        self.history_file = self.history_dir / 'install_history.json'
+        self.history_dir = _HISTORY_DIR
+        self.history_file = self.history_dir / 'install_history.jsonl'
+        self.legacy_history_file = self.history_dir / 'install_history.json'
         self._ensure_history_dir()
         self._entries: List[HistoryEntry] = []
+
+        # Column store for the hot fields, kept parallel to self._entries so
+        # analytical scans don't have to walk whole HistoryEntry objects
+        self._packages: List[str] = []
+        self._actions: List[str] = []
+        self._timestamps: List[str] = []
+        self._success = array('B')
+
         self._load_history()
 
     def _ensure_history_dir(self):
@@ -62,31 +87,83 @@ class InstallHistory:
 
     def _load_history(self):
         """Load history from file"""
+        self._entries = []
+
         if self.history_file.exists():
             try:
-                with open(self.history_file, 'r') as f:
-                    data = json.load(f)
-                    self._entries = [
-                        HistoryEntry.from_dict(entry)
-                        for entry in data.get('entries', [])
-                    ]
+                self._entries = self._read_entries()
             except Exception as e:
                 print(f"Warning: Could not load history: {e}")
                 self._entries = []
-        else:
-            self._entries = []
+        elif self.legacy_history_file.exists():
+            # Migrate the old single-document format to JSON Lines
+            try:
+                with open(self.legacy_history_file, 'rb') as f:
+                    data = json_utils.loads(f.read())
+                self._entries = [
+                    HistoryEntry.from_dict(entry)
+                    for entry in data.get('entries', [])
+                ]
+                self._save_history()
+                self.legacy_history_file.unlink()
+            except Exception as e:
+                print(f"Warning: Could not load history: {e}")
+                self._entries = []
+
+        self._rebuild_columns()
+
+    def _read_entries(self) -> List[HistoryEntry]:
+        """Read entries from the JSON Lines history file"""
+        entries = []
+
+        with open(self.history_file, 'rb') as f:
+            try:
+                # Map the file rather than reading it into one big buffer;
+                # pages are faulted in as lines are scanned
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return entries  # Empty file
+
+            with mm:
+                for line in iter(mm.readline, b''):
+                    if not line.strip():
+                        continue
+                    try:
+                        entries.append(HistoryEntry.from_dict(json_utils.loads(line)))
+                    except Exception:
+                        continue  # Skip a torn or corrupt line
+
+        return entries
+
+    def _rebuild_columns(self):
+        """Rebuild the column arrays from the entry list"""
+        self._packages = [e.package for e in self._entries]
+        self._actions = [e.action for e in self._entries]
+        self._timestamps = [e.timestamp for e in self._entries]
+        self._success = array('B', (1 if e.success else 0 for e in self._entries))
+
+    def _append_columns(self, entry: HistoryEntry):
+        """Append a single entry to the column arrays"""
+        self._packages.append(entry.package)
+        self._actions.append(entry.action)
+        self._timestamps.append(entry.timestamp)
+        self._success.append(1 if entry.success else 0)
 
     def _save_history(self):
         """Save history to file"""
         try:
-            data = {
-                'version': '1.0',
-                'last_updated': datetime.now().isoformat(),
-                'entries': [entry.to_dict() for entry in self._entries]
-            }
+            json_utils.write_atomic(self.history_file, b''.join(
+                json_utils.dumps(entry.to_dict()) + b'\n'
+                for entry in self._entries
+            ))
+        except Exception as e:
+            print(f"Warning: Could not save history: {e}")
 
-            with open(self.history_file, 'w') as f:
-                json.dump(data, f, indent=2)
+    def _append_history(self, entry: HistoryEntry):
+        """Append a single entry to the history file"""
+        try:
+            with open(self.history_file, 'ab') as f:
+                f.write(json_utils.dumps(entry.to_dict()) + b'\n')
         except Exception as e:
             print(f"Warning: Could not save history: {e}")
 
@@ -103,16 +180,46 @@ class InstallHistory:
             details=details
         )
         self._entries.append(entry)
-        self._save_history()
+        self._append_columns(entry)
+        self._append_history(entry)
 
     def get_all_entries(self, limit: Optional[int] = None) -> List[HistoryEntry]:
         """Get all history entries (newest first)"""
-        entries = sorted(self._entries,
-                        key=lambda x: x.timestamp,
-                        reverse=True)
-        if limit:
-            return entries[:limit]
-        return entries
+        # Entries are appended in chronological order, so the newest ones
+        # are simply the tail of the list
+        if limit is not None:
+            if limit <= 0:
+                return []
+            return self._entries[-limit:][::-1]
+        return self._entries[::-1]
+
+    def page(self,
+             cursor: Optional[int] = None,
+             page_size: int = 50) -> Tuple[List[HistoryEntry], Optional[int]]:
+        """
+        Get one page of history entries (newest first)
+
+        Args:
+            cursor: Number of newest entries already seen (None for first page)
+            page_size: Maximum number of entries to return
+
+        Returns:
+            Tuple of (entries, next cursor or None when there are no more)
+
+        Raises:
+            ValueError: If page_size is less than 1
+        """
+        if page_size < 1:
+            raise ValueError(f"page_size must be at least 1, got {page_size}")
+
+        cursor = cursor or 0
+        n = len(self._entries)
+        end = max(0, n - cursor)
+        start = max(0, end - page_size)
+
+        entries = self._entries[start:end][::-1]
+        next_cursor = cursor + page_size if start > 0 else None
+        return entries, next_cursor
 
     def get_entries_for_package(self, package: str) -> List[HistoryEntry]:
         """Get history entries for a specific package"""
@@ -123,9 +230,10 @@ class InstallHistory:
 
     def get_entries_by_action(self, action: str) -> List[HistoryEntry]:
         """Get entries by action type"""
+        entries = self._entries
         return [
-            entry for entry in self._entries
-            if entry.action == action
+            entries[i] for i, a in enumerate(self._actions)
+            if a == action
         ]
 
     def get_entries_by_date(self,
@@ -133,26 +241,29 @@ class InstallHistory:
                            end_date: Optional[datetime] = None) -> List[HistoryEntry]:
         """Get entries within a date range"""
         entries = self._entries
+        indices = range(len(entries))
 
         if start_date:
-            entries = [
-                e for e in entries
-                if datetime.fromisoformat(e.timestamp) >= start_date
+            indices = [
+                i for i in indices
+                if entries[i].ts >= start_date
             ]
 
         if end_date:
-            entries = [
-                e for e in entries
-                if datetime.fromisoformat(e.timestamp) <= end_date
+            indices = [
+                i for i in indices
+                if entries[i].ts <= end_date
             ]
 
-        return sorted(entries, key=lambda x: x.timestamp, reverse=True)
+        return sorted((entries[i] for i in indices),
+                      key=attrgetter('timestamp'), reverse=True)
 
     def get_failed_entries(self) -> List[HistoryEntry]:
         """Get all failed installations"""
+        entries = self._entries
         return [
-            entry for entry in self._entries
-            if not entry.success
+            entries[i] for i, ok in enumerate(self._success)
+            if not ok
         ]
 
     def get_stats(self) -> Dict[str, Any]:
@@ -169,12 +280,12 @@ class InstallHistory:
                 'unique_packages': 0
             }
 
-        installs = len([e for e in self._entries if e.action == 'install'])
-        updates = len([e for e in self._entries if e.action == 'update'])
-        uninstalls = len([e for e in self._entries if e.action == 'uninstall'])
-        successes = len([e for e in self._entries if e.success])
+        installs = self._actions.count('install')
+        updates = self._actions.count('update')
+        uninstalls = self._actions.count('uninstall')
+        successes = sum(self._success)
 
-        unique_packages = len(set(e.package for e in self._entries))
+        unique_packages = len(set(self._packages))
 
         return {
             'total': total,
@@ -189,39 +300,48 @@ class InstallHistory:
         """Get the last action performed on a package"""
         package_entries = self.get_entries_for_package(package)
         if package_entries:
-            return sorted(package_entries,
-                         key=lambda x: x.timestamp,
-                         reverse=True)[0]
+            return max(package_entries, key=attrgetter('timestamp'))
         return None
 
     def clear_history(self):
         """Clear all history (use with caution)"""
         self._entries = []
+        self._rebuild_columns()
         self._save_history()
 
     def export_history(self, output_file: str, format: str = 'json'):
-        """Export history to a file"""
-        entries = self.get_all_entries()
+        """Export history to a file (json, jsonl or txt)"""
+        # Stream entries newest first rather than materializing a sorted copy
+        entries = reversed(self._entries)
 
         if format == 'json':
-            data = {
-                'exported_at': datetime.now().isoformat(),
-                'total_entries': len(entries),
-                'entries': [e.to_dict() for e in entries]
-            }
-
-            with open(output_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Written element by element so the export never has to be
+            # built up in memory as one big document
+            with open(output_file, 'wb') as f:
+                f.write(b'{\n')
+                f.write(b'  "exported_at": ' + json_utils.dumps(datetime.now().isoformat()) + b',\n')
+                f.write(b'  "total_entries": ' + json_utils.dumps(len(self._entries)) + b',\n')
+                f.write(b'  "entries": [')
+                for i, entry in enumerate(entries):
+                    f.write(b',\n    ' if i else b'\n    ')
+                    f.write(json_utils.dumps(entry.to_dict()))
+                f.write(b'\n  ]\n}\n')
+
+        elif format == 'jsonl':
+            with open(output_file, 'wb') as f:
+                for entry in entries:
+                    f.write(json_utils.dumps(entry.to_dict()))
+                    f.write(b'\n')
 
         elif format == 'txt':
             with open(output_file, 'w') as f:
                 f.write(f"Koala's Forge Installation History\n")
                 f.write(f"Exported: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Total entries: {len(entries)}\n\n")
+                f.write(f"Total entries: {len(self._entries)}\n\n")
                 f.write("="*80 + "\n\n")
 
                 for entry in entries:
-                    timestamp = datetime.fromisoformat(entry.timestamp)
+                    timestamp = entry.ts
                     status = "✅" if entry.success else "❌"
                     f.write(f"{timestamp.strftime('%Y-%m-%d %H:%M:%S')} | {status} | {entry.action.upper():<10} | {entry.package}\n")
 
@@ -233,11 +353,15 @@ class InstallHistory:
 
 # Singleton instance
 _history_instance: Optional[InstallHistory] = None
+_history_lock = threading.Lock()
 
 
 def get_history() -> InstallHistory:
     """Get the singleton history instance"""
     global _history_instance
     if _history_instance is None:
-        _history_instance = InstallHistory()
+        # GUI worker threads may race to create the instance
+        with _history_lock:
+            if _history_instance is None:
+                _history_instance = InstallHistory()
     return _history_instance
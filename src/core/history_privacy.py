@@ -5,21 +5,41 @@ Provides privacy features, causality tracking, and system state monitoring
 
 import json
 import hashlib
+import logging
+import os
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any, Set
-from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Optional, Any, Callable, FrozenSet, Tuple
+from dataclasses import dataclass, field
+
+from . import json_utils
+
+logger = logging.getLogger(__name__)
+
+# Resolved once at import; the home directory doesn't move at runtime
+_FORGE_DIR = Path.home() / '.koalas-forge'
 
 
 @dataclass
 class SystemState:
     """Captures system state at a point in time"""
     timestamp: str
-    working_packages: Set[str] = field(default_factory=set)
-    broken_packages: Set[str] = field(default_factory=set)
+    working_packages: FrozenSet[str] = field(default_factory=frozenset)
+    broken_packages: FrozenSet[str] = field(default_factory=frozenset)
     system_errors: List[str] = field(default_factory=list)
     performance_metrics: Dict[str, float] = field(default_factory=dict)
+    _ts: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def ts(self) -> datetime:
+        """Timestamp as a datetime, parsed once on first access"""
+        if self._ts is None:
+            self._ts = datetime.fromisoformat(self.timestamp)
+        return self._ts
 
     def to_dict(self):
         """Convert to dictionary for serialization"""
@@ -36,8 +56,8 @@ class SystemState:
         """Create from dictionary"""
         return cls(
             timestamp=data['timestamp'],
-            working_packages=set(data.get('working_packages', [])),
-            broken_packages=set(data.get('broken_packages', [])),
+            working_packages=frozenset(data.get('working_packages', [])),
+            broken_packages=frozenset(data.get('broken_packages', [])),
             system_errors=data.get('system_errors', []),
             performance_metrics=data.get('performance_metrics', {})
         )
@@ -54,7 +74,15 @@ class BreakageEvent:
     recovery_action: Optional[str] = None  # Suggested fix
 
     def to_dict(self):
-        return asdict(self)
+        # Flat record, so a literal beats asdict()'s recursive copy
+        return {
+            'timestamp': self.timestamp,
+            'suspected_cause': self.suspected_cause,
+            'affected_packages': self.affected_packages,
+            'error_type': self.error_type,
+            'confidence': self.confidence,
+            'recovery_action': self.recovery_action
+        }
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]):
@@ -65,8 +93,9 @@ class PrivacyConfig:
     """Privacy configuration for history tracking"""
 
     def __init__(self):
-        self.config_file = Path.home() / '.koalas-forge' / 'privacy.json'
+        self.config_file = _FORGE_DIR / 'privacy.json'
         self.config = self._load_config()
+        self._listeners: List[Callable[[], None]] = []
 
     def _load_config(self) -> Dict[str, Any]:
         """Load privacy configuration"""
@@ -98,6 +127,12 @@ class PrivacyConfig:
         """Set a privacy configuration value"""
         self.config[key] = value
         self.save_config()
+        for listener in self._listeners:
+            listener()
+
+    def add_listener(self, listener: Callable[[], None]):
+        """Register a callback to run whenever a setting changes"""
+        self._listeners.append(listener)
 
     def get(self, key: str, default: Any = None) -> Any:
         """Get a privacy configuration value"""
@@ -107,17 +142,62 @@ class PrivacyConfig:
 class EnhancedHistory:
     """Enhanced history with privacy and breakage detection"""
 
+    # Commands used to check whether common tools still respond
+    STATE_PROBES = {
+        'git': ['git', '--version'],
+        'docker': ['docker', '--version'],
+        'python': ['python3', '--version'],
+        'node': ['node', '--version']
+    }
+
+    # Seconds a probe result may be reused for
+    PROBE_CACHE_TTL = 30.0
+
+    # Seconds to wait before re-probing when an action shows no effect yet
+    STATE_RECHECK_DELAY = 0.1
+
+    # Seconds a disk usage reading may be reused for
+    DISK_USAGE_TTL = 5.0
+
+    # Fold the event log into the state files once it holds this many
+    # records, or COMPACT_RATIO times as many as the files do if that's more
+    COMPACT_MIN_EVENTS = 200
+    COMPACT_RATIO = 4
+
     def __init__(self):
-        self.history_dir = Path.home() / '.koalas-forge' / 'history'
+        self.history_dir = _FORGE_DIR / 'history'
         self.history_file = self.history_dir / 'enhanced_history.json'
         self.state_file = self.history_dir / 'system_states.json'
         self.breakage_file = self.history_dir / 'breakage_events.json'
+        self.events_file = self.history_dir / 'events.jsonl'
         self.privacy = PrivacyConfig()
+        self._refresh_privacy_flags()
+        self.privacy.add_listener(self._refresh_privacy_flags)
+        self._probe_cache: Dict[str, Tuple[float, bool]] = {}
+        self._anon_cache: Dict[str, str] = {}
+        self._disk_usage: Optional[Tuple[float, float]] = None
+        self._log_events = 0
+        self._state_generation = 0
+        self._breakage_generation = 0
 
         self._ensure_dirs()
         self._states: List[SystemState] = self._load_states()
         self._breakages: List[BreakageEvent] = self._load_breakages()
+        self._compacted_records = len(self._states) + len(self._breakages)
+        # Log records are tagged with the compaction generation they were
+        # written in; both files already hold everything older than theirs
+        self._generation = max(self._state_generation, self._breakage_generation)
+        self._replay_events()
         self._apply_privacy_policies()
+        self._maybe_compact()
+        self._prime_cpu_percent()
+
+    def _refresh_privacy_flags(self):
+        """Snapshot the privacy flags read on every capture and record"""
+        self._tracking = bool(self.privacy.get('tracking_enabled'))
+        self._track_state = bool(self.privacy.get('track_system_state'))
+        self._track_perf = bool(self.privacy.get('track_performance'))
+        self._anonymize = bool(self.privacy.get('anonymize_packages'))
 
     def _ensure_dirs(self):
         """Ensure history directories exist"""
@@ -127,8 +207,9 @@ class EnhancedHistory:
         """Load system states from file"""
         if self.state_file.exists():
             try:
-                with open(self.state_file, 'r') as f:
-                    data = json.load(f)
+                with open(self.state_file, 'rb') as f:
+                    data = json_utils.loads(f.read())
+                    self._state_generation = data.get('generation', 0)
                     return [SystemState.from_dict(s) for s in data.get('states', [])]
             except:
                 pass
@@ -138,36 +219,101 @@ class EnhancedHistory:
         """Load breakage events from file"""
         if self.breakage_file.exists():
             try:
-                with open(self.breakage_file, 'r') as f:
-                    data = json.load(f)
+                with open(self.breakage_file, 'rb') as f:
+                    data = json_utils.loads(f.read())
+                    self._breakage_generation = data.get('generation', 0)
                     return [BreakageEvent.from_dict(b) for b in data.get('breakages', [])]
             except:
                 pass
         return []
 
+    def _replay_events(self):
+        """
+        Apply records appended to the event log since the last compaction
+
+        A record from an older generation than a file was already folded
+        into it by a compaction that stopped before removing the log.
+        """
+        if not self.events_file.exists():
+            return
+
+        try:
+            with open(self.events_file, 'rb') as f:
+                for number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    self._log_events += 1
+                    try:
+                        record = json_utils.loads(line)
+                        generation = record.get('gen', 0)
+                        if record.get('type') == 'state':
+                            if generation >= self._state_generation:
+                                self._states.append(SystemState.from_dict(record['data']))
+                        elif record.get('type') == 'breakage':
+                            if generation >= self._breakage_generation:
+                                self._breakages.append(BreakageEvent.from_dict(record['data']))
+                    except (ValueError, KeyError) as e:
+                        # Usually a torn final write
+                        logger.warning(f"Skipping unreadable history event on line {number}: "
+                                       f"{e}: {line[:200]!r}")
+        except OSError as e:
+            logger.warning(f"Could not read history events: {e}")
+
+    def _append_events(self, records: List[Dict[str, Any]]):
+        """Append records to the event log with a single write and sync"""
+        generation = self._generation
+        payload = b''.join(json_utils.dumps({**r, 'gen': generation}) + b'\n' for r in records)
+        with open(self.events_file, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_events += len(records)
+
+    def _maybe_compact(self):
+        """Compact once the event log has grown large next to the state files"""
+        threshold = max(self.COMPACT_MIN_EVENTS, self.COMPACT_RATIO * self._compacted_records)
+        if self._log_events >= threshold:
+            self._compact()
+
+    def _compact(self):
+        """
+        Fold the event log into the state and breakage files
+
+        Each file is replaced atomically and stamped with the new
+        generation, so if this stops partway the records a file already
+        holds are skipped when the log is replayed rather than doubled.
+        """
+        self._generation += 1
+        self._save_states()
+        self._save_breakages()
+        if self.events_file.exists():
+            self.events_file.unlink()
+        self._log_events = 0
+        self._compacted_records = len(self._states) + len(self._breakages)
+
     def _save_states(self):
         """Save system states to file"""
         data = {
             'version': '1.0',
             'last_updated': datetime.now().isoformat(),
+            'generation': self._generation,
             'states': [s.to_dict() for s in self._states]
         }
-        with open(self.state_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        json_utils.write_atomic(self.state_file, json_utils.dumps(data))
 
     def _save_breakages(self):
         """Save breakage events to file"""
         data = {
             'version': '1.0',
             'last_updated': datetime.now().isoformat(),
+            'generation': self._generation,
             'breakages': [b.to_dict() for b in self._breakages]
         }
-        with open(self.breakage_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        json_utils.write_atomic(self.breakage_file, json_utils.dumps(data))
 
     def _apply_privacy_policies(self):
         """Apply privacy policies like auto-clearing old data"""
-        if not self.privacy.get('tracking_enabled'):
+        if not self._tracking:
             return
 
         auto_clear_days = self.privacy.get('auto_clear_days')
@@ -177,7 +323,7 @@ class EnhancedHistory:
             # Clear old states
             self._states = [
                 s for s in self._states
-                if datetime.fromisoformat(s.timestamp) > cutoff_date
+                if s.ts > cutoff_date
             ]
 
             # Clear old breakages
@@ -186,59 +332,110 @@ class EnhancedHistory:
                 if datetime.fromisoformat(b.timestamp) > cutoff_date
             ]
 
-            self._save_states()
-            self._save_breakages()
+            self._compact()
 
     def anonymize_package_name(self, package: str) -> str:
         """Anonymize package name for privacy"""
-        if self.privacy.get('anonymize_packages'):
-            # Create a hash of the package name
-            hash_obj = hashlib.sha256(package.encode())
-            return f"pkg_{hash_obj.hexdigest()[:8]}"
+        if self._anonymize:
+            # Create a hash of the package name, once per unique package
+            anonymized = self._anon_cache.get(package)
+            if anonymized is None:
+                hash_obj = hashlib.sha256(package.encode(), usedforsecurity=False)
+                anonymized = f"pkg_{hash_obj.hexdigest()[:8]}"
+                self._anon_cache[package] = anonymized
+            return anonymized
         return package
 
-    def capture_system_state(self) -> SystemState:
+    @staticmethod
+    def _probe_command(cmd: List[str]) -> bool:
+        """Check whether a probe command runs successfully"""
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                timeout=2,
+                text=True
+            )
+            return result.returncode == 0
+        except:
+            return False
+
+    def _probe_packages(self, use_cache: bool = True) -> Dict[str, bool]:
+        """
+        Probe all state packages concurrently
+
+        Results younger than PROBE_CACHE_TTL seconds are reused when
+        use_cache is set, so back-to-back captures don't respawn every probe.
+        """
+        now = time.monotonic()
+        results: Dict[str, bool] = {}
+        pending: Dict[str, List[str]] = {}
+
+        for pkg, cmd in self.STATE_PROBES.items():
+            cached = self._probe_cache.get(pkg) if use_cache else None
+            if cached and now - cached[0] < self.PROBE_CACHE_TTL:
+                results[pkg] = cached[1]
+            else:
+                pending[pkg] = cmd
+
+        if pending:
+            # Each probe just waits on a child process, so threads overlap them
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                futures = {
+                    pkg: executor.submit(self._probe_command, cmd)
+                    for pkg, cmd in pending.items()
+                }
+                for pkg, future in futures.items():
+                    results[pkg] = future.result()
+                    self._probe_cache[pkg] = (now, results[pkg])
+
+        return results
+
+    def _prime_cpu_percent(self):
+        """Start psutil's CPU counter so later reads don't have to block"""
+        if not self._track_perf:
+            return
+        try:
+            import psutil
+            psutil.cpu_percent(interval=None)
+        except:
+            pass
+
+    def _disk_usage_percent(self, psutil) -> float:
+        """Root disk usage, reused for DISK_USAGE_TTL seconds"""
+        now = time.monotonic()
+        if self._disk_usage is None or now - self._disk_usage[0] >= self.DISK_USAGE_TTL:
+            self._disk_usage = (now, psutil.disk_usage('/').percent)
+        return self._disk_usage[1]
+
+    def capture_system_state(self, use_cache: bool = True) -> SystemState:
         """Capture current system state"""
-        if not self.privacy.get('track_system_state'):
+        if not self._track_state:
             return SystemState(timestamp=datetime.now().isoformat())
 
         state = SystemState(timestamp=datetime.now().isoformat())
 
         # Check which packages are working (simplified - would need real checks)
         try:
-            # Example: Check if common tools respond
-            test_commands = {
-                'git': ['git', '--version'],
-                'docker': ['docker', '--version'],
-                'python': ['python3', '--version'],
-                'node': ['node', '--version']
-            }
-
-            for pkg, cmd in test_commands.items():
-                try:
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        timeout=2,
-                        text=True
-                    )
-                    if result.returncode == 0:
-                        state.working_packages.add(pkg)
-                    else:
-                        state.broken_packages.add(pkg)
-                except:
-                    state.broken_packages.add(pkg)
+            probes = self._probe_packages(use_cache)
+            state.working_packages = frozenset(
+                pkg for pkg, working in probes.items() if working
+            )
+            state.broken_packages = frozenset(
+                pkg for pkg, working in probes.items() if not working
+            )
         except:
             pass
 
         # Capture performance metrics if enabled
-        if self.privacy.get('track_performance'):
+        if self._track_perf:
             try:
                 import psutil
                 state.performance_metrics = {
-                    'cpu_percent': psutil.cpu_percent(interval=1),
+                    # Non-blocking: usage since the previous call (primed in __init__)
+                    'cpu_percent': psutil.cpu_percent(interval=None),
                     'memory_percent': psutil.virtual_memory().percent,
-                    'disk_usage': psutil.disk_usage('/').percent
+                    'disk_usage': self._disk_usage_percent(psutil)
                 }
             except:
                 pass
@@ -248,8 +445,16 @@ class EnhancedHistory:
     def detect_breakage(self, before_state: SystemState, after_state: SystemState,
                        action_package: str, action: str) -> Optional[BreakageEvent]:
         """Detect if an action caused breakage"""
+        before_packages = before_state.working_packages
+        after_packages = after_state.working_packages
+
+        # Unchanged state is the common case; one equality check skips
+        # building the set differences below
+        if before_packages is after_packages or before_packages == after_packages:
+            return None
+
         # Find packages that were working before but not after
-        newly_broken = before_state.working_packages - after_state.working_packages
+        newly_broken = before_packages - after_packages
 
         if newly_broken:
             # Calculate confidence based on timing and correlation
@@ -278,7 +483,7 @@ class EnhancedHistory:
     def record_action_with_state(self, package: str, action: str, success: bool,
                                  details: Dict[str, Any] = None) -> Optional[BreakageEvent]:
         """Record an action and detect any breakages it caused"""
-        if not self.privacy.get('tracking_enabled'):
+        if not self._tracking:
             return None
 
         # Capture state before action
@@ -287,24 +492,32 @@ class EnhancedHistory:
         # Record the action (would integrate with existing history)
         # ... existing history recording ...
 
-        # Capture state after action
-        import time
-        time.sleep(2)  # Give system time to stabilize
-        after_state = self.capture_system_state()
+        # Capture state after action, always re-probing. If nothing changed
+        # yet, give the system one short moment to settle and look again
+        # instead of always blocking for a fixed delay
+        after_state = self.capture_system_state(use_cache=False)
+        if after_state.working_packages == before_state.working_packages:
+            time.sleep(self.STATE_RECHECK_DELAY)
+            after_state = self.capture_system_state(use_cache=False)
 
-        # Save states
         self._states.append(before_state)
         self._states.append(after_state)
-        self._save_states()
+        records = [
+            {'type': 'state', 'data': before_state.to_dict()},
+            {'type': 'state', 'data': after_state.to_dict()}
+        ]
 
         # Detect breakages
         breakage = self.detect_breakage(before_state, after_state, package, action)
         if breakage:
             self._breakages.append(breakage)
-            self._save_breakages()
-            return breakage
+            records.append({'type': 'breakage', 'data': breakage.to_dict()})
 
-        return None
+        # Persist states and any breakage together in one log append
+        self._append_events(records)
+        self._maybe_compact()
+
+        return breakage
 
     def get_breakages_by_package(self, package: str) -> List[BreakageEvent]:
         """Get all breakages caused by a specific package"""
@@ -331,7 +544,7 @@ class EnhancedHistory:
         self._breakages = []
 
         # Delete files
-        for file in [self.history_file, self.state_file, self.breakage_file]:
+        for file in [self.history_file, self.state_file, self.breakage_file, self.events_file]:
             if file.exists():
                 file.unlink()
 
@@ -358,8 +571,8 @@ class EnhancedHistory:
             }
             data['breakage_summary'].append(summary)
 
-        with open(output_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        with open(output_file, 'wb') as f:
+            f.write(json_utils.dumps(data, pretty=True))
 
         print(f"✅ Anonymized history exported to {output_file}")
 
@@ -375,7 +588,8 @@ class EnhancedHistory:
                 'oldest_entry': self._states[0].timestamp if self._states else None,
                 'storage_size_kb': sum(
                     f.stat().st_size / 1024
-                    for f in [self.history_file, self.state_file, self.breakage_file]
+                    for f in [self.history_file, self.state_file, self.breakage_file,
+                              self.events_file]
                     if f.exists()
                 )
             },
@@ -385,11 +599,15 @@ class EnhancedHistory:
 
 # Singleton instance
 _enhanced_history_instance: Optional[EnhancedHistory] = None
+_enhanced_history_lock = threading.Lock()
 
 
 def get_enhanced_history() -> EnhancedHistory:
     """Get the singleton enhanced history instance"""
     global _enhanced_history_instance
     if _enhanced_history_instance is None:
-        _enhanced_history_instance = EnhancedHistory()
+        # GUI worker threads may race to create the instance
+        with _enhanced_history_lock:
+            if _enhanced_history_instance is None:
+                _enhanced_history_instance = EnhancedHistory()
     return _enhanced_history_instance
\ No newline at end of file
@@ -4,16 +4,50 @@ Handles actual package installation using platform package managers
 """
 
 import asyncio
-import subprocess
+import bisect
+import hashlib
+import os
+import shutil
 import platform
+import re
+import sys
+import time
 import yaml
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Callable, Dict, Final, List, Optional, Any, Set, Tuple
+from dataclasses import dataclass, fields
 from enum import Enum
+from functools import lru_cache
 
+from . import json_utils
 from .event_system import EventBus, Event, EventType, get_event_bus
 
+# Prefer the libyaml-backed loader; fall back to pure Python without it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Separates packages in the joined search haystack
+_RECORD_SEP = "\x1e"
+
+# The package database shipped at the repository root
+APPS_YAML: Final[Path] = Path(__file__).resolve().parents[2] / "apps.yaml"
+
+# Where the parsed package database is cached between runs
+PACKAGES_CACHE_DIR = Path.home() / '.koalas-forge' / 'cache'
+
+# Bumped whenever Package changes shape, so old caches are not reused
+PACKAGES_CACHE_FORMAT = 3
+
+
+class OS(Enum):
+    """Operating systems, keyed by their platform.system() name"""
+    MAC = "Darwin"
+    LINUX = "Linux"
+    WIN = "Windows"
+    OTHER = "other"
+
 
 class InstallMethod(Enum):
     """Installation method types"""
@@ -28,12 +62,12 @@ class InstallMethod(Enum):
     MANUAL = "manual"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Package:
     """Represents an installable package"""
     name: str
     package: str
-    platforms: List[str]
+    platforms: Tuple[str, ...]
     install_type: str
     category: str = "other"
     post_install: Optional[str] = None
@@ -44,83 +78,395 @@ class Package:
     version: Optional[str] = None
 
 
+_OS_BY_NAME = {os_.value: os_ for os_ in OS}
+
+# Command builders per OS, keyed by install_type. The None entry is the
+# fallback for install types without a dedicated builder; an OS without
+# one gets no command for them.
+CommandBuilder = Callable[[Package], List[str]]
+
+_INSTALL_COMMANDS: Dict[OS, Dict[Optional[str], CommandBuilder]] = {
+    OS.MAC: {
+        'cask': lambda p: ['brew', 'install', '--cask', p.package],
+        None: lambda p: ['brew', 'install', p.package],
+    },
+    OS.LINUX: {
+        'apt': lambda p: ['sudo', 'apt-get', 'install', '-y', p.package],
+        'snap': lambda p: ['sudo', 'snap', 'install', p.package],
+        'dnf': lambda p: ['sudo', 'dnf', 'install', '-y', p.package],
+        None: lambda p: ['brew', 'install', p.package],
+    },
+    OS.WIN: {
+        'winget': lambda p: ['winget', 'install', p.package, '-e'],
+        'choco': lambda p: ['choco', 'install', p.package, '-y'],
+    },
+}
+
+# Commands that take any number of packages appended to the end; install
+# types missing here (winget, choco) install one package per call
+_BATCH_INSTALL_COMMANDS: Dict[OS, Dict[Optional[str], List[str]]] = {
+    OS.MAC: {
+        'cask': ['brew', 'install', '--cask'],
+        None: ['brew', 'install'],
+    },
+    OS.LINUX: {
+        'apt': ['sudo', 'apt-get', 'install', '-y'],
+        'snap': ['sudo', 'snap', 'install'],
+        'dnf': ['sudo', 'dnf', 'install', '-y'],
+        None: ['brew', 'install'],
+    },
+}
+
+# TODO: Add Linux/Windows uninstall and update commands
+_UNINSTALL_COMMANDS: Dict[OS, Dict[Optional[str], CommandBuilder]] = {
+    OS.MAC: {
+        'cask': lambda p: ['brew', 'uninstall', '--cask', p.package],
+        None: lambda p: ['brew', 'uninstall', p.package],
+    },
+}
+
+_UPDATE_COMMANDS: Dict[OS, Dict[Optional[str], CommandBuilder]] = {
+    OS.MAC: {
+        None: lambda p: ['brew', 'upgrade', p.package],
+    },
+}
+
+# Which installed-package inventory answers is_installed() per install_type;
+# 'path' means look for the executable on PATH instead
+_INVENTORY_MANAGERS: Dict[OS, Dict[Optional[str], str]] = {
+    OS.MAC: {
+        'cask': 'cask',
+        None: 'brew',
+    },
+    OS.LINUX: {
+        'apt': 'apt',
+        'snap': 'snap',
+        None: 'path',
+    },
+    # TODO: Implement Windows detection
+}
+
+
+def _build_command(builders: Dict[Optional[str], CommandBuilder], pkg: Package) -> List[str]:
+    """Build a command from a builder table, or [] if there is none"""
+    builder = builders.get(pkg.install_type) or builders.get(None)
+    return builder(pkg) if builder else []
+
+
+def _command_manager(cmd: List[str]) -> str:
+    """Name of the package manager a command runs, looking past sudo"""
+    return cmd[1] if cmd[0] == 'sudo' else cmd[0]
+
+
+@lru_cache(maxsize=1024)
+def _normalize_name(name: str) -> str:
+    """Normalize a user-supplied package name to its database key"""
+    return name.lower().replace(' ', '-')
+
+
+def _make_package(name: str, package: str, platforms: List[str], install_type: str,
+                  category: str, post_install: Optional[str], pre_install: Optional[str],
+                  notes: Optional[str], priority: str, size: Optional[str],
+                  version: Optional[str]) -> Package:
+    """Build a Package, interning low-cardinality fields so packages share them"""
+    return Package(
+        name=name,
+        package=package,
+        platforms=tuple(sys.intern(p) for p in platforms),
+        install_type=sys.intern(install_type),
+        category=sys.intern(category),
+        post_install=post_install,
+        pre_install=pre_install,
+        notes=notes,
+        priority=sys.intern(priority),
+        size=size,
+        version=version
+    )
+
+
+def _parse_packages(apps_file: Path) -> Dict[str, Package]:
+    """Parse packages from apps.yaml"""
+    # Bytes go straight to libyaml without a Python-level decode
+    with open(apps_file, 'rb') as f:
+        data = yaml.load(f, Loader=_YamlLoader)
+
+    packages = {}
+
+    if not data or 'apps' not in data:
+        return packages
+
+    # Parse all categories
+    for category, apps in data['apps'].items():
+        for app in apps:
+            pkg_name = _normalize_name(app.get('name', ''))
+            packages[pkg_name] = _make_package(
+                name=app.get('name', pkg_name),
+                package=app.get('package', pkg_name),
+                platforms=app.get('platforms', []),
+                install_type=app.get('install_type', 'brew'),
+                category=category,
+                post_install=app.get('post_install'),
+                pre_install=app.get('pre_install'),
+                notes=app.get('notes'),
+                priority=app.get('priority', 'medium'),
+                size=app.get('size'),
+                version=app.get('version')
+            )
+
+    return packages
+
+
+@lru_cache(maxsize=4)
+def _load_packages_cached(apps_path: str, mtime_ns: int) -> Dict[str, Package]:
+    """
+    Load packages for a given apps.yaml version, once per process
+
+    Keyed by the file's mtime so an edited apps.yaml is picked up.
+    Across processes the parsed result is kept in a JSON sidecar named
+    after a hash of the file's contents, which loads faster than YAML
+    and, unlike a pickle, cannot run code if the cache is tampered with.
+    """
+    apps_file = Path(apps_path)
+
+    if os.environ.get('KOALAS_YAML_CACHE', '1') == '0':
+        return _parse_packages(apps_file)
+
+    try:
+        content_hash = hashlib.md5(apps_file.read_bytes()).hexdigest()
+    except OSError:
+        return _parse_packages(apps_file)
+
+    cache_file = PACKAGES_CACHE_DIR / f"apps_v{PACKAGES_CACHE_FORMAT}_{content_hash}.json"
+
+    try:
+        rows = json_utils.loads(cache_file.read_bytes())
+        return {pkg_name: _make_package(*row) for pkg_name, row in rows.items()}
+    except Exception:
+        pass
+
+    packages = _parse_packages(apps_file)
+
+    try:
+        PACKAGES_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for stale in PACKAGES_CACHE_DIR.glob("apps_*"):
+            stale.unlink()
+        # One row of field values per package, in Package field order
+        rows = {
+            pkg_name: [getattr(pkg, f.name) for f in fields(Package)]
+            for pkg_name, pkg in packages.items()
+        }
+        json_utils.write_atomic(cache_file, json_utils.dumps(rows))
+    except Exception:
+        pass  # Caching is best effort
+
+    return packages
+
+
+class _TrieNode:
+    """One node of a prefix trie"""
+    __slots__ = ('children', 'indices')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.indices: Set[int] = set()
+
+
+class _PrefixTrie:
+    """
+    Maps word prefixes to the package indices whose words start with them
+
+    Every node keeps the indices of all words passing through it, so a
+    lookup walks len(prefix) nodes and never visits the subtree below.
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+
+    def insert(self, word: str, index: int):
+        """Record that the package at index has this word"""
+        node = self._root
+        node.indices.add(index)
+        for ch in word:
+            node = node.children.setdefault(ch, _TrieNode())
+            node.indices.add(index)
+
+    def lookup(self, prefix: str) -> Set[int]:
+        """Indices of packages with a word starting with prefix"""
+        node = self._root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return set()
+        return node.indices
+
+
 class PackageInstaller:
     """
     Handles package installation with event system integration
     """
 
+    # Seconds an is_installed() answer may be reused for
+    INSTALLED_CACHE_TTL = 30.0
+
+    # How many installs each package manager may run at once; apt, dnf
+    # and snap hold a system-wide lock, so they go one at a time
+    MANAGER_CONCURRENCY = {
+        'brew': 4,
+        'winget': 2,
+        'choco': 2
+    }
+
+    # How much of a failed command's stderr is kept for its error message
+    STDERR_TAIL_BYTES = 4096
+
+    # Commands listing everything a package manager has installed
+    INVENTORY_COMMANDS = {
+        'brew': ['brew', 'list', '--formula', '-1'],
+        'cask': ['brew', 'list', '--cask', '-1'],
+        'apt': ['dpkg-query', '-W', '-f=${db:Status-Abbrev} ${Package}\n'],
+        'snap': ['snap', 'list']
+    }
+
     def __init__(self, event_bus: Optional[EventBus] = None):
         self.event_bus = event_bus or get_event_bus()
-        self.platform_info = {'os': platform.system()}
+        self._set_platform(platform.system())
         self.packages_db = self._load_packages()
+        self._build_columns()
+        self._installed_cache: Dict[str, Tuple[float, bool]] = {}
+        self._installed_sets: Dict[str, Tuple[float, Set[str]]] = {}
+        self._manager_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._brew_refreshed = False
+        self._pending_emits: Set[asyncio.Task] = set()
+        self._last_emit: Optional[asyncio.Task] = None
+
+    def _set_platform(self, os_name: str):
+        """Resolve the OS and select its command tables once, up front"""
+        self.platform_info = {'os': os_name}
+        self.os = _OS_BY_NAME.get(os_name, OS.OTHER)
+
+        # Anything that is neither macOS nor Linux is treated as Windows
+        table_key = self.os if self.os in (OS.MAC, OS.LINUX) else OS.WIN
+        self._install_commands = _INSTALL_COMMANDS.get(table_key, {})
+        self._batch_install_commands = _BATCH_INSTALL_COMMANDS.get(table_key, {})
+        self._uninstall_commands = _UNINSTALL_COMMANDS.get(table_key, {})
+        self._update_commands = _UPDATE_COMMANDS.get(table_key, {})
+        self._inventory_managers = _INVENTORY_MANAGERS.get(table_key, {})
 
     def _load_packages(self) -> Dict[str, Package]:
         """Load packages from apps.yaml"""
-        apps_file = Path(__file__).parent.parent.parent / "apps.yaml"
-
-        if not apps_file.exists():
+        # One stat both checks existence and gets the cache key
+        try:
+            mtime_ns = APPS_YAML.stat().st_mtime_ns
+        except FileNotFoundError:
             return {}
 
-        with open(apps_file, 'r') as f:
-            data = yaml.safe_load(f)
-
-        packages = {}
-
-        if not data or 'apps' not in data:
-            return packages
-
-        # Parse all categories
-        for category, apps in data['apps'].items():
-            for app in apps:
-                pkg_name = app.get('name', '').lower().replace(' ', '-')
-                packages[pkg_name] = Package(
-                    name=app.get('name', pkg_name),
-                    package=app.get('package', pkg_name),
-                    platforms=app.get('platforms', []),
-                    install_type=app.get('install_type', 'brew'),
-                    category=category,
-                    post_install=app.get('post_install'),
-                    pre_install=app.get('pre_install'),
-                    notes=app.get('notes'),
-                    priority=app.get('priority', 'medium'),
-                    size=app.get('size'),
-                    version=app.get('version')
-                )
+        # Shared across installers in this process; copy so callers can't
+        # mutate another instance's view
+        return dict(_load_packages_cached(str(APPS_YAML), mtime_ns))
 
-        return packages
+    def _build_columns(self):
+        """
+        Lay the fields scans touch out as parallel lists
+
+        Index i of every column describes self._packages[i], so scans walk
+        one flat list of strings and only fetch the Package on a hit.
+        Search strings join their fields with NUL so a query can never
+        match across the boundary between two fields.
+        """
+        self._packages: List[Package] = list(self.packages_db.values())
+        self._names: List[str] = [pkg.name for pkg in self._packages]
+        self._categories: List[str] = [pkg.category for pkg in self._packages]
+        self._search_blobs: List[str] = [
+            "\0".join((pkg_name, pkg.name, pkg.category, pkg.notes or "")).lower()
+            for pkg_name, pkg in self.packages_db.items()
+        ]
+
+        # Whole names plus the individual words of names and notes
+        self._trie = _PrefixTrie()
+        for i, (pkg_name, pkg) in enumerate(self.packages_db.items()):
+            name = pkg.name.lower()
+            words = {pkg_name, name, pkg.category.lower()}
+            words.update(re.findall(r'\w+', name))
+            words.update(re.findall(r'\w+', (pkg.notes or "").lower()))
+            for word in words:
+                self._trie.insert(word, i)
+
+        # Listings are sorted once here and handed out as shared tuples
+        packages = self._packages
+        names = self._names
+        order = sorted(range(len(packages)), key=names.__getitem__)
+        self._sorted_packages: Tuple[Package, ...] = tuple(packages[i] for i in order)
+        self._sorted_categories: Tuple[str, ...] = tuple(sorted(set(self._categories)))
+        by_category: Dict[str, List[Package]] = {}
+        for pkg in self._sorted_packages:
+            by_category.setdefault(pkg.category, []).append(pkg)
+        self._sorted_by_category: Dict[str, Tuple[Package, ...]] = {
+            category: tuple(pkgs) for category, pkgs in by_category.items()
+        }
+
+        # All search strings in one haystack, with each package's start offset
+        self._haystack = _RECORD_SEP.join(self._search_blobs)
+        self._blob_starts: List[int] = []
+        offset = 0
+        for blob in self._search_blobs:
+            self._blob_starts.append(offset)
+            offset += len(blob) + 1
 
     def search_packages(self, query: str) -> List[Package]:
-        """Search for packages matching query"""
+        """
+        Search for packages matching query
+
+        Prefix matches on names, categories and words come straight from
+        the trie; only a query nothing starts with falls back to a
+        substring scan.
+        """
         query = query.lower()
-        results = []
+        packages = self._packages
 
-        for pkg_name, pkg in self.packages_db.items():
-            if (query in pkg_name.lower() or
-                query in pkg.name.lower() or
-                query in pkg.category.lower() or
-                (pkg.notes and query in pkg.notes.lower())):
-                results.append(pkg)
+        hits = self._trie.lookup(query)
+        if hits:
+            return [packages[i] for i in sorted(hits)]
 
-        return results
+        return [packages[i] for i in self._substring_matches(query)]
+
+    def _substring_matches(self, query: str) -> List[int]:
+        """
+        Indices of packages whose search string contains query
+
+        Scans the joined haystack in one pass instead of testing every
+        search string separately.
+        """
+        if not query or _RECORD_SEP in query:
+            return [i for i, blob in enumerate(self._search_blobs) if query in blob]
+
+        haystack = self._haystack
+        starts = self._blob_starts
+        matches = []
+
+        pos = haystack.find(query)
+        while pos != -1:
+            i = bisect.bisect_right(starts, pos) - 1
+            matches.append(i)
+            if i + 1 == len(starts):
+                break
+            # One hit per package is enough; resume at the next one
+            pos = haystack.find(query, starts[i + 1])
+
+        return matches
 
     def get_package(self, name: str) -> Optional[Package]:
         """Get package by name"""
-        name = name.lower().replace(' ', '-')
-        return self.packages_db.get(name)
-
-    def list_packages(self, category: Optional[str] = None) -> List[Package]:
-        """List all packages, optionally filtered by category"""
-        packages = list(self.packages_db.values())
+        return self.packages_db.get(_normalize_name(name))
 
+    def list_packages(self, category: Optional[str] = None) -> Tuple[Package, ...]:
+        """List all packages sorted by name, optionally filtered by category"""
         if category:
-            packages = [p for p in packages if p.category == category]
+            return self._sorted_by_category.get(category, ())
+        return self._sorted_packages
 
-        return sorted(packages, key=lambda p: p.name)
-
-    def get_categories(self) -> List[str]:
-        """Get list of all categories"""
-        categories = set(pkg.category for pkg in self.packages_db.values())
-        return sorted(categories)
+    def get_categories(self) -> Tuple[str, ...]:
+        """Get sorted tuple of all categories"""
+        return self._sorted_categories
 
     async def is_installed(self, package_name: str) -> bool:
         """Check if a package is already installed"""
@@ -128,35 +474,101 @@ class PackageInstaller:
         if not pkg:
             return False
 
-        # Determine package manager command
-        if self.platform_info['os'] == 'Darwin':  # macOS
-            if pkg.install_type == 'cask':
-                cmd = ['brew', 'list', '--cask', pkg.package]
-            else:
-                cmd = ['brew', 'list', pkg.package]
-
-        elif self.platform_info['os'] == 'Linux':
-            # Try common package managers
-            if pkg.install_type == 'apt':
-                cmd = ['dpkg', '-l', pkg.package]
-            elif pkg.install_type == 'snap':
-                cmd = ['snap', 'list', pkg.package]
-            else:
-                cmd = ['which', pkg.package]
+        key = _normalize_name(package_name)
+        cached = self._installed_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.INSTALLED_CACHE_TTL:
+            return cached[1]
+
+        installed = await self._check_installed(pkg)
+        self._installed_cache[key] = (time.monotonic(), installed)
+        return installed
+
+    async def _check_installed(self, pkg: Package) -> bool:
+        """Ask the package manager whether a package is installed"""
+        managers = self._inventory_managers
+        manager = managers.get(pkg.install_type) or managers.get(None)
 
-        else:
-            # Windows
-            return False  # TODO: Implement Windows detection
+        if manager is None:
+            return False
+        if manager == 'path':
+            return self._check_on_path(pkg)
+
+        return pkg.package in await self._installed_set(manager)
+
+    def _check_on_path(self, pkg: Package) -> bool:
+        """Check for a package's executable on PATH"""
+        # Same answer as `which`, without blocking the event loop on a child
+        return shutil.which(pkg.package) is not None
+
+    async def _installed_set(self, manager: str) -> Set[str]:
+        """
+        Get every package a manager reports as installed
+
+        One listing replaces a subprocess per package, and the result is
+        reused for INSTALLED_CACHE_TTL seconds.
+        """
+        cached = self._installed_sets.get(manager)
+        if cached and time.monotonic() - cached[0] < self.INSTALLED_CACHE_TTL:
+            return cached[1]
+
+        installed: Set[str] = set()
 
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                timeout=5
+            process = await asyncio.create_subprocess_exec(
+                *self.INVENTORY_COMMANDS[manager],
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
             )
-            return result.returncode == 0
+            try:
+                stdout, _ = await asyncio.wait_for(process.communicate(), timeout=10)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise
+
+            lines = stdout.decode(errors='replace').splitlines()
+            if manager == 'apt':
+                # "ii  name" rows are the installed ones
+                installed = {line[4:] for line in lines if line.startswith('ii ')}
+            elif manager == 'snap':
+                installed = {line.split()[0] for line in lines[1:] if line.strip()}  # Skip header
+            else:
+                installed = {line.strip() for line in lines if line.strip()}
         except Exception:
-            return False
+            pass
+
+        self._installed_sets[manager] = (time.monotonic(), installed)
+        return installed
+
+    def _invalidate_installed(self, package_name: str):
+        """Forget cached installed state after installing or removing"""
+        self._installed_cache.pop(_normalize_name(package_name), None)
+        self._installed_sets.clear()
+
+    def _emit(self, event: Event) -> asyncio.Task:
+        """
+        Emit an event in the background so subscribers never hold up an install
+
+        Each emit waits for the one before it, so subscribers still see
+        events in the order they were raised.
+        """
+        previous = self._last_emit
+
+        async def emit_after_previous():
+            if previous is not None and not previous.done():
+                await asyncio.wait([previous])
+            await self.event_bus.emit(event)
+
+        task = asyncio.create_task(emit_after_previous())
+        self._last_emit = task
+        self._pending_emits.add(task)
+        task.add_done_callback(self._pending_emits.discard)
+        return task
+
+    async def drain_events(self):
+        """Wait for every background emit to finish"""
+        if self._pending_emits:
+            await asyncio.gather(*self._pending_emits, return_exceptions=True)
 
     async def install(self, package_name: str, dry_run: bool = False) -> Dict[str, Any]:
         """
@@ -172,7 +584,7 @@ class PackageInstaller:
         pkg = self.get_package(package_name)
 
         if not pkg:
-            await self.event_bus.emit(Event(
+            self._emit(Event(
                 type=EventType.INSTALL_FAILED,
                 data={
                     'app': package_name,
@@ -188,7 +600,7 @@ class PackageInstaller:
             return {'success': True, 'already_installed': True}
 
         # Emit install started event
-        await self.event_bus.emit(Event(
+        self._emit(Event(
             type=EventType.INSTALL_STARTED,
             data={
                 'app': pkg.name,
@@ -215,13 +627,15 @@ class PackageInstaller:
             result = await self._run_command(install_cmd, pkg.name)
 
             if result['success']:
+                self._invalidate_installed(package_name)
+
                 # Run post-install script if exists
                 if pkg.post_install:
                     print(f"  ⚙️  Running post-install script...")
                     await self._run_script(pkg.post_install, f"Post-install for {pkg.name}")
 
                 # Emit success event
-                await self.event_bus.emit(Event(
+                self._emit(Event(
                     type=EventType.INSTALL_COMPLETED,
                     data={
                         'app': pkg.name,
@@ -236,7 +650,7 @@ class PackageInstaller:
 
             else:
                 # Emit failure event
-                await self.event_bus.emit(Event(
+                self._emit(Event(
                     type=EventType.INSTALL_FAILED,
                     data={
                         'app': pkg.name,
@@ -250,7 +664,7 @@ class PackageInstaller:
         except Exception as e:
             error_msg = str(e)
 
-            await self.event_bus.emit(Event(
+            self._emit(Event(
                 type=EventType.INSTALL_FAILED,
                 data={
                     'app': pkg.name,
@@ -261,47 +675,193 @@ class PackageInstaller:
 
             return {'success': False, 'error': error_msg}
 
+    async def install_many(self, package_names: List[str],
+                           dry_run: bool = False) -> List[Any]:
+        """
+        Install several packages concurrently
+
+        Installs run in parallel, limited per package manager by
+        MANAGER_CONCURRENCY. Results come back in the order of
+        package_names; exceptions are returned rather than raised.
+        """
+        async def install_one(package_name: str):
+            async with self._semaphore_for(package_name):
+                return await self.install(package_name, dry_run=dry_run)
+
+        return await asyncio.gather(
+            *(install_one(name) for name in package_names),
+            return_exceptions=True
+        )
+
+    async def install_batch(self, package_names: List[str],
+                            dry_run: bool = False) -> List[Any]:
+        """
+        Install several packages with one package manager call per kind
+
+        Packages sharing a batch-capable command (brew, brew --cask, apt,
+        snap, dnf) go to their manager together, so it resolves and
+        downloads shared dependencies once. Packages with install scripts
+        or without a batch command go through install() individually.
+        If a batch fails, the manager's inventory shows which of its
+        packages made it; the rest are retried one at a time. Results
+        come back in the order of package_names, as with install_many().
+        """
+        results: List[Any] = [None] * len(package_names)
+        installed = await asyncio.gather(*(self.is_installed(name) for name in package_names))
+
+        batches: Dict[Tuple[str, ...], List[int]] = {}
+        singles: List[int] = []
+        for i, name in enumerate(package_names):
+            pkg = self.get_package(name)
+            if pkg and installed[i]:
+                print(f"  ℹ️  {pkg.name} is already installed")
+                results[i] = {'success': True, 'already_installed': True}
+                continue
+
+            builders = self._batch_install_commands
+            prefix = (builders.get(pkg.install_type) or builders.get(None)) if pkg else None
+            if prefix is None or pkg.pre_install or pkg.post_install:
+                singles.append(i)
+            else:
+                batches.setdefault(tuple(prefix), []).append(i)
+
+        async def install_one(i: int):
+            async with self._semaphore_for(package_names[i]):
+                results[i] = await self.install(package_names[i], dry_run=dry_run)
+
+        async def install_together(prefix: Tuple[str, ...], indices: List[int]):
+            if len(indices) == 1:
+                return await install_one(indices[0])
+
+            pkgs = [self.get_package(package_names[i]) for i in indices]
+            cmd = list(prefix) + [pkg.package for pkg in pkgs]
+
+            for pkg in pkgs:
+                self._emit(Event(
+                    type=EventType.INSTALL_STARTED,
+                    data={
+                        'app': pkg.name,
+                        'package': pkg.package,
+                        'category': pkg.category
+                    },
+                    source='installer'
+                ))
+
+            if dry_run:
+                print(f"  🔍 Would run: {' '.join(cmd)}")
+                for i in indices:
+                    results[i] = {'success': True, 'dry_run': True, 'command': cmd}
+                return
+
+            print(f"  ⬇️  Installing {', '.join(pkg.name for pkg in pkgs)}...")
+            async with self._manager_semaphore(_command_manager(cmd)):
+                result = await self._run_command(cmd, ', '.join(pkg.name for pkg in pkgs))
+
+            for i in indices:
+                self._invalidate_installed(package_names[i])
+
+            retry = []
+            for i, pkg in zip(indices, pkgs):
+                if result['success'] or await self.is_installed(package_names[i]):
+                    self._emit(Event(
+                        type=EventType.INSTALL_COMPLETED,
+                        data={
+                            'app': pkg.name,
+                            'package': pkg.package,
+                            'success': True
+                        },
+                        source='installer'
+                    ))
+                    print(f"  ✅ {pkg.name} installed successfully")
+                    results[i] = {'success': True, 'package': pkg.name}
+                else:
+                    retry.append(i)
+
+            await asyncio.gather(*(install_one(i) for i in retry))
+
+        outcomes = await asyncio.gather(
+            *(install_together(prefix, indices) for prefix, indices in batches.items()),
+            *(install_one(i) for i in singles),
+            return_exceptions=True
+        )
+
+        # A batch that raised reports its exception for each of its packages
+        groups = list(batches.values()) + [[i] for i in singles]
+        for indices, outcome in zip(groups, outcomes):
+            if isinstance(outcome, Exception):
+                for i in indices:
+                    if results[i] is None:
+                        results[i] = outcome
+
+        return results
+
+    def _semaphore_for(self, package_name: str) -> asyncio.Semaphore:
+        """Get the concurrency limiter for a package's manager"""
+        pkg = self.get_package(package_name)
+        manager = 'unknown'
+        if pkg:
+            cmd = self._build_install_command(pkg)
+            if cmd:
+                manager = _command_manager(cmd)
+
+        return self._manager_semaphore(manager)
+
+    def _manager_semaphore(self, manager: str) -> asyncio.Semaphore:
+        """Get the concurrency limiter for a package manager"""
+        semaphore = self._manager_semaphores.get(manager)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.MANAGER_CONCURRENCY.get(manager, 1))
+            self._manager_semaphores[manager] = semaphore
+        return semaphore
+
     def _build_install_command(self, pkg: Package) -> List[str]:
         """Build installation command based on platform and package type"""
-        if self.platform_info['os'] == 'Darwin':  # macOS
-            if pkg.install_type == 'cask':
-                return ['brew', 'install', '--cask', pkg.package]
-            else:
-                return ['brew', 'install', pkg.package]
-
-        elif self.platform_info['os'] == 'Linux':
-            if pkg.install_type == 'apt':
-                return ['sudo', 'apt-get', 'install', '-y', pkg.package]
-            elif pkg.install_type == 'snap':
-                return ['sudo', 'snap', 'install', pkg.package]
-            elif pkg.install_type == 'dnf':
-                return ['sudo', 'dnf', 'install', '-y', pkg.package]
-            else:
-                return ['brew', 'install', pkg.package]
+        return _build_command(self._install_commands, pkg)
+
+    def _command_env(self, cmd: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Environment for a package manager command (None to inherit)
 
-        else:  # Windows
-            if pkg.install_type == 'winget':
-                return ['winget', 'install', pkg.package, '-e']
-            elif pkg.install_type == 'choco':
-                return ['choco', 'install', pkg.package, '-y']
+        Homebrew refreshes its taps before every install, which costs far
+        more than the install itself on a warm system. Let the first brew
+        command of this installer do that, and skip it for the rest.
+        """
+        if not cmd or cmd[0] != 'brew':
+            return None
 
-        return []
+        if not self._brew_refreshed:
+            self._brew_refreshed = True
+            return None
+
+        return {**os.environ, 'HOMEBREW_NO_AUTO_UPDATE': '1'}
+
+    async def _read_tail(self, stream: asyncio.StreamReader) -> bytes:
+        """Drain a stream, keeping only its last STDERR_TAIL_BYTES bytes"""
+        tail = b''
+        while True:
+            chunk = await stream.read(self.STDERR_TAIL_BYTES)
+            if not chunk:
+                return tail
+            tail = (tail + chunk)[-self.STDERR_TAIL_BYTES:]
 
     async def _run_command(self, cmd: List[str], app_name: str) -> Dict[str, Any]:
         """Run installation command asynchronously"""
         try:
+            # stdout is never used, so it is not captured at all
             process = await asyncio.create_subprocess_exec(
                 *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                env=self._command_env(cmd)
             )
 
-            stdout, stderr = await process.communicate()
+            stderr = await self._read_tail(process.stderr)
+            await process.wait()
 
             if process.returncode == 0:
                 return {'success': True}
             else:
-                error = stderr.decode() if stderr else 'Unknown error'
+                error = stderr.decode(errors='replace') if stderr else 'Unknown error'
                 return {'success': False, 'error': error}
 
         except Exception as e:
@@ -312,10 +872,10 @@ class PackageInstaller:
         try:
             process = await asyncio.create_subprocess_shell(
                 script,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
             )
-            await process.communicate()
+            await process.wait()
         except Exception as e:
             print(f"  ⚠️  Warning: {description} failed: {e}")
 
@@ -332,7 +892,7 @@ class PackageInstaller:
             return {'success': True, 'not_installed': True}
 
         # Emit uninstall started event
-        await self.event_bus.emit(Event(
+        self._emit(Event(
             type=EventType.UNINSTALL_STARTED,
             data={'app': pkg.name},
             source='installer'
@@ -340,20 +900,16 @@ class PackageInstaller:
 
         try:
             # Build uninstall command
-            if self.platform_info['os'] == 'Darwin':
-                if pkg.install_type == 'cask':
-                    cmd = ['brew', 'uninstall', '--cask', pkg.package]
-                else:
-                    cmd = ['brew', 'uninstall', pkg.package]
-            else:
-                # TODO: Add Linux/Windows uninstall commands
+            cmd = _build_command(self._uninstall_commands, pkg)
+            if not cmd:
                 return {'success': False, 'error': 'Uninstall not yet supported on this platform'}
 
             print(f"  🗑️  Uninstalling {pkg.name}...")
             result = await self._run_command(cmd, pkg.name)
 
             if result['success']:
-                await self.event_bus.emit(Event(
+                self._invalidate_installed(package_name)
+                self._emit(Event(
                     type=EventType.UNINSTALL_COMPLETED,
                     data={'app': pkg.name},
                     source='installer'
@@ -363,7 +919,7 @@ class PackageInstaller:
             return result
 
         except Exception as e:
-            await self.event_bus.emit(Event(
+            self._emit(Event(
                 type=EventType.UNINSTALL_FAILED,
                 data={'app': pkg.name, 'error': str(e)},
                 source='installer'
@@ -378,7 +934,7 @@ class PackageInstaller:
             return {'success': False, 'error': 'Package not found'}
 
         # Emit update started event
-        await self.event_bus.emit(Event(
+        self._emit(Event(
             type=EventType.UPDATE_STARTED,
             data={'app': pkg.name},
             source='installer'
@@ -386,17 +942,15 @@ class PackageInstaller:
 
         try:
             # Build update command
-            if self.platform_info['os'] == 'Darwin':
-                cmd = ['brew', 'upgrade', pkg.package]
-            else:
-                # TODO: Add Linux/Windows update commands
+            cmd = _build_command(self._update_commands, pkg)
+            if not cmd:
                 return {'success': False, 'error': 'Update not yet supported on this platform'}
 
             print(f"  ⬆️  Updating {pkg.name}...")
             result = await self._run_command(cmd, pkg.name)
 
             if result['success']:
-                await self.event_bus.emit(Event(
+                self._emit(Event(
                     type=EventType.UPDATE_COMPLETED,
                     data={'app': pkg.name},
                     source='installer'
@@ -406,7 +960,7 @@ class PackageInstaller:
             return result
 
         except Exception as e:
-            await self.event_bus.emit(Event(
+            self._emit(Event(
                 type=EventType.UPDATE_FAILED,
                 data={'app': pkg.name, 'error': str(e)},
                 source='installer'
@@ -7,14 +7,23 @@ Robust detection of operating systems, including WSL2 on Windows 11
 import os
 import platform
 import re
-import subprocess
+import shlex
+import shutil
 import sys
+import threading
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 from typing import Optional, Dict, Any
 
 
+# Leading "major.minor" of a kernel release string
+_KERNEL_VERSION_RE = re.compile(r"(\d+)\.(\d+)")
+
+# Present once Rosetta 2 has been installed on Apple Silicon
+ROSETTA_RUNTIME_DIR = "/Library/Apple/usr/libexec/oah"
+
+
 class PlatformType(Enum):
     """Supported platform types"""
     MACOS = "macos"
@@ -34,6 +43,17 @@ class Architecture(Enum):
     UNKNOWN = "unknown"
 
 
+# Map various architecture names to our enum
+_ARCH_MAP = {
+    "x86_64": Architecture.X86_64,
+    "amd64": Architecture.X86_64,
+    "arm64": Architecture.ARM64,
+    "aarch64": Architecture.AARCH64,
+    "i386": Architecture.I386,
+    "i686": Architecture.I386,
+}
+
+
 @dataclass
 class PlatformInfo:
     """Complete platform information"""
@@ -62,47 +82,68 @@ class PlatformDetector:
     - Linux distribution detection improvements
     """
 
+    @staticmethod
+    def _read_file(path: str) -> Optional[str]:
+        """
+        Read a small system file, or None if it is missing or unreadable
+
+        Opening directly costs one syscall where checking exists() first
+        costs two, and binary mode skips the text layer's extra setup.
+        """
+        try:
+            with open(path, "rb") as f:
+                return f.read().decode("utf-8", "ignore")
+        except OSError:
+            return None
+
+    @staticmethod
+    def _file_contains(path: str, needles: tuple, limit: int = -1) -> bool:
+        """
+        Check whether a file contains any of the given byte strings
+
+        procfs files report a size of zero and cannot be mmapped, so this
+        reads the raw bytes in one call and searches them without decoding.
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read(limit)
+        except OSError:
+            return False
+        return any(needle in data for needle in needles)
+
     @staticmethod
     def detect() -> PlatformInfo:
         """Main detection entry point"""
+        # Query the system once and hand the result to every probe
+        uname = platform.uname()
+
         # Detect architecture first
-        arch = PlatformDetector._detect_architecture()
+        arch = PlatformDetector._detect_architecture(uname.machine)
 
         # Detect platform type
-        system = platform.system().lower()
+        system = uname.system.lower()
 
         if system == "darwin":
-            return PlatformDetector._detect_macos(arch)
+            return PlatformDetector._detect_macos(arch, uname)
         elif system == "linux":
-            return PlatformDetector._detect_linux(arch)
+            return PlatformDetector._detect_linux(arch, uname)
         elif system == "windows":
-            return PlatformDetector._detect_windows(arch)
+            return PlatformDetector._detect_windows(arch, uname)
         else:
             return PlatformInfo(
                 platform_type=PlatformType.UNKNOWN,
                 architecture=arch,
-                os_version=platform.version()
+                os_version=uname.version
             )
 
     @staticmethod
-    def _detect_architecture() -> Architecture:
+    def _detect_architecture(machine: Optional[str] = None) -> Architecture:
         """Detect CPU architecture"""
-        machine = platform.machine().lower()
-
-        # Map various architecture names to our enum
-        arch_map = {
-            "x86_64": Architecture.X86_64,
-            "amd64": Architecture.X86_64,
-            "arm64": Architecture.ARM64,
-            "aarch64": Architecture.AARCH64,
-            "i386": Architecture.I386,
-            "i686": Architecture.I386,
-        }
-
-        return arch_map.get(machine, Architecture.UNKNOWN)
+        machine = (machine if machine is not None else platform.machine()).lower()
+        return _ARCH_MAP.get(machine, Architecture.UNKNOWN)
 
     @staticmethod
-    def _detect_macos(arch: Architecture) -> PlatformInfo:
+    def _detect_macos(arch: Architecture, uname: platform.uname_result) -> PlatformInfo:
         """Detect macOS version and features"""
         try:
             # Get macOS version
@@ -117,23 +158,16 @@ class PlatformDetector:
                 "can_run_rosetta": is_apple_silicon
             }
 
-            # Check if Rosetta 2 is installed (for Apple Silicon)
+            # Check if Rosetta 2 is installed (for Apple Silicon); its runtime
+            # directory answers with one stat instead of spawning pgrep
             if is_apple_silicon:
-                try:
-                    result = subprocess.run(
-                        ["/usr/bin/pgrep", "oahd"],
-                        capture_output=True,
-                        timeout=2
-                    )
-                    additional_info["rosetta_installed"] = result.returncode == 0
-                except:
-                    additional_info["rosetta_installed"] = False
+                additional_info["rosetta_installed"] = os.path.isdir(ROSETTA_RUNTIME_DIR)
 
             return PlatformInfo(
                 platform_type=PlatformType.MACOS,
                 architecture=arch,
                 os_version=version,
-                kernel_version=platform.release(),
+                kernel_version=uname.release,
                 additional_info=additional_info
             )
         except Exception as e:
@@ -145,120 +179,73 @@ class PlatformDetector:
             )
 
     @staticmethod
-    def _detect_linux(arch: Architecture) -> PlatformInfo:
+    def _detect_linux(arch: Architecture, uname: platform.uname_result) -> PlatformInfo:
         """
         Detect Linux distribution and check for WSL
 
         CRITICAL FIX: Multiple WSL2 detection methods
         """
         # First, check if we're in WSL
-        is_wsl, wsl_version = PlatformDetector._detect_wsl()
+        is_wsl, wsl_version = PlatformDetector._detect_wsl(uname.release)
 
         if is_wsl:
-            return PlatformDetector._detect_wsl_details(arch, wsl_version)
+            return PlatformDetector._detect_wsl_details(arch, wsl_version, uname)
 
         # Regular Linux detection
-        return PlatformDetector._detect_linux_distro(arch)
+        return PlatformDetector._detect_linux_distro(arch, uname)
 
     @staticmethod
-    def _detect_wsl() -> tuple[bool, Optional[int]]:
+    def _detect_wsl(kernel_release: Optional[str] = None) -> tuple[bool, Optional[int]]:
         """
         Detect WSL with multiple fallback methods
 
         CRITICAL FIX for WSL2 detection on Windows 11
-        This checks multiple indicators instead of relying on a single registry key
+        Probes run cheapest and most definitive first and return as soon
+        as one answers, following snapd's detection order.
         """
-        wsl_indicators = []
-
-        # Method 1: Check /proc/version for WSL/Microsoft
-        try:
-            if Path("/proc/version").exists():
-                with open("/proc/version", "r") as f:
-                    proc_version = f.read().lower()
-                    if "microsoft" in proc_version or "wsl" in proc_version:
-                        wsl_indicators.append("proc_version")
-                        # WSL2 uses a Microsoft kernel
-                        if "microsoft" in proc_version and "wsl2" in proc_version:
-                            return True, 2
-        except:
-            pass
+        # Method 1: WSL2 registers its interop handler with binfmt_misc
+        if os.path.exists("/proc/sys/fs/binfmt_misc/WSLInterop"):
+            return True, 2
 
-        # Method 2: Check kernel version
-        try:
-            kernel = platform.release().lower()
-            if "microsoft" in kernel or "wsl" in kernel:
-                wsl_indicators.append("kernel")
-        except:
-            pass
+        # Method 2: /run/WSL only exists under WSL2
+        if os.path.exists("/run/WSL"):
+            return True, 2
 
-        # Method 3: Check for WSL-specific environment variable
-        if os.getenv("WSL_DISTRO_NAME"):
-            wsl_indicators.append("env_var")
+        kernel_release = (
+            PlatformDetector._read_file("/proc/sys/kernel/osrelease")
+            or kernel_release
+            or platform.release()
+        ).lower()
 
-        # Method 4: Check /proc/sys/kernel/osrelease
-        try:
-            osrelease_path = Path("/proc/sys/kernel/osrelease")
-            if osrelease_path.exists():
-                with open(osrelease_path, "r") as f:
-                    osrelease = f.read().lower()
-                    if "microsoft" in osrelease or "wsl" in osrelease:
-                        wsl_indicators.append("osrelease")
-        except:
-            pass
+        # Method 3: WSL sets WSL_DISTRO_NAME; the kernel tells the versions apart
+        if "WSL_DISTRO_NAME" in os.environ:
+            return True, PlatformDetector._wsl_version_from_kernel(kernel_release)
 
-        # Method 5: Check for /run/WSL directory (WSL2 specific)
-        if Path("/run/WSL").exists():
-            wsl_indicators.append("run_wsl")
-            return True, 2
+        # Method 4: Microsoft builds every WSL kernel
+        if "microsoft" in kernel_release or "wsl" in kernel_release:
+            return True, PlatformDetector._wsl_version_from_kernel(kernel_release)
 
-        # Method 6: Check for wsl.exe or wslhost.exe presence
-        try:
-            # In WSL, we can access Windows executables
-            result = subprocess.run(
-                ["which", "wsl.exe"],
-                capture_output=True,
-                timeout=2
-            )
-            if result.returncode == 0:
-                wsl_indicators.append("wsl_exe")
-        except:
-            pass
+        return False, None
 
-        # Method 7: Check /proc/sys/fs/binfmt_misc/WSLInterop (WSL2)
-        if Path("/proc/sys/fs/binfmt_misc/WSLInterop").exists():
-            wsl_indicators.append("binfmt_misc")
-            return True, 2
+    @staticmethod
+    def _wsl_version_from_kernel(kernel_release: str) -> int:
+        """Tell WSL2's real Linux kernel from WSL1's emulated one"""
+        # WSL2 kernels are "...-microsoft-standard-WSL2"; WSL1 reports "...-Microsoft"
+        if "wsl2" in kernel_release or "microsoft-standard" in kernel_release:
+            return 2
 
-        # Determine if we're in WSL based on indicators
-        if len(wsl_indicators) >= 2:
-            # If we have 2+ indicators, we're definitely in WSL
-            # Try to determine version
-
-            # Check for WSL2-specific indicators
-            wsl2_indicators = {"run_wsl", "binfmt_misc"}
-            if any(indicator in wsl2_indicators for indicator in wsl_indicators):
-                return True, 2
-
-            # Check kernel version for WSL2 (uses native Linux kernel 4.19+)
-            try:
-                kernel_version = platform.release()
-                version_match = re.search(r"(\d+)\.(\d+)", kernel_version)
-                if version_match:
-                    major, minor = int(version_match.group(1)), int(version_match.group(2))
-                    if major >= 4 and minor >= 19:
-                        return True, 2  # Likely WSL2
-                    else:
-                        return True, 1  # Likely WSL1
-            except:
-                pass
-
-            # Default to WSL1 if we can't determine
-            return True, 1
+        # WSL2 ships a native Linux kernel 4.19+
+        version_match = _KERNEL_VERSION_RE.search(kernel_release)
+        if version_match:
+            major, minor = int(version_match.group(1)), int(version_match.group(2))
+            if (major, minor) >= (4, 19):
+                return 2
 
-        return False, None
+        return 1
 
     @staticmethod
-    def _detect_wsl_details(arch: Architecture, wsl_version: Optional[int]) -> PlatformInfo:
+    def _detect_wsl_details(arch: Architecture, wsl_version: Optional[int],
+                            uname: platform.uname_result) -> PlatformInfo:
         """Get detailed WSL information"""
         # Get Linux distribution info
         distro_name, distro_version = PlatformDetector._get_linux_distro_info()
@@ -274,17 +261,17 @@ class PlatformDetector:
         return PlatformInfo(
             platform_type=platform_type,
             architecture=arch,
-            os_version=platform.version(),
+            os_version=uname.version,
             distribution=distro_name,
             distribution_version=distro_version,
-            kernel_version=platform.release(),
+            kernel_version=uname.release,
             is_virtual=True,
             wsl_version=wsl_version,
             additional_info=additional_info
         )
 
     @staticmethod
-    def _detect_linux_distro(arch: Architecture) -> PlatformInfo:
+    def _detect_linux_distro(arch: Architecture, uname: platform.uname_result) -> PlatformInfo:
         """Detect Linux distribution details"""
         distro_name, distro_version = PlatformDetector._get_linux_distro_info()
 
@@ -299,10 +286,10 @@ class PlatformDetector:
         return PlatformInfo(
             platform_type=PlatformType.LINUX,
             architecture=arch,
-            os_version=platform.version(),
+            os_version=uname.version,
             distribution=distro_name,
             distribution_version=distro_version,
-            kernel_version=platform.release(),
+            kernel_version=uname.release,
             is_virtual=is_virtual,
             additional_info=additional_info
         )
@@ -315,25 +302,23 @@ class PlatformDetector:
         Uses multiple methods for better compatibility
         """
         # Method 1: /etc/os-release (most common)
+        # The file uses shell syntax, so shlex gets quoting and comments right
+        content = PlatformDetector._read_file("/etc/os-release")
         try:
-            if Path("/etc/os-release").exists():
-                with open("/etc/os-release", "r") as f:
-                    os_release = {}
-                    for line in f:
-                        if "=" in line:
-                            key, value = line.strip().split("=", 1)
-                            os_release[key] = value.strip('"')
-
-                    name = os_release.get("NAME") or os_release.get("ID")
-                    version = os_release.get("VERSION_ID") or os_release.get("VERSION")
-
-                    if name:
-                        return name, version
-        except:
-            pass
+            tokens = shlex.split(content, comments=True) if content else []
+        except ValueError:
+            tokens = []  # Unbalanced quotes; try the other methods
+
+        os_release = dict(token.split("=", 1) for token in tokens if "=" in token)
+        name = os_release.get("NAME") or os_release.get("ID")
+        version = os_release.get("VERSION_ID") or os_release.get("VERSION")
+
+        if name:
+            return name, version
 
         # Method 2: lsb_release command
         try:
+            import subprocess  # Only needed when the files above are missing
             result = subprocess.run(
                 ["lsb_release", "-a"],
                 capture_output=True,
@@ -363,55 +348,38 @@ class PlatformDetector:
         ]
 
         for release_file in release_files:
-            try:
-                if Path(release_file).exists():
-                    with open(release_file, "r") as f:
-                        content = f.read().strip()
-                        # Extract distribution name from file path
-                        distro = Path(release_file).stem.replace("-release", "").replace("_version", "")
-                        return distro.capitalize(), content
-            except:
-                continue
+            content = PlatformDetector._read_file(release_file)
+            if content is not None:
+                # Extract distribution name from file path
+                distro = Path(release_file).stem.replace("-release", "").replace("_version", "")
+                return distro.capitalize(), content.strip()
 
         return None, None
 
+    # Package managers looked for on PATH, in reporting order
+    PACKAGE_MANAGERS = ("apt", "dnf", "yum", "pacman", "zypper", "apk", "brew", "snap", "flatpak")
+
     @staticmethod
     def _detect_package_managers() -> list[str]:
         """Detect available package managers"""
-        managers = []
-
-        # Common package managers to check
-        pm_commands = {
-            "apt": ["apt", "--version"],
-            "dnf": ["dnf", "--version"],
-            "yum": ["yum", "--version"],
-            "pacman": ["pacman", "--version"],
-            "zypper": ["zypper", "--version"],
-            "apk": ["apk", "--version"],
-            "brew": ["brew", "--version"],
-            "snap": ["snap", "--version"],
-            "flatpak": ["flatpak", "--version"]
-        }
-
-        for pm_name, pm_cmd in pm_commands.items():
-            try:
-                result = subprocess.run(
-                    pm_cmd,
-                    capture_output=True,
-                    timeout=2
-                )
-                if result.returncode == 0:
-                    managers.append(pm_name)
-            except:
-                pass
-
-        return managers
+        # A PATH lookup is a few stats; running each with --version was a process apiece
+        return [pm for pm in PlatformDetector.PACKAGE_MANAGERS if shutil.which(pm)]
 
     @staticmethod
     def _check_virtualization() -> bool:
         """Check if running in a virtual environment"""
-        # Check systemd-detect-virt
+        # Check the hypervisor CPU flag; the first processor's block, which
+        # holds its flags line, fits well inside the first 8 KB
+        if PlatformDetector._file_contains("/proc/cpuinfo", (b"hypervisor",), limit=8192):
+            return True
+
+        # Xen and some other hypervisors announce themselves here
+        if os.path.exists("/sys/hypervisor/type"):
+            return True
+
+        # Only spawn systemd-detect-virt when the files were inconclusive
         try:
+            import subprocess
             result = subprocess.run(
                 ["systemd-detect-virt"],
                 capture_output=True,
@@ -424,15 +392,6 @@ class PlatformDetector:
         except:
             pass
 
-        # Check /proc/cpuinfo for hypervisor flag
-        try:
-            with open("/proc/cpuinfo", "r") as f:
-                for line in f:
-                    if "hypervisor" in line.lower():
-                        return True
-        except:
-            pass
-
         return False
 
     @staticmethod
@@ -443,21 +402,13 @@ class PlatformDetector:
             return True
 
         # Check /proc/1/cgroup
-        try:
-            with open("/proc/1/cgroup", "r") as f:
-                content = f.read()
-                if "docker" in content or "lxc" in content or "kubepods" in content:
-                    return True
-        except:
-            pass
-
-        return False
+        return PlatformDetector._file_contains("/proc/1/cgroup", (b"docker", b"lxc", b"kubepods"))
 
     @staticmethod
-    def _detect_windows(arch: Architecture) -> PlatformInfo:
+    def _detect_windows(arch: Architecture, uname: platform.uname_result) -> PlatformInfo:
         """Detect Windows version"""
-        version = platform.version()
-        release = platform.release()
+        version = uname.version
+        release = uname.release
 
         additional_info = {
             "release": release,
@@ -472,40 +423,66 @@ class PlatformDetector:
         )
 
 
+# The platform cannot change while the process runs, so detect it once
+_platform_info: Optional[PlatformInfo] = None
+_platform_type: Optional[PlatformType] = None
+_platform_lock = threading.Lock()
+
+_WSL_TYPES = frozenset((PlatformType.WSL1, PlatformType.WSL2))
+
+
 # Convenience functions
 def get_platform() -> PlatformInfo:
-    """Get current platform information"""
-    return PlatformDetector.detect()
+    """Get current platform information (detected once per process)"""
+    global _platform_info
+    if _platform_info is None:
+        with _platform_lock:
+            if _platform_info is None:
+                _platform_info = PlatformDetector.detect()
+    return _platform_info
+
+
+def invalidate_platform_cache():
+    """Forget the detected platform so the next get_platform() detects again"""
+    global _platform_info, _platform_type
+    with _platform_lock:
+        _platform_info = None
+        _platform_type = None
+
+
+def _get_platform_type() -> PlatformType:
+    """Platform type alone, for the is_* predicates"""
+    global _platform_type
+    if _platform_type is None:
+        _platform_type = get_platform().platform_type
+    return _platform_type
 
 
 def is_wsl() -> bool:
     """Check if running in WSL"""
-    platform_info = get_platform()
-    return platform_info.platform_type in (PlatformType.WSL1, PlatformType.WSL2)
+    return _get_platform_type() in _WSL_TYPES
 
 
 def is_wsl2() -> bool:
     """Check if running in WSL2"""
-    platform_info = get_platform()
-    return platform_info.platform_type == PlatformType.WSL2
+    return _get_platform_type() is PlatformType.WSL2
 
 
 def is_macos() -> bool:
     """Check if running on macOS"""
-    return get_platform().platform_type == PlatformType.MACOS
+    return _get_platform_type() is PlatformType.MACOS
 
 
 def is_linux() -> bool:
     """Check if running on Linux (not WSL)"""
-    return get_platform().platform_type == PlatformType.LINUX
+    return _get_platform_type() is PlatformType.LINUX
 
 
 def is_apple_silicon() -> bool:
     """Check if running on Apple Silicon"""
-    platform_info = get_platform()
-    if platform_info.platform_type == PlatformType.MACOS:
-        return platform_info.additional_info.get("is_apple_silicon", False)
-    return False
+    if _get_platform_type() is not PlatformType.MACOS:
+        return False
+    return get_platform().additional_info.get("is_apple_silicon", False)
 
 
 if __name__ == "__main__":
@@ -5,13 +5,13 @@ Enables extensibility and third-party integrations
 """
 
 import asyncio
-import importlib.util
-import inspect
 import logging
+import os
 import sys
 from abc import ABC, abstractmethod
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 
 from .event_system import EventBus, Event, EventType, get_event_bus
 
@@ -35,7 +35,12 @@ class Plugin(ABC):
         self.author: str = "Unknown"
         self.description: str = "No description provided"
         self.event_bus: Optional[EventBus] = None
-        self._registered_handlers: List[tuple] = []
+        self._registered_handlers: Dict[EventType, List[Callable]] = defaultdict(list)
+
+        # Set by PluginManager when loaded from a file, for reloading
+        self._source_path: Optional[Path] = None
+        self._module_name: Optional[str] = None
+        self._config: Dict[str, Any] = {}
 
     @abstractmethod
     async def on_load(self, event_bus: EventBus, config: Dict[str, Any]):
@@ -60,7 +65,7 @@ class Plugin(ABC):
         """Helper to register event handler and track it"""
         if self.event_bus:
             self.event_bus.on(event_type, handler)
-            self._registered_handlers.append((event_type, handler))
+            self._registered_handlers[event_type].append(handler)
 
     async def emit_event(self, event: Event):
         """Helper to emit events"""
@@ -68,9 +73,13 @@ class Plugin(ABC):
             await self.event_bus.emit(event)
 
     def get_config_dir(self) -> Path:
-        """Get plugin's configuration directory"""
-        config_dir = Path.home() / ".koalas-forge" / "plugins" / self.name
-        config_dir.mkdir(parents=True, exist_ok=True)
+        """Get plugin's configuration directory, creating it on first use"""
+        # getattr: subclasses are not required to call Plugin.__init__
+        config_dir = getattr(self, '_config_dir', None)
+        if config_dir is None:
+            config_dir = Path.home() / ".koalas-forge" / "plugins" / self.name
+            config_dir.mkdir(parents=True, exist_ok=True)
+            self._config_dir = config_dir
         return config_dir
 
     def log_info(self, message: str):
@@ -107,17 +116,21 @@ class PluginManager:
         """
         plugin_files = []
 
-        # Look for .py files
-        for plugin_file in self.plugin_dir.glob("*.py"):
-            if not plugin_file.name.startswith("_"):
-                plugin_files.append(plugin_file)
+        # One directory pass; entry types come with the listing, no stat needed
+        with os.scandir(self.plugin_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith("_"):
+                    continue
+
+                # Look for .py files
+                if entry.name.endswith(".py") and entry.is_file():
+                    plugin_files.append(Path(entry.path))
 
-        # Look for plugin directories with __init__.py
-        for plugin_dir in self.plugin_dir.iterdir():
-            if plugin_dir.is_dir() and not plugin_dir.name.startswith("_"):
-                init_file = plugin_dir / "__init__.py"
-                if init_file.exists():
-                    plugin_files.append(init_file)
+                # Look for plugin directories with __init__.py
+                elif entry.is_dir():
+                    init_file = Path(entry.path) / "__init__.py"
+                    if init_file.exists():
+                        plugin_files.append(init_file)
 
         logger.info(f"Found {len(plugin_files)} plugin(s)")
         return plugin_files
@@ -133,64 +146,104 @@ class PluginManager:
         Returns:
             True if loaded successfully
         """
+        return await self._load_plugin(plugin_path, config) is not None
+
+    async def _load_plugin(self, plugin_path: Path, config: Optional[Dict[str, Any]] = None,
+                           announce: bool = True) -> Optional[Plugin]:
+        """Load a plugin file, returning the started plugin or None on failure"""
+        # Only needed once a plugin is actually loaded
+        import importlib.util
+
         try:
-            # Load module
-            module_name = f"koalas_forge_plugin_{plugin_path.stem}"
+            # Load module; package plugins are named after their directory
+            stem = plugin_path.parent.name if plugin_path.stem == "__init__" else plugin_path.stem
+            module_name = f"koalas_forge_plugin_{stem}"
             spec = importlib.util.spec_from_file_location(module_name, plugin_path)
 
             if spec is None or spec.loader is None:
                 logger.error(f"Failed to load plugin spec: {plugin_path}")
-                return False
+                return None
 
             module = importlib.util.module_from_spec(spec)
             sys.modules[module_name] = module
-            spec.loader.exec_module(module)
 
-            # Find Plugin class
-            plugin_class = None
-            for name, obj in inspect.getmembers(module):
-                if (inspect.isclass(obj) and
+            # Compiling and running the module is blocking work; do it in a
+            # thread so other plugins keep loading meanwhile
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, spec.loader.exec_module, module)
+
+            return await self._start_plugin(module, plugin_path, config, announce)
+
+        except Exception as e:
+            await self._report_load_error(plugin_path, e)
+            return None
+
+    async def _start_plugin(self, module, plugin_path: Path, config: Optional[Dict[str, Any]],
+                            announce: bool = True) -> Optional[Plugin]:
+        """
+        Instantiate, load and register the Plugin class found in a module
+
+        With announce off, no PLUGIN_LOADED event is emitted; the caller
+        reports the plugin some other way.
+        """
+        # Find Plugin class: an explicit PLUGIN_CLASS wins, otherwise the
+        # first subclass in the module's namespace (no sorted dir() walk)
+        plugin_class = getattr(module, "PLUGIN_CLASS", None)
+        if plugin_class is None:
+            for obj in vars(module).values():
+                if (isinstance(obj, type) and
                     issubclass(obj, Plugin) and
                     obj is not Plugin):
                     plugin_class = obj
                     break
 
-            if plugin_class is None:
-                logger.error(f"No Plugin class found in {plugin_path}")
-                return False
+        if plugin_class is None:
+            logger.error(f"No Plugin class found in {plugin_path}")
+            return None
 
-            # Instantiate plugin
-            plugin = plugin_class()
-            plugin.event_bus = self.event_bus
+        # Instantiate plugin
+        plugin = plugin_class()
+        plugin.event_bus = self.event_bus
 
-            # Load plugin
-            await plugin.on_load(self.event_bus, config or {})
+        # Remember where it came from so it can be reloaded in place
+        plugin._source_path = plugin_path
+        plugin._module_name = module.__name__
+        plugin._config = config or {}
 
-            # Register plugin
-            self.plugins[plugin.name] = plugin
+        # Load plugin
+        await plugin.on_load(self.event_bus, plugin._config)
 
-            # Emit event
+        # Register plugin
+        self.plugins[plugin.name] = plugin
+
+        # Emit event
+        if announce:
             await self.event_bus.emit(Event(
                 type=EventType.PLUGIN_LOADED,
-                data={
-                    'name': plugin.name,
-                    'version': plugin.version,
-                    'author': plugin.author
-                },
+                data=self._plugin_metadata(plugin),
                 source='plugin_manager'
             ))
 
-            logger.info(f"✅ Loaded plugin: {plugin.name} v{plugin.version}")
-            return True
-
-        except Exception as e:
-            logger.error(f"Failed to load plugin {plugin_path}: {e}")
-            await self.event_bus.emit(Event(
-                type=EventType.PLUGIN_ERROR,
-                data={'plugin': str(plugin_path), 'error': str(e)},
-                source='plugin_manager'
-            ))
-            return False
+        logger.info(f"✅ Loaded plugin: {plugin.name} v{plugin.version}")
+        return plugin
+
+    @staticmethod
+    def _plugin_metadata(plugin: Plugin) -> Dict[str, str]:
+        """Name, version and author of a plugin, as carried by load events"""
+        return {
+            'name': plugin.name,
+            'version': plugin.version,
+            'author': plugin.author
+        }
+
+    async def _report_load_error(self, plugin_path: Path, error: Exception):
+        """Log and announce a plugin that failed to load"""
+        logger.error(f"Failed to load plugin {plugin_path}: {error}")
+        await self.event_bus.emit(Event(
+            type=EventType.PLUGIN_ERROR,
+            data={'plugin': str(plugin_path), 'error': str(error)},
+            source='plugin_manager'
+        ))
 
     async def unload_plugin(self, plugin_name: str) -> bool:
         """
@@ -209,9 +262,10 @@ class PluginManager:
         try:
             plugin = self.plugins[plugin_name]
 
-            # Unregister event handlers
-            for event_type, handler in plugin._registered_handlers:
-                self.event_bus.off(event_type, handler)
+            # Unregister event handlers, one pass per event type
+            for event_type, handlers in plugin._registered_handlers.items():
+                self.event_bus.off_many(event_type, handlers)
+            plugin._registered_handlers.clear()
 
             # Call plugin cleanup
             await plugin.on_unload()
@@ -237,8 +291,19 @@ class PluginManager:
         """Discover and load all available plugins"""
         plugin_files = await self.discover_plugins()
 
-        for plugin_file in plugin_files:
-            await self.load_plugin(plugin_file)
+        # Plugins load concurrently; each reports its own failures
+        results = await asyncio.gather(
+            *(self._load_plugin(plugin_file, announce=False) for plugin_file in plugin_files),
+            return_exceptions=True
+        )
+
+        # One event for the whole batch instead of one per plugin
+        loaded = [plugin for plugin in results if isinstance(plugin, Plugin)]
+        await self.event_bus.emit(Event(
+            type=EventType.PLUGINS_LOADED,
+            data={'plugins': [self._plugin_metadata(plugin) for plugin in loaded]},
+            source='plugin_manager'
+        ))
 
     async def reload_plugin(self, plugin_name: str) -> bool:
         """
@@ -254,12 +319,29 @@ class PluginManager:
             logger.warning(f"Plugin not loaded: {plugin_name}")
             return False
 
-        # Find original file path (would need to track this)
-        # For now, just unload
+        plugin = self.plugins[plugin_name]
+        plugin_path = plugin._source_path
+        module = sys.modules.get(plugin._module_name)
+
         await self.unload_plugin(plugin_name)
 
-        logger.info(f"🔄 Reloaded plugin: {plugin_name}")
-        return True
+        # Plugins registered by hand have no module to reload
+        if plugin_path is None or module is None:
+            return False
+
+        try:
+            # Re-run the cached module's code through its existing spec and
+            # loader; unchanged source comes straight from the bytecode cache
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, module.__spec__.loader.exec_module, module)
+            reloaded = await self._start_plugin(module, plugin_path, plugin._config) is not None
+        except Exception as e:
+            await self._report_load_error(plugin_path, e)
+            return False
+
+        if reloaded:
+            logger.info(f"🔄 Reloaded plugin: {plugin_name}")
+        return reloaded
 
     def get_plugin(self, plugin_name: str) -> Optional[Plugin]:
         """Get loaded plugin by name"""
@@ -305,6 +387,11 @@ class ExampleLoggerPlugin(Plugin):
         self.event_bus = event_bus
         self.log_file = self.get_config_dir() / "install_log.txt"
 
+        # One handle for the plugin's lifetime instead of an open/close per
+        # event; handlers all run on the event loop thread. Line buffering
+        # writes each entry out immediately, since the CLI never unloads us
+        self._log = open(self.log_file, 'a', buffering=1)
+
         # Register handlers
         self.register_handler(EventType.INSTALL_STARTED, self.on_install_started)
         self.register_handler(EventType.INSTALL_COMPLETED, self.on_install_completed)
@@ -314,26 +401,24 @@ class ExampleLoggerPlugin(Plugin):
 
     async def on_unload(self):
         """Cleanup"""
+        self._log.close()
         self.log_info("Logger plugin unloaded")
 
     async def on_install_started(self, event: Event):
         """Log installation start"""
         app_name = event.data.get('app', 'Unknown')
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{event.timestamp}] STARTED: {app_name}\n")
+        self._log.write(f"[{event.timestamp}] STARTED: {app_name}\n")
 
     async def on_install_completed(self, event: Event):
         """Log installation completion"""
         app_name = event.data.get('app', 'Unknown')
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{event.timestamp}] COMPLETED: {app_name}\n")
+        self._log.write(f"[{event.timestamp}] COMPLETED: {app_name}\n")
 
     async def on_install_failed(self, event: Event):
         """Log installation failure"""
         app_name = event.data.get('app', 'Unknown')
         error = event.data.get('error', 'Unknown error')
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{event.timestamp}] FAILED: {app_name} - {error}\n")
+        self._log.write(f"[{event.timestamp}] FAILED: {app_name} - {error}\n")
 
 
 # Example usage
@@ -5,22 +5,105 @@ Tracks installations and enables quick rollback without storing entire files
 """
 
 import asyncio
-import json
+import gzip
 import logging
+import os
 import platform
-import subprocess
+import re
+import sys
+import tempfile
 import time
+import zlib
+from collections import defaultdict
 from dataclasses import dataclass, field, asdict
+from functools import lru_cache
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Any
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional, Pattern, Set, Tuple, Any
 
+from . import json_utils
 from .event_system import EventBus, Event, EventType, get_event_bus
 
-logger = logging.getLogger(__name__)
+# zlib's default trade-off; snapshot JSON shrinks several-fold at this level
+_GZIP_LEVEL = 6
 
+# ijson is optional; without it a legacy snapshots file is decoded in one go
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
 
-@dataclass
+# Uninstall command for each install method; the package id is appended
+_UNINSTALL_COMMANDS: Dict[str, List[str]] = {
+    'brew': ['brew', 'uninstall'],
+    'cask': ['brew', 'uninstall', '--cask'],
+    'apt': ['sudo', 'apt-get', 'remove', '-y'],
+    'snap': ['sudo', 'snap', 'remove'],
+    'winget': ['winget', 'uninstall'],
+}
+
+# Name and version leading a listing line (snap)
+_NAME_VERSION_RE = re.compile(rb'\s*(\S+)\s+(\S+)')
+
+# An installed package in `dpkg -l` output: "ii  name  version  arch  description"
+_DPKG_RE = re.compile(rb'ii\s+(\S+)\s+(\S+)')
+
+# Install methods whose uninstall command takes several packages at once
+_BATCH_UNINSTALL_METHODS = frozenset({'brew', 'cask', 'apt', 'snap'})
+
+# Environment variables a snapshot keeps. The rest of the environment
+# routinely holds credentials (GITHUB_TOKEN, AWS_SECRET_ACCESS_KEY, API
+# keys), which must never reach the plain-text snapshots file
+_SNAPSHOT_ENV_VARS = frozenset({
+    'PATH', 'SHELL', 'HOME', 'USER', 'LANG', 'LC_ALL', 'LC_CTYPE', 'TERM',
+    'EDITOR', 'TMPDIR', 'PYTHONPATH', 'JAVA_HOME', 'GOPATH', 'HOMEBREW_PREFIX'
+})
+
+# Layout of the app records stored in a snapshot. Snapshots written before
+# formats were recorded are format 1
+_SNAPSHOT_FORMAT = 2
+
+# Install methods whose package ids changed, mapped to the first format
+# using the new ids: format 1 keyed winget apps by the first word of their
+# display name rather than their PackageIdentifier
+_PACKAGE_ID_FORMATS = {'winget': 2}
+
+
+@lru_cache(maxsize=1)
+def _platform_info() -> Dict[str, str]:
+    """Platform details recorded in every snapshot, read once per process"""
+    uname = platform.uname()
+    return {
+        'system': uname.system,
+        'release': uname.release,
+        'version': uname.version,
+        'machine': uname.machine
+    }
+
+
+def _env_diff(base: Dict[str, str], env: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Changes turning base into env; removed variables map to None"""
+    diff: Dict[str, Optional[str]] = {
+        key: value for key, value in env.items() if base.get(key) != value
+    }
+    diff.update((key, None) for key in base if key not in env)
+    return diff
+
+
+def _apply_env_diff(base: Dict[str, str], diff: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """Rebuild an environment from its base and the changes made to it"""
+    env = dict(base)
+    for key, value in diff.items():
+        if value is None:
+            env.pop(key, None)
+        else:
+            env[key] = value
+    return env
+
+
+@dataclass(slots=True)
 class AppSnapshot:
     """Lightweight snapshot of an installed app"""
     name: str
@@ -31,36 +114,109 @@ class AppSnapshot:
     dependencies: List[str] = field(default_factory=list)
 
 
-@dataclass
 class SystemSnapshot:
     """Snapshot of system state at a point in time"""
-    id: str
-    timestamp: float
-    description: str
-    installed_apps: List[AppSnapshot] = field(default_factory=list)
-    environment_vars: Dict[str, str] = field(default_factory=dict)
-    path_entries: List[str] = field(default_factory=list)
-    platform_info: Dict[str, str] = field(default_factory=dict)
-
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary"""
-        return {
+
+    __slots__ = (
+        'id', 'timestamp', 'description', 'environment_vars', 'path_entries',
+        'platform_info', 'format_version', '_apps', '_raw_apps', '_package_ids'
+    )
+
+    def __init__(self,
+                 id: str,
+                 timestamp: float,
+                 description: str,
+                 installed_apps: Optional[List[AppSnapshot]] = None,
+                 environment_vars: Optional[Dict[str, str]] = None,
+                 path_entries: Optional[List[str]] = None,
+                 platform_info: Optional[Dict[str, str]] = None,
+                 format_version: int = _SNAPSHOT_FORMAT):
+        self.id = id
+        self.timestamp = timestamp
+        self.description = description
+        self.platform_info = platform_info or {}
+        self.format_version = format_version
+
+        # Loaded snapshots keep their app records raw until the apps are
+        # actually used; most only ever have their count or ids read
+        self._apps: Optional[List[AppSnapshot]] = installed_apps if installed_apps is not None else []
+        self._raw_apps: Optional[List[Dict[str, Any]]] = None
+        self._package_ids: Optional[FrozenSet[str]] = None
+
+        # The environment barely changes between snapshots; interning lets
+        # every snapshot share one copy of each variable and PATH entry.
+        # Only allowlisted variables are kept, whatever the caller passed
+        self.environment_vars = {
+            sys.intern(key): sys.intern(value)
+            for key, value in (environment_vars or {}).items()
+            if key in _SNAPSHOT_ENV_VARS
+        }
+        self.path_entries = [sys.intern(entry) for entry in path_entries or []]
+
+    @property
+    def installed_apps(self) -> List[AppSnapshot]:
+        """Installed apps, built from the loaded records on first access"""
+        if self._apps is None:
+            self._apps = [AppSnapshot(**app) for app in self._raw_apps]
+            self._raw_apps = None
+        return self._apps
+
+    @property
+    def app_count(self) -> int:
+        """Number of installed apps, without building them"""
+        return len(self._apps if self._apps is not None else self._raw_apps)
+
+    @property
+    def package_ids(self) -> FrozenSet[str]:
+        """Package ids of installed_apps, built once for rollback's set difference"""
+        if self._package_ids is None:
+            if self._apps is None:
+                self._package_ids = frozenset(app['package_id'] for app in self._raw_apps)
+            else:
+                self._package_ids = frozenset(app.package_id for app in self._apps)
+        return self._package_ids
+
+    def to_dict(self, parent: Optional['SystemSnapshot'] = None) -> Dict[str, Any]:
+        """
+        Convert to dictionary
+
+        Given a parent snapshot, the environment is written as the changes
+        from the parent's environment instead of in full.
+        """
+        data = {
             'id': self.id,
             'timestamp': self.timestamp,
             'description': self.description,
-            'installed_apps': [asdict(app) for app in self.installed_apps],
-            'environment_vars': self.environment_vars,
-            'path_entries': self.path_entries,
-            'platform_info': self.platform_info
+            'format_version': self.format_version,
+            'installed_apps': (
+                self._raw_apps if self._apps is None
+                else [asdict(app) for app in self._apps]
+            ),
         }
+        if parent is None:
+            data['environment_vars'] = self.environment_vars
+        else:
+            data['parent_id'] = parent.id
+            data['env_diff'] = _env_diff(parent.environment_vars, self.environment_vars)
+        data['path_entries'] = self.path_entries
+        data['platform_info'] = self.platform_info
+        return data
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'SystemSnapshot':
-        """Create from dictionary"""
-        data['installed_apps'] = [
-            AppSnapshot(**app) for app in data.get('installed_apps', [])
-        ]
-        return cls(**data)
+    def from_dict(cls, data: Dict[str, Any],
+                  parents: Optional[Dict[str, 'SystemSnapshot']] = None) -> 'SystemSnapshot':
+        """Create from dictionary, resolving a delta-encoded environment against parents"""
+        raw_apps = data.pop('installed_apps', [])
+        data.setdefault('format_version', 1)
+        parent_id = data.pop('parent_id', None)
+        env_diff = data.pop('env_diff', None)
+        if parent_id is not None:
+            data['environment_vars'] = _apply_env_diff(parents[parent_id].environment_vars, env_diff)
+
+        snapshot = cls(**data)
+        snapshot._apps = None
+        snapshot._raw_apps = raw_apps
+        return snapshot
 
 
 class RollbackManager:
@@ -69,43 +225,217 @@ class RollbackManager:
     Uses lightweight package manager references instead of file copies
     """
 
-    def __init__(self, event_bus: Optional[EventBus] = None):
+    # Seconds allowed for `brew info --installed`, which loads every
+    # installed formula and cask and is far slower than `brew list`
+    BREW_INFO_TIMEOUT = 120.0
+
+    # How many uninstalls each install method may run at once; apt and
+    # snap hold a system-wide lock, so they go one at a time
+    UNINSTALL_CONCURRENCY = {
+        'brew': 4,
+        'cask': 4,
+        'winget': 4
+    }
+
+    # How many snapshots are kept by default; older ones are dropped
+    MAX_SNAPSHOTS = 50
+
+    # Every this many lines a snapshot's environment is written in full
+    # rather than as a diff, so a corrupt line loses at most the diffs
+    # chained after it up to the next full one
+    ENV_KEYFRAME_INTERVAL = 10
+
+    def __init__(self, event_bus: Optional[EventBus] = None, max_snapshots: Optional[int] = None):
         self.event_bus = event_bus or get_event_bus()
+        self.max_snapshots = max_snapshots or self.MAX_SNAPSHOTS
         self.data_dir = Path.home() / ".koalas-forge" / "rollback"
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.snapshots_file = self.data_dir / "snapshots.json"
+        self.snapshots_file = self.data_dir / "snapshots.jsonl.gz"
+        self.legacy_snapshots_file = self.data_dir / "snapshots.json"
         self.snapshots: Dict[str, SystemSnapshot] = {}
+        self._stale_lines = 0  # Lines on disk for snapshots already dropped
+        self._delta_run = 0  # Diff-encoded lines since the last full environment
+        self._pending_emits: Set[asyncio.Task] = set()
+        self._last_emit: Optional[asyncio.Task] = None
         self._load_snapshots()
         logger.info(f"💾 Rollback data directory: {self.data_dir}")
 
     def _load_snapshots(self):
         """Load snapshots from disk"""
-        if self.snapshots_file.exists():
+        try:
+            if self.snapshots_file.exists():
+                self.snapshots, intact = self._read_snapshots()
+                self._stale_lines = self._prune_snapshots()
+                if not intact:
+                    # Drop the damage now so later appends never chain onto it
+                    self._save_snapshots()
+            elif self.legacy_snapshots_file.exists():
+                # Migrate the old single-document format to JSON Lines
+                self.snapshots = self._read_legacy_snapshots()
+                self._prune_snapshots()
+                self._save_snapshots()
+                self.legacy_snapshots_file.unlink()
+            else:
+                return
+            logger.info(f"Loaded {len(self.snapshots)} snapshot(s)")
+        except Exception as e:
+            logger.error(f"Failed to load snapshots: {e}")
+            self.snapshots = {}
+
+    def _read_snapshots(self) -> Tuple[Dict[str, SystemSnapshot], bool]:
+        """
+        Read snapshots from the compressed JSON Lines file, one per line
+
+        Each append adds its own gzip member; gzip reads them back as
+        one stream. A snapshot's environment is either stored in full or
+        relative to the snapshot written before it. A corrupt line is
+        skipped, and so is every diff chained after it: without its real
+        parent a diff can't rebuild the environment, so snapshots are lost
+        up to the next one stored in full.
+
+        Returns:
+            The snapshots read, and whether the file can be kept as it is
+        """
+        snapshots: Dict[str, SystemSnapshot] = {}
+        dropped = 0
+        orphaned = 0
+        scrubbed = 0
+        torn = False
+
+        with gzip.open(self.snapshots_file, 'rb') as f:
             try:
-                with open(self.snapshots_file, 'r') as f:
-                    data = json.load(f)
-                    self.snapshots = {
-                        snap_id: SystemSnapshot.from_dict(snap_data)
-                        for snap_id, snap_data in data.items()
-                    }
-                logger.info(f"Loaded {len(self.snapshots)} snapshot(s)")
-            except Exception as e:
-                logger.error(f"Failed to load snapshots: {e}")
-                self.snapshots = {}
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        data = json_utils.loads(line)
+                        stored_env = data.get('environment_vars') or data.get('env_diff') or {}
+                        if not stored_env.keys() <= _SNAPSHOT_ENV_VARS:
+                            scrubbed += 1
+                        parent_id = data.get('parent_id')
+                        if parent_id is not None and parent_id not in snapshots:
+                            orphaned += 1
+                            continue
+                        snapshot = SystemSnapshot.from_dict(data, snapshots)
+                    except Exception:
+                        dropped += 1
+                        continue
+                    snapshots[snapshot.id] = snapshot
+                    self._delta_run = self._delta_run + 1 if parent_id is not None else 0
+            except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+                # A torn final append; everything before it is intact, but
+                # anything appended after the broken bytes would be unreadable
+                logger.warning(f"Snapshots file ends early, rewriting it: {e}")
+                torn = True
+
+        if dropped or orphaned:
+            logger.warning(
+                f"Skipped {dropped} unreadable snapshot(s) and {orphaned} chained after "
+                f"one; rewriting snapshots file"
+            )
+        if scrubbed:
+            # Written before snapshots kept only allowlisted variables
+            logger.warning(f"Removing stored environment variables from {scrubbed} snapshot(s)")
+        return snapshots, not (dropped or orphaned or scrubbed or torn)
+
+    def _read_legacy_snapshots(self) -> Dict[str, SystemSnapshot]:
+        """Read snapshots from the old single JSON document"""
+        with open(self.legacy_snapshots_file, 'rb') as f:
+            if ijson is not None:
+                # Decode one snapshot at a time rather than the
+                # whole file before any snapshot is built
+                items = ijson.kvitems(f, '', use_float=True)
+            else:
+                items = json_utils.loads(f.read()).items()
+            return {
+                snap_id: SystemSnapshot.from_dict(snap_data)
+                for snap_id, snap_data in items
+            }
 
     def _save_snapshots(self):
         """Save snapshots to disk"""
         try:
-            with open(self.snapshots_file, 'w') as f:
-                data = {
-                    snap_id: snapshot.to_dict()
-                    for snap_id, snapshot in self.snapshots.items()
-                }
-                json.dump(data, f, indent=2)
+            lines = []
+            parent = None
+            for i, snapshot in enumerate(self.snapshots.values()):
+                if i % self.ENV_KEYFRAME_INTERVAL == 0:
+                    parent = None
+                lines.append(json_utils.dumps(snapshot.to_dict(parent)) + b'\n')
+                parent = snapshot
+            json_utils.write_atomic(self.snapshots_file, gzip.compress(b''.join(lines), _GZIP_LEVEL))
+            self._stale_lines = 0
+            self._delta_run = max(len(lines) - 1, 0) % self.ENV_KEYFRAME_INTERVAL
             logger.debug("Snapshots saved to disk")
         except Exception as e:
             logger.error(f"Failed to save snapshots: {e}")
 
+    def _append_snapshot(self, snapshot: SystemSnapshot, parent: Optional[SystemSnapshot]):
+        """Append a single snapshot to the snapshots file, after parent"""
+        if self._delta_run + 1 >= self.ENV_KEYFRAME_INTERVAL:
+            parent = None
+        try:
+            with gzip.open(self.snapshots_file, 'ab', _GZIP_LEVEL) as f:
+                f.write(json_utils.dumps(snapshot.to_dict(parent)) + b'\n')
+            self._delta_run = 0 if parent is None else self._delta_run + 1
+            logger.debug("Snapshot appended to disk")
+        except Exception as e:
+            logger.error(f"Failed to save snapshot: {e}")
+
+    def _emit(self, event: Event) -> asyncio.Task:
+        """
+        Emit an event in the background so subscribers never hold up a caller
+
+        Each emit waits for the one before it, so subscribers still see
+        events in the order they were raised.
+        """
+        previous = self._last_emit
+
+        async def emit_after_previous():
+            if previous is not None and not previous.done():
+                await asyncio.wait([previous])
+            await self.event_bus.emit(event)
+
+        task = asyncio.create_task(emit_after_previous())
+        self._last_emit = task
+        self._pending_emits.add(task)
+        task.add_done_callback(self._pending_emits.discard)
+        return task
+
+    async def drain_events(self):
+        """Wait for every background emit to finish"""
+        if self._pending_emits:
+            await asyncio.gather(*self._pending_emits, return_exceptions=True)
+
+    def _store_snapshot(self, snapshot: SystemSnapshot):
+        """
+        Add a snapshot, dropping the oldest beyond max_snapshots
+
+        The new snapshot is appended to the file, its environment a diff
+        from the last snapshot written (or in full every
+        ENV_KEYFRAME_INTERVAL lines). Dropped snapshots stay in the file
+        (loading prunes them again) until there are max_snapshots of them,
+        when the file is rewritten without them.
+        """
+        parent = next(reversed(self.snapshots.values()), None)
+        self.snapshots[snapshot.id] = snapshot
+        self._append_snapshot(snapshot, parent)
+
+        self._stale_lines += self._prune_snapshots()
+        if self._stale_lines >= self.max_snapshots:
+            self._save_snapshots()
+
+    def _prune_snapshots(self) -> int:
+        """Drop the oldest snapshots beyond max_snapshots, returning how many"""
+        excess = len(self.snapshots) - self.max_snapshots
+        if excess <= 0:
+            return 0
+
+        oldest = sorted(self.snapshots.values(), key=lambda snapshot: snapshot.timestamp)[:excess]
+        for snapshot in oldest:
+            del self.snapshots[snapshot.id]
+        logger.debug(f"Dropped {excess} old snapshot(s)")
+        return excess
+
     async def create_snapshot(self, description: str) -> str:
         """
         Create a lightweight snapshot of current system state
@@ -122,8 +452,8 @@ class RollbackManager:
 
         # Get current system state
         installed_apps = await self._get_installed_apps()
-        env_vars = dict(os.environ) if 'os' in dir() else {}
-        path_entries = env_vars.get('PATH', '').split(':')
+        env_vars = {key: value for key, value in os.environ.items() if key in _SNAPSHOT_ENV_VARS}
+        path_entries = env_vars.get('PATH', '').split(os.pathsep)
 
         # Create snapshot
         snapshot = SystemSnapshot(
@@ -133,20 +463,14 @@ class RollbackManager:
             installed_apps=installed_apps,
             environment_vars=env_vars,
             path_entries=path_entries,
-            platform_info={
-                'system': platform.system(),
-                'release': platform.release(),
-                'version': platform.version(),
-                'machine': platform.machine()
-            }
+            platform_info=_platform_info()
         )
 
         # Store snapshot
-        self.snapshots[snapshot_id] = snapshot
-        self._save_snapshots()
+        self._store_snapshot(snapshot)
 
         # Emit event
-        await self.event_bus.emit(Event(
+        self._emit(Event(
             type=EventType.SNAPSHOT_CREATED,
             data={
                 'snapshot_id': snapshot_id,
@@ -163,160 +487,189 @@ class RollbackManager:
         """
         Get list of currently installed apps
 
+        Both snapshots and rollbacks need the listing as it is right now,
+        so the package managers are always queried rather than cached:
+        installs made elsewhere (PackageInstaller, another terminal) would
+        otherwise be missed.
+
         Returns:
             List of installed apps
         """
+        system = _platform_info()['system']
+
+        if system == "Darwin":  # macOS
+            queries = [self._get_brew_apps()]
+        elif system == "Linux":
+            queries = [self._get_apt_apps(), self._get_snap_apps()]
+        elif system == "Windows":
+            queries = [self._get_winget_apps()]
+        else:
+            queries = []
+
+        # Package managers are queried concurrently. A manager that isn't
+        # installed has nothing to list, but any other failure is raised:
+        # a snapshot missing a manager's apps would have rollback remove
+        # all of them
         apps = []
-        system = platform.system()
+        errors = []
+        for result in await asyncio.gather(*queries, return_exceptions=True):
+            if isinstance(result, FileNotFoundError):
+                logger.debug(f"Package manager not installed: {result.filename}")
+            elif isinstance(result, BaseException):
+                errors.append(result)
+            else:
+                apps.extend(result)
+
+        if errors:
+            raise RuntimeError(f"Failed to get installed apps: {'; '.join(map(repr, errors))}")
+        return apps
 
-        try:
-            if system == "Darwin":  # macOS
-                apps.extend(await self._get_brew_apps())
-            elif system == "Linux":
-                apps.extend(await self._get_apt_apps())
-                apps.extend(await self._get_snap_apps())
-            elif system == "Windows":
-                apps.extend(await self._get_winget_apps())
+    async def _run_lines(self, cmd: List[str], timeout: float = 10) -> AsyncIterator[bytes]:
+        """
+        Run a package manager query, yielding its stdout one line at a time
 
-        except Exception as e:
-            logger.error(f"Failed to get installed apps: {e}")
+        Lines are parsed as they arrive instead of buffering the whole
+        output, and stay bytes so parsers decode only the fields they keep.
+        A timer kills the query if it runs past timeout seconds.
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
 
-        return apps
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        timer = loop.call_at(deadline, process.kill)
+
+        try:
+            async for line in process.stdout:
+                yield line
+            await process.wait()
+        finally:
+            timer.cancel()
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+        if loop.time() >= deadline:
+            raise asyncio.TimeoutError(f"{cmd[0]} timed out after {timeout}s")
 
     async def _get_brew_apps(self) -> List[AppSnapshot]:
         """Get Homebrew installed apps"""
         apps = []
+        now = time.time()
 
-        try:
-            # Get formulas
-            result = subprocess.run(
-                ['brew', 'list', '--formula', '--versions'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        apps.append(AppSnapshot(
-                            name=parts[0],
-                            package_id=parts[0],
-                            version=parts[1],
-                            install_method='brew',
-                            install_time=time.time()
-                        ))
-
-            # Get casks
-            result = subprocess.run(
-                ['brew', 'list', '--cask', '--versions'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+        # One structured listing covers both formulas and casks
+        data = json_utils.loads(await self._read_all(
+            ['brew', 'info', '--json=v2', '--installed'], timeout=self.BREW_INFO_TIMEOUT
+        ))
 
-            for line in result.stdout.strip().split('\n'):
-                if line:
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        apps.append(AppSnapshot(
-                            name=parts[0],
-                            package_id=parts[0],
-                            version=parts[1],
-                            install_method='cask',
-                            install_time=time.time()
-                        ))
+        for formula in data.get('formulae', []):
+            installed = formula.get('installed') or [{}]
+            apps.append(AppSnapshot(
+                name=formula['name'],
+                package_id=formula['name'],
+                version=installed[-1].get('version', 'unknown'),
+                install_method='brew',
+                install_time=now
+            ))
 
-        except Exception as e:
-            logger.error(f"Failed to get brew apps: {e}")
+        for cask in data.get('casks', []):
+            apps.append(AppSnapshot(
+                name=cask['token'],
+                package_id=cask['token'],
+                version=cask.get('installed') or cask.get('version') or 'unknown',
+                install_method='cask',
+                install_time=now
+            ))
 
         return apps
 
-    async def _get_apt_apps(self) -> List[AppSnapshot]:
-        """Get apt installed apps (Ubuntu/Debian)"""
-        apps = []
+    async def _read_all(self, cmd: List[str], timeout: float = 10, check: bool = True) -> bytes:
+        """
+        Run a query whose output is one document, returning all of its stdout
 
+        Raises if the query runs past timeout seconds or, when check is
+        set, exits non-zero.
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
         try:
-            result = subprocess.run(
-                ['dpkg', '-l'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            for line in result.stdout.split('\n'):
-                if line.startswith('ii'):
-                    parts = line.split()
-                    if len(parts) >= 3:
-                        apps.append(AppSnapshot(
-                            name=parts[1],
-                            package_id=parts[1],
-                            version=parts[2],
-                            install_method='apt',
-                            install_time=time.time()
-                        ))
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise asyncio.TimeoutError(f"{cmd[0]} timed out after {timeout}s")
 
-        except Exception as e:
-            logger.error(f"Failed to get apt apps: {e}")
+        if check and process.returncode != 0:
+            raise RuntimeError(f"{cmd[0]} exited with status {process.returncode}")
+        return stdout
 
-        return apps
+    async def _get_apt_apps(self) -> List[AppSnapshot]:
+        """Get apt installed apps (Ubuntu/Debian)"""
+        return await self._parse_listing(self._run_lines(['dpkg', '-l']), _DPKG_RE, 'apt')
 
     async def _get_snap_apps(self) -> List[AppSnapshot]:
         """Get snap installed apps"""
-        apps = []
-
-        try:
-            result = subprocess.run(
-                ['snap', 'list'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            for line in result.stdout.split('\n')[1:]:  # Skip header
-                if line.strip():
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        apps.append(AppSnapshot(
-                            name=parts[0],
-                            package_id=parts[0],
-                            version=parts[1],
-                            install_method='snap',
-                            install_time=time.time()
-                        ))
-
-        except Exception as e:
-            logger.error(f"Failed to get snap apps: {e}")
-
-        return apps
+        lines = self._run_lines(['snap', 'list'])
+        await anext(lines, None)  # Skip header
+        return await self._parse_listing(lines, _NAME_VERSION_RE, 'snap')
 
     async def _get_winget_apps(self) -> List[AppSnapshot]:
         """Get winget installed apps (Windows)"""
         apps = []
+        now = time.time()
+
+        # winget only exports its structured listing to a file. It exits
+        # non-zero when some packages have no source, but still writes the
+        # rest, so the file rather than the exit status decides success
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            export_file = Path(tmp_dir) / 'winget.json'
+            await self._read_all([
+                'winget', 'export', '-o', str(export_file),
+                '--include-versions', '--accept-source-agreements'
+            ], timeout=30, check=False)
+            data = json_utils.loads(export_file.read_bytes())
+
+        for source in data.get('Sources', []):
+            for package in source.get('Packages', []):
+                package_id = package['PackageIdentifier']
+                apps.append(AppSnapshot(
+                    name=package_id,
+                    package_id=package_id,
+                    version=package.get('Version', 'unknown'),
+                    install_method='winget',
+                    install_time=now
+                ))
 
-        try:
-            result = subprocess.run(
-                ['winget', 'list'],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+        return apps
 
-            for line in result.stdout.split('\n')[2:]:  # Skip headers
-                if line.strip():
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        apps.append(AppSnapshot(
-                            name=parts[0],
-                            package_id=parts[0],
-                            version=parts[1] if len(parts) > 1 else 'unknown',
-                            install_method='winget',
-                            install_time=time.time()
-                        ))
+    async def _parse_listing(self, lines: AsyncIterator[bytes], pattern: Pattern[bytes],
+                             install_method: str) -> List[AppSnapshot]:
+        """
+        Build app snapshots from a package manager listing
 
-        except Exception as e:
-            logger.error(f"Failed to get winget apps: {e}")
+        pattern captures the name and version from a package line; other
+        lines don't match and are never decoded.
+        """
+        apps = []
+        now = time.time()  # One timestamp for the whole listing
+
+        async for line in lines:
+            match = pattern.match(line)
+            if match is not None:
+                name = match[1].decode(errors='replace')
+                apps.append(AppSnapshot(
+                    name=name,
+                    package_id=name,
+                    version=match[2].decode(errors='replace'),
+                    install_method=install_method,
+                    install_time=now
+                ))
 
         return apps
 
@@ -336,6 +689,7 @@ class RollbackManager:
 
         logger.info(f"🔄 Rolling back to snapshot: {snapshot_id}")
 
+        # Awaited, so subscribers see the rollback before anything is removed
         await self.event_bus.emit(Event(
             type=EventType.ROLLBACK_INITIATED,
             data={'snapshot_id': snapshot_id},
@@ -346,24 +700,42 @@ class RollbackManager:
             snapshot = self.snapshots[snapshot_id]
             current_apps = await self._get_installed_apps()
 
-            # Find apps to remove (installed after snapshot)
-            snapshot_app_ids = {app.package_id for app in snapshot.installed_apps}
-            current_app_ids = {app.package_id for app in current_apps}
-
-            apps_to_remove = current_app_ids - snapshot_app_ids
-
-            logger.info(f"Will remove {len(apps_to_remove)} app(s)")
+            # An older snapshot's ids for these methods can't be compared
+            # with today's, so none of their apps would look like they were
+            # in it; leave them alone rather than remove them all
+            stale_methods = {
+                method for method, since in _PACKAGE_ID_FORMATS.items()
+                if snapshot.format_version < since
+            }
 
-            # Uninstall apps
+            # Find apps to remove (installed after snapshot) in one pass,
+            # grouped by install method for batched uninstalls
+            by_method: Dict[str, List[AppSnapshot]] = defaultdict(list)
             for app in current_apps:
-                if app.package_id in apps_to_remove:
-                    await self._uninstall_app(app)
+                if app.package_id not in snapshot.package_ids:
+                    by_method[app.install_method].append(app)
+            for method in stale_methods & by_method.keys():
+                skipped = by_method.pop(method)
+                logger.warning(
+                    f"Snapshot {snapshot_id} predates the current {method} package ids; "
+                    f"not removing {len(skipped)} {method} app(s)"
+                )
+            removed_apps = sum(len(apps) for apps in by_method.values())
+
+            logger.info(f"Will remove {removed_apps} app(s)")
+
+            # Uninstall apps, one batch per install method
+
+            await asyncio.gather(*(
+                self._uninstall_batch(method, apps)
+                for method, apps in by_method.items()
+            ))
 
-            await self.event_bus.emit(Event(
+            self._emit(Event(
                 type=EventType.ROLLBACK_COMPLETED,
                 data={
                     'snapshot_id': snapshot_id,
-                    'removed_apps': len(apps_to_remove)
+                    'removed_apps': removed_apps
                 },
                 source='rollback_manager'
             ))
@@ -374,7 +746,7 @@ class RollbackManager:
         except Exception as e:
             logger.error(f"Rollback failed: {e}")
 
-            await self.event_bus.emit(Event(
+            self._emit(Event(
                 type=EventType.ROLLBACK_FAILED,
                 data={'snapshot_id': snapshot_id, 'error': str(e)},
                 source='rollback_manager'
@@ -382,27 +754,53 @@ class RollbackManager:
 
             return False
 
+    async def _uninstall_batch(self, install_method: str, apps: List[AppSnapshot]):
+        """
+        Uninstall apps sharing an install method
+
+        Managers that accept several packages remove them all with one
+        command. If that fails, or the manager takes one package at a time,
+        the apps are uninstalled individually, overlapping up to the
+        method's UNINSTALL_CONCURRENCY.
+        """
+        if len(apps) > 1 and install_method in _BATCH_UNINSTALL_METHODS:
+            logger.info(f"Uninstalling {len(apps)} app(s) ({install_method})")
+            try:
+                await self._remove_packages(install_method, [app.package_id for app in apps])
+                logger.info(f"✓ Uninstalled {', '.join(app.name for app in apps)}")
+                return
+            except Exception as e:
+                logger.warning(f"Batch uninstall failed, retrying one at a time: {e}")
+
+        semaphore = asyncio.Semaphore(self.UNINSTALL_CONCURRENCY.get(install_method, 1))
+
+        async def uninstall(app: AppSnapshot):
+            async with semaphore:
+                await self._uninstall_app(app)
+
+        await asyncio.gather(*(uninstall(app) for app in apps))
+
     async def _uninstall_app(self, app: AppSnapshot):
         """Uninstall a single app"""
         logger.info(f"Uninstalling {app.name} ({app.install_method})")
 
-        try:
-            if app.install_method == 'brew':
-                subprocess.run(['brew', 'uninstall', app.package_id], check=True)
-            elif app.install_method == 'cask':
-                subprocess.run(['brew', 'uninstall', '--cask', app.package_id], check=True)
-            elif app.install_method == 'apt':
-                subprocess.run(['sudo', 'apt-get', 'remove', '-y', app.package_id], check=True)
-            elif app.install_method == 'snap':
-                subprocess.run(['sudo', 'snap', 'remove', app.package_id], check=True)
-            elif app.install_method == 'winget':
-                subprocess.run(['winget', 'uninstall', app.package_id], check=True)
+        if app.install_method not in _UNINSTALL_COMMANDS:
+            return
 
+        try:
+            await self._remove_packages(app.install_method, [app.package_id])
             logger.info(f"✓ Uninstalled {app.name}")
 
         except Exception as e:
             logger.error(f"Failed to uninstall {app.name}: {e}")
 
+    async def _remove_packages(self, install_method: str, package_ids: List[str]):
+        """Run one uninstall command for the given packages, raising if it fails"""
+        command = _UNINSTALL_COMMANDS[install_method]
+        process = await asyncio.create_subprocess_exec(*command, *package_ids)
+        if await process.wait() != 0:
+            raise RuntimeError(f"{command[0]} exited with status {process.returncode}")
+
     def list_snapshots(self) -> List[Dict[str, Any]]:
         """List all snapshots"""
         return [
@@ -410,7 +808,7 @@ class RollbackManager:
                 'id': snapshot.id,
                 'timestamp': snapshot.timestamp,
                 'description': snapshot.description,
-                'app_count': len(snapshot.installed_apps),
+                'app_count': snapshot.app_count,
                 'date': datetime.fromtimestamp(snapshot.timestamp).isoformat()
             }
             for snapshot in self.snapshots.values()
@@ -430,10 +828,6 @@ class RollbackManager:
         return False
 
 
-# Import os for environment variables
-import os
-
-
 # Example usage
 if __name__ == "__main__":
     async def example():
@@ -449,4 +843,6 @@ if __name__ == "__main__":
         for snap in rollback_mgr.list_snapshots():
             print(f"  - {snap['id']}: {snap['description']} ({snap['app_count']} apps)")
 
+        await rollback_mgr.drain_events()
+
     asyncio.run(example())
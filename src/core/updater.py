@@ -3,11 +3,39 @@ Auto-update checker for Koala's Forge
 Checks GitHub for new releases
 """
 
-import requests
-import json
+import re
+import threading
+import urllib.error
+import urllib.request
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+
+from . import json_utils
+
+# One opener for every check, with the fixed request headers preset
+_OPENER = urllib.request.build_opener()
+_OPENER.addheaders = [
+    ('User-Agent', 'koalas-forge-updater'),
+    ('Accept', 'application/vnd.github+json'),
+]
+
+# Dotted release numbers, then an optional pre-release suffix like -rc1
+_VERSION_RE = re.compile(r'v?(\d+(?:\.\d+)*)(.*)')
+
+
+def _version_key(version: str) -> Optional[Tuple[Tuple[int, ...], int, str]]:
+    """Sortable key for a version string, or None if it isn't one"""
+    match = _VERSION_RE.fullmatch(version.strip())
+    if not match:
+        return None
+    release = tuple(map(int, match.group(1).split('.')))
+    # Trailing zeros don't matter: 1.2 == 1.2.0
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    suffix = match.group(2)
+    # A pre-release sorts before the final release it leads up to
+    return release, 0 if suffix else 1, suffix
 
 
 class UpdateChecker:
@@ -15,30 +43,35 @@ class UpdateChecker:
     Checks for Koala's Forge updates from GitHub
     """
 
+    CACHE_TTL = timedelta(hours=24)
+    REFRESH_AFTER = timedelta(hours=1)
+
     def __init__(self, current_version: str):
         self.current_version = current_version
         self.cache_dir = Path.home() / '.koalas-forge' / 'cache'
         self.cache_file = self.cache_dir / 'update_check.json'
         self.github_api = "https://api.github.com/repos/mykolas-perevicius/koalas-forge/releases/latest"
+        self._refresh_thread: Optional[threading.Thread] = None
 
-    def _load_cache(self) -> Optional[Dict[str, Any]]:
-        """Load cached update check"""
-        if not self.cache_file.exists():
+    def _read_cache(self) -> Optional[Dict[str, Any]]:
+        """Read the cached update check, however old it is"""
+        try:
+            return json_utils.loads(self.cache_file.read_bytes())
+        except Exception:
             return None
 
+    def _is_fresh(self, cache: Dict[str, Any], max_age: Optional[timedelta] = None) -> bool:
+        """Check if a cached update check is younger than max_age (default CACHE_TTL)"""
         try:
-            with open(self.cache_file, 'r') as f:
-                cache = json.load(f)
-
-            # Check if cache is less than 24 hours old
             cached_time = datetime.fromisoformat(cache['timestamp'])
-            if datetime.now() - cached_time < timedelta(hours=24):
-                return cache
-
-        except Exception:
-            pass
+        except (KeyError, TypeError, ValueError):
+            return False
+        return datetime.now() - cached_time < (max_age or self.CACHE_TTL)
 
-        return None
+    def _load_cache(self) -> Optional[Dict[str, Any]]:
+        """Load cached update check"""
+        cache = self._read_cache()
+        return cache if cache and self._is_fresh(cache) else None
 
     def _save_cache(self, data: Dict[str, Any]) -> None:
         """Save update check to cache"""
@@ -46,12 +79,12 @@ class UpdateChecker:
             self.cache_dir.mkdir(parents=True, exist_ok=True)
 
             cache_data = {
-                'timestamp': datetime.now().isoformat(),
-                **data
+                **data,
+                'timestamp': datetime.now().isoformat()
             }
 
-            with open(self.cache_file, 'w') as f:
-                json.dump(cache_data, f)
+            # Atomic, since a background refresh may be cut off at exit
+            json_utils.write_atomic(self.cache_file, json_utils.dumps(cache_data))
 
         except Exception:
             pass  # Fail silently if we can't cache
@@ -67,17 +100,36 @@ class UpdateChecker:
         - release_notes: str
         """
         # Check cache first
-        cached = self._load_cache()
+        stale = self._read_cache()
+        cached = stale if stale and self._is_fresh(stale) else None
         if cached and silent:
             return cached
 
-        try:
-            response = requests.get(self.github_api, timeout=3)
-
-            if response.status_code != 200:
-                return None
+        # Revalidate whatever we have; an unchanged release costs a 304
+        headers = {}
+        if stale:
+            if stale.get('etag'):
+                headers['If-None-Match'] = stale['etag']
+            if stale.get('last_modified'):
+                headers['If-Modified-Since'] = stale['last_modified']
 
-            release_data = response.json()
+        try:
+            request = urllib.request.Request(self.github_api, headers=headers)
+            try:
+                with _OPENER.open(request, timeout=3) as response:
+                    release_data = json_utils.loads(response.read())
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+            except urllib.error.HTTPError as e:
+                if e.code != 304 or not stale or not stale.get('latest_version'):
+                    return None
+                result = {
+                    **stale,
+                    'update_available': self._is_newer_version(stale['latest_version']),
+                    'current_version': self.current_version,
+                }
+                self._save_cache(result)
+                return result
 
             latest_version = release_data.get('tag_name', '').lstrip('v')
             if not latest_version:
@@ -90,6 +142,8 @@ class UpdateChecker:
                 'release_url': release_data.get('html_url', ''),
                 'release_notes': release_data.get('body', '')[:500],  # First 500 chars
                 'published_at': release_data.get('published_at', ''),
+                'etag': etag,
+                'last_modified': last_modified,
             }
 
             self._save_cache(result)
@@ -101,30 +155,34 @@ class UpdateChecker:
 
     def _is_newer_version(self, latest: str) -> bool:
         """Compare version strings"""
-        try:
-            current_parts = [int(x) for x in self.current_version.split('.')]
-            latest_parts = [int(x) for x in latest.split('.')]
-
-            # Pad to same length
-            max_len = max(len(current_parts), len(latest_parts))
-            current_parts.extend([0] * (max_len - len(current_parts)))
-            latest_parts.extend([0] * (max_len - len(latest_parts)))
-
-            return latest_parts > current_parts
-
-        except Exception:
+        latest_key = _version_key(latest)
+        current_key = _version_key(self.current_version)
+        if latest_key is None or current_key is None:
             return False
+        return latest_key > current_key
 
     def notify_if_update_available(self) -> None:
-        """Print notification if update is available"""
-        update_info = self.check_for_updates(silent=True)
+        """
+        Print notification if update is available
 
-        if not update_info or not update_info.get('update_available'):
+        Only the cached check is consulted, so startup never waits on the
+        network. A cache that is missing or over REFRESH_AFTER old is
+        refreshed on a daemon thread for the next run.
+        """
+        update_info = self._read_cache()
+
+        if not update_info or not self._is_fresh(update_info, self.REFRESH_AFTER):
+            self._refresh_thread = threading.Thread(target=self.check_for_updates, daemon=True)
+            self._refresh_thread.start()
+
+        if not update_info or not update_info.get('latest_version'):
+            return
+        if not self._is_newer_version(update_info['latest_version']):
             return
 
         print(f"\n{'='*60}")
         print(f"📦 Update Available!")
-        print(f"   Current: v{update_info['current_version']}")
+        print(f"   Current: v{self.current_version}")
         print(f"   Latest:  v{update_info['latest_version']}")
         print(f"\n   Update: git pull")
         print(f"   Release: {update_info['release_url']}")
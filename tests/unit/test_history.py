@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Unit tests for installation history module
+Tests entry storage, queries, statistics and export
+"""
+
+import json
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import history as history_module
+from src.core.history import InstallHistory
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """Fresh history instance rooted in a temporary directory"""
+    monkeypatch.setattr(history_module, '_HISTORY_DIR', tmp_path / 'history')
+    return InstallHistory()
+
+
+class TestHistoryQueries:
+    """Test history queries and statistics"""
+
+    def test_stats_empty(self, history):
+        """Test statistics on an empty history"""
+        stats = history.get_stats()
+        assert stats['total'] == 0
+        assert stats['success_rate'] == 0.0
+
+    def test_stats(self, history):
+        """Test statistics over mixed actions"""
+        history.add_entry('git', 'install')
+        history.add_entry('git', 'update', success=False)
+        history.add_entry('node', 'install')
+        history.add_entry('node', 'uninstall')
+
+        stats = history.get_stats()
+        assert stats['total'] == 4
+        assert stats['installs'] == 2
+        assert stats['updates'] == 1
+        assert stats['uninstalls'] == 1
+        assert stats['success_rate'] == 75.0
+        assert stats['unique_packages'] == 2
+
+    def test_failed_and_by_action(self, history):
+        """Test filtering by success flag and by action"""
+        history.add_entry('git', 'install')
+        history.add_entry('docker', 'install', success=False)
+        history.add_entry('git', 'update')
+
+        failed = history.get_failed_entries()
+        assert [e.package for e in failed] == ['docker']
+
+        installs = history.get_entries_by_action('install')
+        assert [e.package for e in installs] == ['git', 'docker']
+
+    def test_entries_by_date(self, history):
+        """Test filtering entries by a date range"""
+        history.add_entry('git', 'install')
+        history.add_entry('node', 'install')
+        history._entries[0].timestamp = '2024-01-01T12:00:00'
+        history._entries[1].timestamp = '2024-03-01T12:00:00'
+
+        entries = history.get_entries_by_date(start_date=datetime(2024, 2, 1))
+        assert [e.package for e in entries] == ['node']
+
+        entries = history.get_entries_by_date(end_date=datetime(2024, 2, 1))
+        assert [e.package for e in entries] == ['git']
+
+    def test_reload_from_disk(self, history):
+        """Test that entries and statistics survive a reload"""
+        history.add_entry('git', 'install')
+        history.add_entry('docker', 'install', success=False)
+
+        reloaded = InstallHistory()
+        assert len(reloaded.get_all_entries()) == 2
+        assert [e.package for e in reloaded.get_failed_entries()] == ['docker']
+
+    def test_get_all_entries_newest_first(self, history):
+        """Test that entries come back newest first, honoring limit"""
+        for pkg in ['a', 'b', 'c']:
+            history.add_entry(pkg, 'install')
+
+        assert [e.package for e in history.get_all_entries()] == ['c', 'b', 'a']
+        assert [e.package for e in history.get_all_entries(limit=2)] == ['c', 'b']
+        assert history.get_all_entries(limit=0) == []
+
+    def test_page(self, history):
+        """Test cursor-based pagination"""
+        for pkg in ['a', 'b', 'c', 'd', 'e']:
+            history.add_entry(pkg, 'install')
+
+        entries, cursor = history.page(page_size=2)
+        assert [e.package for e in entries] == ['e', 'd']
+        entries, cursor = history.page(cursor, page_size=2)
+        assert [e.package for e in entries] == ['c', 'b']
+        entries, cursor = history.page(cursor, page_size=2)
+        assert [e.package for e in entries] == ['a']
+        assert cursor is None
+
+    @pytest.mark.parametrize('page_size', [0, -1])
+    def test_page_size_must_be_positive(self, history, page_size):
+        """Test that an empty or negative page is rejected instead of looping forever"""
+        history.add_entry('a', 'install')
+        with pytest.raises(ValueError):
+            history.page(page_size=page_size)
+
+    def test_migrate_legacy_file(self, history):
+        """Test that the old single-document history file is migrated"""
+        legacy = {
+            'version': '1.0',
+            'entries': [
+                {'package': 'git', 'action': 'install', 'timestamp': '2024-01-01T12:00:00'},
+                {'package': 'node', 'action': 'install', 'timestamp': '2024-01-02T12:00:00',
+                 'success': False}
+            ]
+        }
+        history.legacy_history_file.write_text(json.dumps(legacy))
+
+        migrated = InstallHistory()
+        assert [e.package for e in migrated.get_all_entries()] == ['node', 'git']
+        assert [e.package for e in migrated.get_failed_entries()] == ['node']
+        assert not migrated.legacy_history_file.exists()
+        assert len(InstallHistory().get_all_entries()) == 2
+
+    def test_clear_history(self, history):
+        """Test that clearing history resets statistics"""
+        history.add_entry('git', 'install')
+        history.clear_history()
+        assert history.get_stats()['total'] == 0
+        assert history.get_failed_entries() == []
+
+
+class TestHistoryExport:
+    """Test history export formats"""
+
+    def test_export_json(self, history, tmp_path):
+        """Test JSON export is a valid document, newest first"""
+        history.add_entry('git', 'install')
+        history.add_entry('node', 'install', details={'version': '20'})
+
+        output = tmp_path / 'export.json'
+        history.export_history(str(output), format='json')
+
+        data = json.loads(output.read_text())
+        assert data['total_entries'] == 2
+        assert [e['package'] for e in data['entries']] == ['node', 'git']
+        assert data['entries'][0]['details'] == {'version': '20'}
+
+    def test_export_json_empty(self, history, tmp_path):
+        """Test JSON export of an empty history"""
+        output = tmp_path / 'export.json'
+        history.export_history(str(output), format='json')
+
+        data = json.loads(output.read_text())
+        assert data['entries'] == []
+
+    def test_export_jsonl(self, history, tmp_path):
+        """Test JSON Lines export writes one entry per line"""
+        history.add_entry('git', 'install')
+        history.add_entry('node', 'install')
+
+        output = tmp_path / 'export.jsonl'
+        history.export_history(str(output), format='jsonl')
+
+        lines = output.read_text().splitlines()
+        assert [json.loads(line)['package'] for line in lines] == ['node', 'git']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the enhanced history module
+Tests breakage detection, anonymization and state persistence
+"""
+
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import history_privacy
+from src.core.history_privacy import EnhancedHistory, SystemState
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """Fresh enhanced history rooted in a temporary directory"""
+    monkeypatch.setattr(history_privacy, '_FORGE_DIR', tmp_path / '.koalas-forge')
+    return EnhancedHistory()
+
+
+def make_state(*working):
+    """Build a system state with the given working packages"""
+    return SystemState(
+        timestamp=datetime.now().isoformat(),
+        working_packages=frozenset(working)
+    )
+
+
+class TestBreakageDetection:
+    """Test breakage detection between system states"""
+
+    def test_no_change(self, history):
+        """Test that identical states report no breakage"""
+        before = make_state('git', 'node')
+        after = make_state('git', 'node')
+        assert history.detect_breakage(before, after, 'docker', 'install') is None
+
+    def test_newly_broken(self, history):
+        """Test that a package that stopped working is reported"""
+        before = make_state('git', 'node')
+        after = make_state('git')
+
+        breakage = history.detect_breakage(before, after, 'docker', 'install')
+        assert breakage is not None
+        assert breakage.affected_packages == ['node']
+        assert breakage.suspected_cause == 'docker'
+        assert breakage.recovery_action == 'uninstall docker'
+
+    def test_state_round_trip(self):
+        """Test that states survive serialization"""
+        state = make_state('git', 'node')
+        restored = SystemState.from_dict(state.to_dict())
+        assert restored.working_packages == state.working_packages
+
+
+class TestPersistence:
+    """Test state and breakage persistence"""
+
+    def test_record_action_persists(self, history, monkeypatch):
+        """Test that recorded states and breakages survive a reload"""
+        states = iter([make_state('git', 'node'), make_state('git'), make_state('git')])
+        monkeypatch.setattr(history, 'capture_system_state', lambda use_cache=True: next(states))
+
+        breakage = history.record_action_with_state('docker', 'install', True)
+        assert breakage is not None
+
+        reloaded = EnhancedHistory()
+        assert len(reloaded._states) == 2
+        assert len(reloaded._breakages) == 1
+        assert reloaded._breakages[0].suspected_cause == 'docker'
+
+    def test_log_compacted_when_large(self, history, monkeypatch):
+        """Test the event log is folded into the state files once it grows"""
+        monkeypatch.setattr(EnhancedHistory, 'COMPACT_MIN_EVENTS', 6)
+        monkeypatch.setattr(history, 'capture_system_state',
+                            lambda use_cache=True: make_state('git'))
+
+        history.record_action_with_state('docker', 'install', True)
+        history.record_action_with_state('docker', 'install', True)
+        assert history.events_file.exists()
+
+        history.record_action_with_state('docker', 'install', True)
+        assert not history.events_file.exists()
+        assert len(EnhancedHistory()._states) == 6
+
+        # The next compaction waits until the log outgrows the files
+        for _ in range(11):
+            history.record_action_with_state('docker', 'install', True)
+        assert history.events_file.exists()
+        history.record_action_with_state('docker', 'install', True)
+        assert not history.events_file.exists()
+
+    def test_interrupted_compaction(self, history, monkeypatch):
+        """Test a compaction that stops after saving states doesn't double them"""
+        states = iter([make_state('git', 'node'), make_state('git'), make_state('git')])
+        monkeypatch.setattr(history, 'capture_system_state', lambda use_cache=True: next(states))
+        history.record_action_with_state('docker', 'install', True)
+
+        def crash():
+            raise OSError('disk full')
+
+        monkeypatch.setattr(history, '_save_breakages', crash)
+        with pytest.raises(OSError):
+            history._compact()
+        assert history.events_file.exists()
+
+        reloaded = EnhancedHistory()
+        assert len(reloaded._states) == 2
+        assert len(reloaded._breakages) == 1
+
+        # Records written after the interrupted compaction are still replayed
+        monkeypatch.setattr(reloaded, 'capture_system_state', lambda use_cache=True: make_state('git'))
+        reloaded.record_action_with_state('docker', 'install', True)
+        assert len(EnhancedHistory()._states) == 4
+
+    def test_unreadable_event_skipped(self, history, caplog):
+        """Test a torn or malformed log line is logged and the rest still replayed"""
+        history._append_events([{'type': 'state', 'data': make_state('git').to_dict()}])
+        with open(history.events_file, 'ab') as f:
+            f.write(b'{"type": "state", "gen": %d, "data": {}}\n{"type": "sta' % history._generation)
+
+        reloaded = EnhancedHistory()
+        assert len(reloaded._states) == 1
+        assert 'line 2' in caplog.text and 'line 3' in caplog.text
+
+    def test_large_log_compacted_on_load(self, history, monkeypatch):
+        """Test a large log is compacted at startup even with auto-clear off"""
+        monkeypatch.setattr(EnhancedHistory, 'COMPACT_MIN_EVENTS', 4)
+        history.privacy.set('auto_clear_days', 0)
+        history._append_events([{'type': 'state', 'data': make_state('git').to_dict()}] * 4)
+
+        reloaded = EnhancedHistory()
+        assert not reloaded.events_file.exists()
+        assert len(reloaded._states) == 4
+
+
+class TestAnonymization:
+    """Test package name anonymization"""
+
+    def test_disabled(self, history):
+        """Test names pass through when anonymization is off"""
+        history.privacy.set('anonymize_packages', False)
+        assert history.anonymize_package_name('git') == 'git'
+
+    def test_enabled(self, history):
+        """Test names are hashed consistently when anonymization is on"""
+        history.privacy.set('anonymize_packages', True)
+        name = history.anonymize_package_name('git')
+        assert name.startswith('pkg_')
+        assert name != 'git'
+        assert history.anonymize_package_name('git') == name
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
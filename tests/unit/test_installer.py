@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Unit tests for package installer module
+Tests package database loading, lookup and search
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import installer as installer_module
+from src.core.installer import PackageInstaller, Package
+from src.core.event_system import EventBus, EventType
+
+
+@pytest.fixture
+def installer(tmp_path, monkeypatch):
+    """Installer whose package cache lives in a temporary directory"""
+    monkeypatch.setattr(installer_module, 'PACKAGES_CACHE_DIR', tmp_path / 'cache')
+    installer_module._load_packages_cached.cache_clear()
+    return PackageInstaller(event_bus=EventBus(enable_logging=False))
+
+
+class TestPackageDatabase:
+    """Test package database loading"""
+
+    def test_packages_loaded(self, installer):
+        """Test that apps.yaml packages are loaded"""
+        assert len(installer.packages_db) > 0
+
+    def test_missing_database(self, installer, tmp_path, monkeypatch):
+        """Test a missing apps.yaml yields an empty database"""
+        monkeypatch.setattr(installer_module, 'APPS_YAML', tmp_path / 'missing.yaml')
+        empty = PackageInstaller(event_bus=installer.event_bus)
+        assert empty.packages_db == {}
+        assert empty.search_packages('git') == []
+
+    def test_cache_matches_parse(self, installer, tmp_path):
+        """Test that a cached load returns the same packages as a fresh parse"""
+        assert list((tmp_path / 'cache').glob('apps_*.json'))
+
+        installer_module._load_packages_cached.cache_clear()
+        cached = PackageInstaller(event_bus=installer.event_bus)
+        assert cached.packages_db == installer.packages_db
+
+    def test_packages_immutable(self, installer):
+        """Test packages are frozen and share interned field values"""
+        first, second = [p for p in installer.packages_db.values() if p.install_type == 'brew'][:2]
+        with pytest.raises(AttributeError):
+            first.name = 'changed'
+        assert first.install_type is second.install_type
+
+    def test_cached_packages_interned(self, installer):
+        """Test packages loaded from the cache share interned field values"""
+        installer_module._load_packages_cached.cache_clear()
+        cached = PackageInstaller(event_bus=installer.event_bus)
+
+        for pkg in cached.packages_db.values():
+            assert pkg.install_type is sys.intern(pkg.install_type)
+            assert pkg.category is sys.intern(pkg.category)
+            assert pkg.priority is sys.intern(pkg.priority)
+
+    def test_shared_across_instances(self, installer):
+        """Test that a second installer reuses the loaded packages"""
+        other = PackageInstaller(event_bus=installer.event_bus)
+        assert other.packages_db == installer.packages_db
+        assert installer_module._load_packages_cached.cache_info().hits >= 1
+
+
+class TestPackageLookup:
+    """Test package lookup and search"""
+
+    def test_get_package(self, installer):
+        """Test lookup normalizes case and spaces"""
+        name = next(iter(installer.packages_db))
+        pkg = installer.get_package(name.upper().replace('-', ' '))
+        assert pkg is installer.packages_db[name]
+
+    def test_get_missing_package(self, installer):
+        """Test lookup of an unknown package"""
+        assert installer.get_package('no-such-package-xyz') is None
+
+    def test_search_packages(self, installer):
+        """Test search matches names case-insensitively"""
+        pkg = next(iter(installer.packages_db.values()))
+        results = installer.search_packages(pkg.name.upper())
+        assert pkg in results
+
+    def test_search_prefix(self, installer):
+        """Test prefix queries return exactly the packages starting with them"""
+        pkg_name, pkg = next(iter(installer.packages_db.items()))
+        prefix = pkg_name[:3]
+        results = installer.search_packages(prefix.upper())
+        assert pkg in results
+        assert all(prefix in installer._search_blobs[installer._packages.index(p)] for p in results)
+
+    def test_search_substring_fallback(self, installer):
+        """Test queries matching mid-word still find packages"""
+        pkg_name, pkg = next(
+            (k, p) for k, p in installer.packages_db.items()
+            if len(k) > 4 and not installer._trie.lookup(k[2:])
+        )
+        assert pkg in installer.search_packages(pkg_name[2:])
+
+    def test_substring_matches_linear_scan(self, installer):
+        """Test the one-pass haystack scan agrees with testing each package"""
+        for query in ['e', 'ode', 'ker', 'zzz-no-match']:
+            expected = [i for i, blob in enumerate(installer._search_blobs) if query in blob]
+            assert installer._substring_matches(query) == expected
+
+    def test_list_packages(self, installer):
+        """Test listing sorts by name and filters by category"""
+        category = installer.get_categories()[0]
+        expected = sorted(
+            (p for p in installer.packages_db.values() if p.category == category),
+            key=lambda p: p.name
+        )
+        assert list(installer.list_packages(category)) == expected
+        assert len(installer.list_packages()) == len(installer.packages_db)
+        assert installer.list_packages() is installer.list_packages()
+        assert installer.list_packages('no-such-category') == ()
+
+    def test_categories_sorted(self, installer):
+        """Test categories come back sorted and unique"""
+        categories = installer.get_categories()
+        assert list(categories) == sorted(set(categories))
+
+
+class TestInstalledCheck:
+    """Test installed-state checks"""
+
+    def test_is_installed_cached(self, installer, monkeypatch):
+        """Test repeated checks reuse the package manager's answer"""
+        calls = []
+
+        async def fake_check(pkg):
+            calls.append(pkg.name)
+            return True
+
+        monkeypatch.setattr(installer, '_check_installed', fake_check)
+        name = next(iter(installer.packages_db))
+
+        assert asyncio.run(installer.is_installed(name)) is True
+        assert asyncio.run(installer.is_installed(name.upper())) is True
+        assert len(calls) == 1
+
+    def test_check_uses_inventory(self, installer, monkeypatch):
+        """Test checks consult the manager's installed-package set"""
+        pkg = next(p for p in installer.packages_db.values() if p.install_type == 'cask')
+        requested = []
+
+        async def fake_inventory(manager):
+            requested.append(manager)
+            return {pkg.package}
+
+        installer._set_platform('Darwin')
+        monkeypatch.setattr(installer, '_installed_set', fake_inventory)
+
+        assert asyncio.run(installer._check_installed(pkg)) is True
+        assert requested == ['cask']
+
+    def test_is_installed_unknown(self, installer):
+        """Test unknown packages are never reported installed"""
+        assert asyncio.run(installer.is_installed('no-such-package-xyz')) is False
+
+
+class TestCommandBuilding:
+    """Test platform-specific command building"""
+
+    @pytest.mark.parametrize('os_name,install_type,expected', [
+        ('Darwin', 'cask', ['brew', 'install', '--cask', 'pkg']),
+        ('Darwin', 'brew', ['brew', 'install', 'pkg']),
+        ('Linux', 'apt', ['sudo', 'apt-get', 'install', '-y', 'pkg']),
+        ('Linux', 'cask', ['brew', 'install', 'pkg']),
+        ('Windows', 'winget', ['winget', 'install', 'pkg', '-e']),
+        ('Windows', 'brew', []),
+    ])
+    def test_install_command(self, installer, os_name, install_type, expected):
+        """Test install commands per platform and install type"""
+        installer._set_platform(os_name)
+        assert installer.os.value == os_name
+        pkg = Package(name='Pkg', package='pkg', platforms=(), install_type=install_type)
+        assert installer._build_install_command(pkg) == expected
+
+
+class TestCommandEnv:
+    """Test package manager command environments"""
+
+    def test_brew_auto_update_once(self, installer):
+        """Test only the first brew command refreshes taps"""
+        assert installer._command_env(['brew', 'install', 'git']) is None
+        env = installer._command_env(['brew', 'install', 'node'])
+        assert env['HOMEBREW_NO_AUTO_UPDATE'] == '1'
+
+    def test_other_managers_inherit(self, installer):
+        """Test non-brew commands inherit the environment unchanged"""
+        assert installer._command_env(['sudo', 'apt-get', 'install', '-y', 'git']) is None
+
+
+class TestRunCommand:
+    """Test running package manager commands"""
+
+    def test_failure_keeps_stderr_tail(self, installer):
+        """Test a failing command reports only the end of its stderr"""
+        script = 'import sys; sys.stdout.write("x" * 100000); sys.stderr.write("e" * 10000 + "END"); sys.exit(1)'
+        result = asyncio.run(installer._run_command([sys.executable, '-c', script], 'test'))
+
+        assert result['success'] is False
+        assert result['error'].endswith('END')
+        assert len(result['error']) == installer.STDERR_TAIL_BYTES
+
+    def test_success(self, installer):
+        """Test a succeeding command"""
+        result = asyncio.run(installer._run_command([sys.executable, '-c', 'pass'], 'test'))
+        assert result == {'success': True}
+
+
+class TestEventEmission:
+    """Test background event emission"""
+
+    def test_emit_off_critical_path(self, installer):
+        """Test installs return before slow subscribers finish, in order"""
+        seen = []
+
+        async def slow_handler(event):
+            await asyncio.sleep(0.05)
+            seen.append(event.data['app'])
+
+        installer.event_bus.on(EventType.INSTALL_FAILED, slow_handler)
+
+        async def run():
+            await installer.install('no-such-package-a')
+            await installer.install('no-such-package-b')
+            assert seen == []
+            await installer.drain_events()
+
+        asyncio.run(run())
+        assert seen == ['no-such-package-a', 'no-such-package-b']
+
+
+class TestInstallMany:
+    """Test concurrent installs"""
+
+    def test_results_in_order(self, installer, monkeypatch):
+        """Test results line up with the requested packages"""
+        async def fake_install(name, dry_run=False):
+            return {'success': True, 'package': name}
+
+        monkeypatch.setattr(installer, 'install', fake_install)
+        names = list(installer.packages_db)[:5] + ['no-such-package-xyz']
+
+        results = asyncio.run(installer.install_many(names, dry_run=True))
+        assert [r['package'] for r in results] == names
+
+    def test_serialized_manager(self, installer, monkeypatch):
+        """Test managers limited to one install never overlap"""
+        running = 0
+        peak = 0
+
+        async def fake_install(name, dry_run=False):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {'success': True}
+
+        installer._set_platform('Darwin')
+        installer.MANAGER_CONCURRENCY = {}
+        monkeypatch.setattr(installer, 'install', fake_install)
+        names = list(installer.packages_db)[:3]
+
+        asyncio.run(installer.install_many(names))
+        assert peak == 1
+
+
+
+class TestInstallBatch:
+    """Test batched installs"""
+
+    @pytest.fixture
+    def darwin(self, installer, monkeypatch):
+        """Installer on macOS that sees nothing installed"""
+        async def not_installed(pkg):
+            return False
+
+        installer._set_platform('Darwin')
+        monkeypatch.setattr(installer, '_check_installed', not_installed)
+        return installer
+
+    def pick(self, installer, install_type, count):
+        """Names of packages of one install type without install scripts"""
+        return [
+            name for name, pkg in installer.packages_db.items()
+            if pkg.install_type == install_type and not (pkg.pre_install or pkg.post_install)
+        ][:count]
+
+    def test_one_command_per_manager(self, darwin, monkeypatch):
+        """Test packages sharing a manager are installed in one call"""
+        commands = []
+
+        async def fake_run(cmd, app_name):
+            commands.append(cmd)
+            return {'success': True}
+
+        monkeypatch.setattr(darwin, '_run_command', fake_run)
+        names = self.pick(darwin, 'brew', 2) + self.pick(darwin, 'cask', 2)
+
+        results = asyncio.run(darwin.install_batch(names))
+
+        assert all(r['success'] for r in results)
+        packages = [darwin.get_package(name).package for name in names]
+        assert sorted(commands) == sorted([
+            ['brew', 'install'] + packages[:2],
+            ['brew', 'install', '--cask'] + packages[2:]
+        ])
+
+    def test_failed_batch_retries_individually(self, darwin, monkeypatch):
+        """Test a failed batch falls back to one install per package"""
+        commands = []
+
+        async def fake_run(cmd, app_name):
+            commands.append(cmd)
+            return {'success': len(cmd) == 3, 'error': 'batch failed'}
+
+        monkeypatch.setattr(darwin, '_run_command', fake_run)
+        names = self.pick(darwin, 'brew', 2)
+
+        results = asyncio.run(darwin.install_batch(names))
+
+        assert [r['success'] for r in results] == [True, True]
+        assert len(commands) == 3
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
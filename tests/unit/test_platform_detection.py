@@ -18,6 +18,7 @@ from src.core.platform_detection import (
     PlatformType,
     Architecture,
     get_platform,
+    invalidate_platform_cache,
     is_wsl,
     is_wsl2,
     is_macos,
@@ -26,6 +27,11 @@ from src.core.platform_detection import (
 )
 
 
+def make_uname(system, machine='x86_64', release='1.0'):
+    """Build a platform.uname() result for a given system"""
+    return platform.uname_result(system, 'host', release, '#1', machine)
+
+
 class TestArchitectureDetection:
     """Test architecture detection"""
 
@@ -57,15 +63,20 @@ class TestArchitectureDetection:
         arch = PlatformDetector._detect_architecture()
         assert arch == Architecture.UNKNOWN
 
+    def test_detect_from_uname(self):
+        """Test the machine from a uname result is used without asking again"""
+        with patch('platform.machine') as mock_machine:
+            assert PlatformDetector._detect_architecture('aarch64') == Architecture.AARCH64
+            mock_machine.assert_not_called()
+
 
 class TestWSLDetection:
     """Test WSL detection with multiple fallback methods"""
 
-    def test_wsl_detect_proc_version(self):
-        """Test WSL detection via /proc/version"""
-        with patch('pathlib.Path.exists') as mock_exists:
-            with patch('builtins.open', mock_open(read_data='Linux version 5.10.16.3-microsoft-standard-WSL2')):
-                mock_exists.return_value = True
+    def test_wsl_detect_osrelease(self):
+        """Test WSL detection via the kernel release"""
+        with patch('os.path.exists', return_value=False):
+            with patch('builtins.open', mock_open(read_data=b'5.10.16.3-microsoft-standard-WSL2')):
                 is_wsl_detected, wsl_version = PlatformDetector._detect_wsl()
                 assert is_wsl_detected is True
                 assert wsl_version == 2
@@ -73,18 +84,19 @@ class TestWSLDetection:
     def test_wsl_detect_env_var(self):
         """Test WSL detection via environment variable"""
         with patch.dict('os.environ', {'WSL_DISTRO_NAME': 'Ubuntu'}):
-            with patch('pathlib.Path.exists', return_value=False):
-                with patch('platform.release', return_value='5.10.16.3-microsoft-standard-WSL2'):
+            with patch('os.path.exists', return_value=False):
+                with patch('builtins.open', mock_open(read_data=b'5.10.16.3-microsoft-standard-WSL2')):
                     is_wsl_detected, wsl_version = PlatformDetector._detect_wsl()
                     # Should detect WSL based on env var
                     assert is_wsl_detected is True
+                    assert wsl_version == 2
 
     def test_wsl2_detect_run_directory(self):
         """Test WSL2 detection via /run/WSL directory"""
         def mock_exists(path):
             return str(path) == "/run/WSL"
 
-        with patch.object(Path, 'exists', side_effect=mock_exists):
+        with patch('os.path.exists', side_effect=mock_exists):
             is_wsl_detected, wsl_version = PlatformDetector._detect_wsl()
             assert is_wsl_detected is True
             assert wsl_version == 2
@@ -94,15 +106,31 @@ class TestWSLDetection:
         def mock_exists(path):
             return str(path) == "/proc/sys/fs/binfmt_misc/WSLInterop"
 
-        with patch.object(Path, 'exists', side_effect=mock_exists):
-            is_wsl_detected, wsl_version = PlatformDetector._detect_wsl()
-            assert is_wsl_detected is True
-            assert wsl_version == 2
+        with patch('os.path.exists', side_effect=mock_exists):
+            with patch('builtins.open') as mock_file:
+                is_wsl_detected, wsl_version = PlatformDetector._detect_wsl()
+                assert is_wsl_detected is True
+                assert wsl_version == 2
+                # The definitive probe answers before any file is read
+                mock_file.assert_not_called()
+
+    def test_wsl1_detect_env_var(self):
+        """Test WSL1 is told apart by its emulated kernel release"""
+        with patch.dict('os.environ', {'WSL_DISTRO_NAME': 'Ubuntu'}):
+            with patch('os.path.exists', return_value=False):
+                with patch('builtins.open', mock_open(read_data=b'4.4.0-19041-Microsoft')):
+                    assert PlatformDetector._detect_wsl() == (True, 1)
+
+    def test_no_subprocesses(self):
+        """Test WSL detection never spawns a process"""
+        with patch('subprocess.run') as mock_run:
+            PlatformDetector._detect_wsl()
+            mock_run.assert_not_called()
 
     def test_non_wsl_linux(self):
         """Test regular Linux (not WSL)"""
-        with patch('pathlib.Path.exists', return_value=False):
-            with patch('platform.release', return_value='5.15.0-generic'):
+        with patch('os.path.exists', return_value=False):
+            with patch('builtins.open', mock_open(read_data=b'5.15.0-generic')):
                 with patch.dict('os.environ', {}, clear=True):
                     is_wsl_detected, wsl_version = PlatformDetector._detect_wsl()
                     assert is_wsl_detected is False
@@ -112,14 +140,11 @@ class TestWSLDetection:
 class TestMacOSDetection:
     """Test macOS detection"""
 
-    @patch('platform.system')
+    @patch('platform.uname', return_value=make_uname('Darwin', 'x86_64'))
     @patch('platform.mac_ver')
-    @patch('platform.machine')
-    def test_detect_macos_intel(self, mock_machine, mock_mac_ver, mock_system):
+    def test_detect_macos_intel(self, mock_mac_ver, mock_uname):
         """Test macOS Intel detection"""
-        mock_system.return_value = 'Darwin'
         mock_mac_ver.return_value = ('13.0', '', '')
-        mock_machine.return_value = 'x86_64'
 
         info = PlatformDetector.detect()
 
@@ -128,14 +153,11 @@ class TestMacOSDetection:
         assert info.os_version == '13.0'
         assert info.additional_info.get('is_apple_silicon') is False
 
-    @patch('platform.system')
+    @patch('platform.uname', return_value=make_uname('Darwin', 'arm64'))
     @patch('platform.mac_ver')
-    @patch('platform.machine')
-    def test_detect_macos_apple_silicon(self, mock_machine, mock_mac_ver, mock_system):
+    def test_detect_macos_apple_silicon(self, mock_mac_ver, mock_uname):
         """Test macOS Apple Silicon detection"""
-        mock_system.return_value = 'Darwin'
         mock_mac_ver.return_value = ('14.0', '', '')
-        mock_machine.return_value = 'arm64'
 
         info = PlatformDetector.detect()
 
@@ -143,13 +165,25 @@ class TestMacOSDetection:
         assert info.architecture == Architecture.ARM64
         assert info.additional_info.get('is_apple_silicon') is True
 
+    @patch('platform.uname', return_value=make_uname('Darwin', 'arm64'))
+    @patch('platform.mac_ver', return_value=('14.0', '', ''))
+    def test_rosetta_without_subprocess(self, mock_mac_ver, mock_uname):
+        """Test Rosetta is detected from its runtime directory"""
+        with patch('os.path.isdir', return_value=True) as mock_isdir:
+            with patch('subprocess.run') as mock_run:
+                info = PlatformDetector.detect()
+
+        assert info.additional_info.get('rosetta_installed') is True
+        mock_isdir.assert_called_once_with('/Library/Apple/usr/libexec/oah')
+        mock_run.assert_not_called()
+
 
 class TestLinuxDistribution:
     """Test Linux distribution detection"""
 
     def test_detect_ubuntu_os_release(self):
         """Test Ubuntu detection via /etc/os-release"""
-        os_release_content = '''NAME="Ubuntu"
+        os_release_content = b'''NAME="Ubuntu"
 VERSION="22.04.1 LTS (Jammy Jellyfish)"
 ID=ubuntu
 VERSION_ID="22.04"
@@ -160,67 +194,142 @@ VERSION_ID="22.04"
                 assert 'Ubuntu' in name
                 assert version == '22.04'
 
+    def test_os_release_shell_quoting(self):
+        """Test os-release values are unquoted the way a shell would"""
+        os_release_content = b"""# Comment line
+NAME='Fedora Linux'
+VERSION_ID=39
+PRETTY_NAME="Fedora \\"Workstation\\" a=b"
+"""
+        with patch('builtins.open', mock_open(read_data=os_release_content)):
+            name, version = PlatformDetector._get_linux_distro_info()
+            assert name == 'Fedora Linux'
+            assert version == '39'
+
     def test_detect_distro_fallback(self):
         """Test fallback distribution detection"""
-        with patch('pathlib.Path.exists') as mock_exists:
-            # /etc/os-release doesn't exist
-            def exists_side_effect(path):
-                if '/etc/debian_version' in str(path):
-                    return True
-                return False
+        debian_version = mock_open(read_data=b'12.0\n')
 
-            mock_exists.side_effect = exists_side_effect
+        # Only /etc/debian_version exists, and lsb_release is not installed
+        def open_side_effect(path, *args, **kwargs):
+            if '/etc/debian_version' in str(path):
+                return debian_version(path, *args, **kwargs)
+            raise FileNotFoundError(path)
 
-            with patch('builtins.open', mock_open(read_data='12.0')):
+        with patch('builtins.open', side_effect=open_side_effect):
+            with patch('subprocess.run', side_effect=FileNotFoundError):
                 name, version = PlatformDetector._get_linux_distro_info()
                 assert 'Debian' in name
-                assert '12.0' in version
+                assert version == '12.0'
+
+    def test_read_file_missing(self):
+        """Test missing files read as None without a separate exists() check"""
+        with patch('pathlib.Path.exists') as mock_exists:
+            assert PlatformDetector._read_file('/no/such/file') is None
+            mock_exists.assert_not_called()
+
+
+class TestVirtualizationDetection:
+    """Test virtual machine detection"""
+
+    def test_hypervisor_flag_skips_subprocess(self):
+        """Test the cpuinfo hypervisor flag answers without systemd-detect-virt"""
+        cpuinfo = b'processor\t: 0\nflags\t\t: fpu vme hypervisor lahf_lm\n'
+        with patch('builtins.open', mock_open(read_data=cpuinfo)):
+            with patch('subprocess.run') as mock_run:
+                assert PlatformDetector._check_virtualization() is True
+                mock_run.assert_not_called()
+
+    def test_falls_back_to_systemd(self):
+        """Test systemd-detect-virt decides when the files are inconclusive"""
+        with patch('builtins.open', mock_open(read_data=b'flags\t\t: fpu vme\n')):
+            with patch('os.path.exists', return_value=False):
+                with patch('subprocess.run', return_value=MagicMock(returncode=0, stdout='none\n')):
+                    assert PlatformDetector._check_virtualization() is False
+
+
+class TestContainerDetection:
+    """Test container detection"""
+
+    def test_cgroup_docker(self):
+        """Test a docker cgroup marks a container"""
+        with patch('pathlib.Path.exists', return_value=False):
+            with patch('builtins.open', mock_open(read_data=b'0::/docker/abc123\n')):
+                assert PlatformDetector._is_container() is True
+
+    def test_plain_host(self):
+        """Test an ordinary cgroup is not a container"""
+        with patch('pathlib.Path.exists', return_value=False):
+            with patch('builtins.open', mock_open(read_data=b'0::/init.scope\n')):
+                assert PlatformDetector._is_container() is False
 
 
 class TestPackageManagerDetection:
     """Test package manager detection"""
 
-    @patch('subprocess.run')
-    def test_detect_homebrew(self, mock_run):
+    @patch('shutil.which')
+    def test_detect_homebrew(self, mock_which):
         """Test Homebrew detection"""
-        mock_run.return_value = MagicMock(returncode=0)
+        mock_which.side_effect = lambda cmd: '/opt/homebrew/bin/brew' if cmd == 'brew' else None
 
         managers = PlatformDetector._detect_package_managers()
-        mock_run.assert_called()
+        assert managers == ['brew']
 
-    @patch('subprocess.run')
-    def test_detect_multiple_managers(self, mock_run):
+    @patch('shutil.which')
+    def test_detect_multiple_managers(self, mock_which):
         """Test detection of multiple package managers"""
         # Simulate apt and snap being available
-        def run_side_effect(cmd, *args, **kwargs):
-            if 'apt' in cmd:
-                return MagicMock(returncode=0)
-            elif 'snap' in cmd:
-                return MagicMock(returncode=0)
-            else:
-                return MagicMock(returncode=1)
-
-        mock_run.side_effect = run_side_effect
+        mock_which.side_effect = lambda cmd: f'/usr/bin/{cmd}' if cmd in ('apt', 'snap') else None
 
         managers = PlatformDetector._detect_package_managers()
-        # Should detect some managers (exact list depends on mocking)
-        assert isinstance(managers, list)
+        assert managers == ['apt', 'snap']
+
+    @patch('subprocess.run')
+    def test_no_subprocesses(self, mock_run):
+        """Test detection never spawns a process"""
+        PlatformDetector._detect_package_managers()
+        mock_run.assert_not_called()
 
 
 class TestConvenienceFunctions:
     """Test convenience functions"""
 
-    @patch('platform.system')
-    def test_is_macos(self, mock_system):
+    @pytest.fixture(autouse=True)
+    def fresh_platform(self):
+        """Detect the platform anew in every test"""
+        invalidate_platform_cache()
+        yield
+        invalidate_platform_cache()
+
+    def test_get_platform_cached(self):
+        """Test detection runs once and later calls reuse its result"""
+        with patch.object(PlatformDetector, 'detect', wraps=PlatformDetector.detect) as mock_detect:
+            first = get_platform()
+            assert get_platform() is first
+            assert mock_detect.call_count == 1
+
+    def test_predicates_after_invalidate(self):
+        """Test predicates follow a re-detected platform"""
+        with patch('platform.uname', return_value=make_uname('Darwin')):
+            with patch('platform.mac_ver', return_value=('13.0', '', '')):
+                assert is_macos() is True
+
+        invalidate_platform_cache()
+        with patch('platform.uname', return_value=make_uname('Linux')):
+            with patch.object(PlatformDetector, '_detect_wsl', return_value=(True, 2)):
+                assert is_macos() is False
+                assert is_wsl() is True
+                assert is_wsl2() is True
+
+    @patch('platform.uname', return_value=make_uname('Darwin'))
+    def test_is_macos(self, mock_uname):
         """Test is_macos function"""
-        mock_system.return_value = 'Darwin'
         with patch('platform.mac_ver', return_value=('13.0', '', '')):
             assert is_macos() is True
 
-    @patch('platform.system')
-    def test_is_linux(self, mock_system):
+    @patch('platform.uname', return_value=make_uname('Linux'))
+    def test_is_linux(self, mock_uname):
         """Test is_linux function (not WSL)"""
-        mock_system.return_value = 'Linux'
         with patch.object(PlatformDetector, '_detect_wsl', return_value=(False, None)):
             assert is_linux() is True
 
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Unit tests for plugin system module
+Tests plugin discovery, loading, unloading and reloading
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core.event_system import EventBus, Event, EventType
+from src.core.plugin_system import PluginManager, ExampleLoggerPlugin
+
+
+PLUGIN_SOURCE = '''
+from src.core.plugin_system import Plugin
+
+class CounterPlugin(Plugin):
+    GENERATION = {generation}
+
+    def __init__(self):
+        super().__init__()
+        self.name = "Counter"
+
+    async def on_load(self, event_bus, config):
+        self.loaded_with = config
+
+    async def on_unload(self):
+        pass
+'''
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """Plugin manager whose plugin directory lives in a temporary home"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    return PluginManager(event_bus=EventBus(enable_logging=False))
+
+
+def write_plugin(manager, name='counter', generation=1):
+    """Write a plugin file into the manager's plugin directory"""
+    path = manager.plugin_dir / f'{name}.py'
+    path.write_text(PLUGIN_SOURCE.format(generation=generation))
+    return path
+
+
+class TestPluginDiscovery:
+    """Test plugin discovery"""
+
+    def test_discover_plugins(self, manager):
+        """Test modules and packages are found, private names skipped"""
+        write_plugin(manager, 'counter')
+        write_plugin(manager, '_private')
+        (manager.plugin_dir / 'notes.txt').write_text('not a plugin')
+        (manager.plugin_dir / 'package').mkdir()
+        (manager.plugin_dir / 'package' / '__init__.py').write_text('')
+        (manager.plugin_dir / 'empty').mkdir()
+
+        found = asyncio.run(manager.discover_plugins())
+        assert sorted(p.relative_to(manager.plugin_dir).as_posix() for p in found) == [
+            'counter.py', 'package/__init__.py'
+        ]
+
+
+class TestPluginLoading:
+    """Test plugin loading and unloading"""
+
+    def test_load_plugin(self, manager):
+        """Test a plugin file is loaded and registered"""
+        path = write_plugin(manager)
+        assert asyncio.run(manager.load_plugin(path, {'level': 1})) is True
+
+        plugin = manager.get_plugin('Counter')
+        assert plugin.loaded_with == {'level': 1}
+        assert plugin._source_path == path
+
+    def test_unload_plugin(self, manager):
+        """Test an unloaded plugin is removed from the registry"""
+        asyncio.run(manager.load_plugin(write_plugin(manager)))
+        assert asyncio.run(manager.unload_plugin('Counter')) is True
+        assert manager.get_plugin('Counter') is None
+
+    def test_reload_plugin(self, manager):
+        """Test reloading picks up new code and keeps the plugin's config"""
+        path = write_plugin(manager)
+
+        async def run():
+            await manager.load_plugin(path, {'level': 1})
+            # A different length, so the bytecode cache can't mistake it for the old source
+            write_plugin(manager, generation=22)
+            return await manager.reload_plugin('Counter')
+
+        assert asyncio.run(run()) is True
+        plugin = manager.get_plugin('Counter')
+        assert plugin.GENERATION == 22
+        assert plugin.loaded_with == {'level': 1}
+
+    def test_load_all_plugins(self, manager):
+        """Test every discovered plugin is loaded, including packages"""
+        write_plugin(manager, 'first')
+        package = manager.plugin_dir / 'second'
+        package.mkdir()
+        (package / '__init__.py').write_text(
+            PLUGIN_SOURCE.format(generation=1).replace('"Counter"', '"Packaged"')
+        )
+
+        events = []
+        manager.event_bus.on(EventType.PLUGIN_LOADED, events.append)
+        manager.event_bus.on(EventType.PLUGINS_LOADED, events.append)
+
+        asyncio.run(manager.load_all_plugins())
+        assert sorted(manager.plugins) == ['Counter', 'Packaged']
+
+        # One batch event instead of one per plugin
+        assert [e.type for e in events] == [EventType.PLUGINS_LOADED]
+        assert sorted(p['name'] for p in events[0].data['plugins']) == ['Counter', 'Packaged']
+        assert manager.get_plugin('Packaged')._module_name == 'koalas_forge_plugin_second'
+
+    def test_plugin_class_attribute(self, manager):
+        """Test PLUGIN_CLASS picks the plugin when a module defines several"""
+        path = manager.plugin_dir / 'chosen.py'
+        path.write_text(
+            PLUGIN_SOURCE.format(generation=1)
+            + '\nclass Chosen(CounterPlugin):\n'
+            + '    def __init__(self):\n'
+            + '        super().__init__()\n'
+            + '        self.name = "Chosen"\n'
+            + '\nPLUGIN_CLASS = Chosen\n'
+        )
+
+        assert asyncio.run(manager.load_plugin(path)) is True
+        assert list(manager.plugins) == ['Chosen']
+
+    def test_reload_unknown_plugin(self, manager):
+        """Test reloading a plugin that was never loaded"""
+        assert asyncio.run(manager.reload_plugin('Missing')) is False
+
+
+
+class TestExampleLogger:
+    """Test the example logger plugin"""
+
+    def test_logs_events(self, manager):
+        """Test events reach the log file as they happen, without an unload"""
+        plugin = ExampleLoggerPlugin()
+        bus = manager.event_bus
+
+        async def run():
+            await plugin.on_load(bus, {})
+            await bus.emit(Event(type=EventType.INSTALL_STARTED, data={'app': 'Docker'}, source='test'))
+            await bus.emit(Event(type=EventType.INSTALL_FAILED,
+                                 data={'app': 'Docker', 'error': 'boom'}, source='test'))
+            return plugin.log_file.read_text().splitlines()
+
+        lines = asyncio.run(run())
+        plugin._log.close()
+        assert lines[0].endswith('STARTED: Docker')
+        assert lines[1].endswith('FAILED: Docker - boom')
+
+    def test_unload_removes_handlers(self, manager):
+        """Test unloading unregisters every handler the plugin added"""
+        plugin = ExampleLoggerPlugin()
+        bus = manager.event_bus
+
+        async def run():
+            await plugin.on_load(bus, {})
+            manager.plugins[plugin.name] = plugin
+            await manager.unload_plugin(plugin.name)
+
+        asyncio.run(run())
+        for event_type in (EventType.INSTALL_STARTED, EventType.INSTALL_COMPLETED,
+                           EventType.INSTALL_FAILED):
+            assert bus._async_listeners.get(event_type) == []
+
+
+    def test_config_dir_created_once(self, manager, monkeypatch):
+        """Test the config directory is created on first use and then reused"""
+        plugin = ExampleLoggerPlugin()
+        config_dir = plugin.get_config_dir()
+        assert config_dir.is_dir()
+
+        def fail_mkdir(*args, **kwargs):
+            raise AssertionError('config dir created twice')
+
+        monkeypatch.setattr(Path, 'mkdir', fail_mkdir)
+        assert plugin.get_config_dir() is config_dir
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+Unit tests for rollback system module
+Tests installed-app discovery, snapshots and rollback
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import pytest
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import rollback_system
+from src.core.event_system import EventBus, EventType
+from src.core.rollback_system import RollbackManager, AppSnapshot, SystemSnapshot
+
+
+BREW_INFO = json.dumps({
+    'formulae': [
+        {'name': 'git', 'installed': [{'version': '2.43.0'}]},
+        {'name': 'node', 'installed': [{'version': '21.4.0'}, {'version': '21.5.0'}]},
+    ],
+    'casks': [
+        {'token': 'docker', 'installed': '4.26.1', 'version': '4.27.0'},
+    ],
+})
+BREW_INFO_CMD = ('brew', 'info', '--json=v2', '--installed')
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """Rollback manager whose data lives in a temporary home directory"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    return RollbackManager(event_bus=EventBus(enable_logging=False))
+
+
+def fake_outputs(manager, monkeypatch, outputs, delay=0.0):
+    """Answer package manager queries from a table of canned stdout"""
+    calls = []
+    running = 0
+    peak = 0
+
+    async def fake_read_all(cmd, timeout=10, check=True):
+        nonlocal running, peak
+        calls.append(cmd)
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(delay)
+        running -= 1
+        output = outputs[tuple(cmd)]
+        if isinstance(output, BaseException):
+            raise output
+        return output.encode()
+
+    async def fake_run_lines(cmd, timeout=10):
+        for line in (await fake_read_all(cmd, timeout)).splitlines(keepends=True):
+            yield line
+
+    monkeypatch.setattr(manager, '_run_lines', fake_run_lines)
+    monkeypatch.setattr(manager, '_read_all', fake_read_all)
+    return calls, lambda: peak
+
+
+class TestInstalledApps:
+    """Test installed-app discovery"""
+
+    def test_brew_apps(self, manager, monkeypatch):
+        """Test formulas and casks come from one JSON listing"""
+        monkeypatch.setattr(rollback_system, '_platform_info', lambda: {'system': 'Darwin'})
+        calls, _ = fake_outputs(manager, monkeypatch, {BREW_INFO_CMD: BREW_INFO})
+
+        apps = asyncio.run(manager._get_installed_apps())
+
+        assert [(a.name, a.version, a.install_method) for a in apps] == [
+            ('git', '2.43.0', 'brew'),
+            ('node', '21.5.0', 'brew'),
+            ('docker', '4.26.1', 'cask'),
+        ]
+        assert len(calls) == 1
+        assert len({id(a.install_time) for a in apps}) == 1
+
+    def test_linux_managers_concurrent(self, manager, monkeypatch):
+        """Test apt and snap are queried at the same time"""
+        monkeypatch.setattr(rollback_system, '_platform_info', lambda: {'system': 'Linux'})
+        calls, peak = fake_outputs(manager, monkeypatch, {
+            ('dpkg', '-l'): 'ii  curl  8.5.0  amd64  command line tool\nrc  old  1.0  amd64  removed\n',
+            ('snap', 'list'): 'Name  Version  Rev\ncode  1.85  150\n',
+        }, delay=0.01)
+
+        apps = asyncio.run(manager._get_installed_apps())
+
+        assert sorted((a.name, a.install_method) for a in apps) == [('code', 'snap'), ('curl', 'apt')]
+        assert peak() == 2
+
+    def test_winget_apps(self, manager, monkeypatch):
+        """Test winget packages are read from its JSON export"""
+        monkeypatch.setattr(rollback_system, '_platform_info', lambda: {'system': 'Windows'})
+        export = {'Sources': [{'Packages': [
+            {'PackageIdentifier': 'Git.Git', 'Version': '2.43.0'},
+            {'PackageIdentifier': 'Zoom.Zoom'},
+        ]}]}
+
+        async def fake_read_all(cmd, timeout=10, check=True):
+            assert check is False
+            Path(cmd[cmd.index('-o') + 1]).write_text(json.dumps(export))
+            return b''
+
+        monkeypatch.setattr(manager, '_read_all', fake_read_all)
+
+        apps = asyncio.run(manager._get_installed_apps())
+        assert [(a.package_id, a.version) for a in apps] == [('Git.Git', '2.43.0'), ('Zoom.Zoom', 'unknown')]
+
+    def test_failed_listing_raises(self, manager, monkeypatch):
+        """Test a failed query fails the listing instead of reporting no apps"""
+        monkeypatch.setattr(rollback_system, '_platform_info', lambda: {'system': 'Darwin'})
+        fake_outputs(manager, monkeypatch, {BREW_INFO_CMD: asyncio.TimeoutError('brew timed out')})
+
+        with pytest.raises(RuntimeError, match='brew timed out'):
+            asyncio.run(manager._get_installed_apps())
+        with pytest.raises(RuntimeError):
+            asyncio.run(manager.create_snapshot('before'))
+        assert manager.snapshots == {}
+
+    def test_missing_manager_skipped(self, manager, monkeypatch):
+        """Test a package manager that isn't installed lists nothing"""
+        monkeypatch.setattr(rollback_system, '_platform_info', lambda: {'system': 'Linux'})
+        fake_outputs(manager, monkeypatch, {
+            ('dpkg', '-l'): 'ii  curl  8.5.0  amd64  tool\n',
+            ('snap', 'list'): FileNotFoundError(2, 'No such file', 'snap'),
+        })
+
+        apps = asyncio.run(manager._get_installed_apps())
+        assert [a.name for a in apps] == ['curl']
+
+    def test_listing_never_cached(self, manager, monkeypatch):
+        """Test every listing asks the package managers, so new installs show up"""
+        monkeypatch.setattr(rollback_system, '_platform_info', lambda: {'system': 'Linux'})
+        outputs = {
+            ('dpkg', '-l'): 'ii  curl  8.5.0  amd64  tool\n',
+            ('snap', 'list'): 'Name  Version  Rev\n',
+        }
+        calls, _ = fake_outputs(manager, monkeypatch, outputs)
+
+        assert [a.name for a in asyncio.run(manager._get_installed_apps())] == ['curl']
+        outputs[('dpkg', '-l')] += 'ii  jq  1.7  amd64  tool\n'
+        assert [a.name for a in asyncio.run(manager._get_installed_apps())] == ['curl', 'jq']
+        assert len(calls) == 4
+
+
+def make_app(name, install_method='brew'):
+    """Build an app snapshot installed by the given method"""
+    return AppSnapshot(name=name, package_id=name, version='1.0',
+                       install_method=install_method, install_time=0.0)
+
+
+class TestRollback:
+    """Test rolling back to a snapshot"""
+
+    def rollback(self, manager, monkeypatch, snapshot_apps, current_apps, fail=()):
+        """Roll back to a snapshot of snapshot_apps, recording uninstall commands"""
+        commands = []
+        running = {}
+        peak = {}
+
+        async def fake_installed():
+            return current_apps
+
+        async def fake_remove(install_method, package_ids):
+            commands.append((install_method, sorted(package_ids)))
+            running[install_method] = running.get(install_method, 0) + 1
+            peak[install_method] = max(peak.get(install_method, 0), running[install_method])
+            await asyncio.sleep(0.01)
+            running[install_method] -= 1
+            if set(package_ids) & set(fail):
+                raise RuntimeError('uninstall failed')
+
+        monkeypatch.setattr(manager, '_get_installed_apps', fake_installed)
+        monkeypatch.setattr(manager, '_remove_packages', fake_remove)
+        manager.snapshots['snap'] = SystemSnapshot(id='snap', timestamp=0.0, description='test',
+                                                   installed_apps=snapshot_apps)
+
+        assert asyncio.run(manager.rollback('snap')) is True
+        return commands, peak
+
+    def test_removes_new_apps(self, manager, monkeypatch):
+        """Test only apps installed after the snapshot are removed, in one batch"""
+        commands, _ = self.rollback(manager, monkeypatch, [make_app('git')],
+                                    [make_app('git'), make_app('node'), make_app('jq')])
+        assert commands == [('brew', ['jq', 'node'])]
+
+    def test_one_command_per_method(self, manager, monkeypatch):
+        """Test each batchable install method gets a single uninstall command"""
+        current = [make_app('node'), make_app('jq'), make_app('curl', 'apt'), make_app('vim', 'apt')]
+        commands, _ = self.rollback(manager, monkeypatch, [], current)
+        assert sorted(commands) == [('apt', ['curl', 'vim']), ('brew', ['jq', 'node'])]
+
+    def test_failed_batch_retries_individually(self, manager, monkeypatch):
+        """Test a failed batch falls back to one uninstall per app"""
+        commands, _ = self.rollback(manager, monkeypatch, [], [make_app('node'), make_app('jq')],
+                                    fail=['jq'])
+        assert commands[0] == ('brew', ['jq', 'node'])
+        assert sorted(commands[1:]) == [('brew', ['jq']), ('brew', ['node'])]
+
+    def test_legacy_winget_ids_kept(self, manager, monkeypatch, caplog):
+        """Test a snapshot from before winget ids changed removes no winget apps"""
+        legacy = SystemSnapshot.from_dict({
+            'id': 'snap', 'timestamp': 0.0, 'description': 'legacy',
+            'installed_apps': [asdict(make_app('Microsoft', 'winget'))],
+            'environment_vars': {}
+        })
+        assert legacy.format_version == 1
+        current = [make_app('Microsoft.VisualStudioCode', 'winget'), make_app('node')]
+        removed = []
+
+        async def fake_installed():
+            return current
+
+        async def fake_remove(install_method, package_ids):
+            removed.append((install_method, list(package_ids)))
+
+        monkeypatch.setattr(manager, '_get_installed_apps', fake_installed)
+        monkeypatch.setattr(manager, '_remove_packages', fake_remove)
+        manager.snapshots['snap'] = legacy
+
+        assert asyncio.run(manager.rollback('snap')) is True
+        assert removed == [('brew', ['node'])]
+        assert 'predates the current winget package ids' in caplog.text
+
+    def test_single_package_manager_bounded(self, manager, monkeypatch):
+        """Test winget uninstalls run one app per call, overlapping up to the limit"""
+        current = [make_app(f'w{i}', 'winget') for i in range(6)]
+        commands, peak = self.rollback(manager, monkeypatch, [], current)
+
+        assert len(commands) == 6
+        assert peak == {'winget': manager.UNINSTALL_CONCURRENCY['winget']}
+
+
+class TestPersistence:
+    """Test snapshot persistence"""
+
+    def test_snapshot_round_trip(self, manager, monkeypatch):
+        """Test snapshots survive a reload"""
+        async def fake_installed():
+            return [make_app('git'), make_app('docker', 'cask')]
+
+        monkeypatch.setattr(manager, '_get_installed_apps', fake_installed)
+        snapshot_id = asyncio.run(manager.create_snapshot('before'))
+
+        reloaded = RollbackManager(event_bus=manager.event_bus)
+        snapshot = reloaded.get_snapshot(snapshot_id)
+        assert snapshot.description == 'before'
+        assert snapshot.format_version == rollback_system._SNAPSHOT_FORMAT
+
+        # Apps stay raw records until something needs them
+        assert reloaded.list_snapshots()[0]['app_count'] == 2
+        assert snapshot.package_ids == {'git', 'docker'}
+        assert snapshot._apps is None
+        assert snapshot.installed_apps == manager.get_snapshot(snapshot_id).installed_apps
+        assert snapshot.package_ids == {'git', 'docker'}
+        assert not hasattr(snapshot.installed_apps[0], '__dict__')
+        assert manager.get_snapshot(snapshot_id).platform_info is rollback_system._platform_info()
+
+    def test_delete_persists(self, manager, monkeypatch):
+        """Test deleting the last snapshot leaves a valid, empty file"""
+        async def fake_installed():
+            return []
+
+        monkeypatch.setattr(manager, '_get_installed_apps', fake_installed)
+        snapshot_id = asyncio.run(manager.create_snapshot('before'))
+        assert manager.delete_snapshot(snapshot_id) is True
+
+        assert RollbackManager(event_bus=manager.event_bus).snapshots == {}
+        assert list(manager.data_dir.glob('*.tmp')) == []
+
+    def test_create_appends(self, manager, monkeypatch):
+        """Test each new snapshot adds one line to the snapshots file"""
+        async def fake_installed():
+            return [make_app('git')]
+
+        monkeypatch.setattr(manager, '_get_installed_apps', fake_installed)
+        manager.snapshots['older'] = SystemSnapshot(id='older', timestamp=0.0, description='older')
+        asyncio.run(manager.create_snapshot('before'))
+
+        assert len(gzip.decompress(manager.snapshots_file.read_bytes()).splitlines()) == 1
+
+    def test_torn_append(self, manager):
+        """Test snapshots before a torn final append load and the file is repaired"""
+        for snapshot_id in ('first', 'second'):
+            manager._append_snapshot(SystemSnapshot(id=snapshot_id, timestamp=0.0, description=snapshot_id,
+                                                    installed_apps=[make_app('git')]), None)
+
+        data = manager.snapshots_file.read_bytes()
+        manager.snapshots_file.write_bytes(data[:-10])
+        repaired = RollbackManager(event_bus=manager.event_bus)
+        assert list(repaired.snapshots) == ['first']
+
+        # The broken tail is gone, so later appends read back
+        for snapshot_id in ('third', 'fourth'):
+            repaired._store_snapshot(SystemSnapshot(id=snapshot_id, timestamp=1.0, description=snapshot_id))
+        assert list(RollbackManager(event_bus=manager.event_bus).snapshots) == ['first', 'third', 'fourth']
+
+    def test_migrate_legacy_file(self, manager):
+        """Test the old single-document snapshots file is migrated"""
+        legacy = {
+            'snapshot_1': SystemSnapshot(id='snapshot_1', timestamp=1.0, description='first',
+                                         installed_apps=[make_app('git')]).to_dict()
+        }
+        manager.legacy_snapshots_file.write_text(json.dumps(legacy))
+
+        migrated = RollbackManager(event_bus=manager.event_bus)
+        assert migrated.get_snapshot('snapshot_1').installed_apps == [make_app('git')]
+        assert not migrated.legacy_snapshots_file.exists()
+        assert list(RollbackManager(event_bus=manager.event_bus).snapshots) == ['snapshot_1']
+
+    def test_environment_shared(self, manager, monkeypatch):
+        """Test snapshots share one copy of unchanged environment strings"""
+        monkeypatch.setenv('LANG', ''.join(['shared', '-value']))
+        for snapshot_id in ('first', 'second'):
+            manager.snapshots[snapshot_id] = SystemSnapshot(
+                id=snapshot_id, timestamp=0.0, description=snapshot_id,
+                environment_vars=dict(os.environ), path_entries=os.environ['PATH'].split(os.pathsep)
+            )
+        manager._save_snapshots()
+
+        first, second = RollbackManager(event_bus=manager.event_bus).snapshots.values()
+        assert first.environment_vars['LANG'] is second.environment_vars['LANG']
+        assert first.path_entries[0] is second.path_entries[0]
+
+    def test_secrets_not_stored(self, manager, monkeypatch):
+        """Test only allowlisted environment variables are written to disk"""
+        async def fake_installed():
+            return []
+
+        monkeypatch.setenv('GITHUB_TOKEN', 'ghp_secret')
+        monkeypatch.setenv('LANG', 'C.UTF-8')
+        monkeypatch.setattr(manager, '_get_installed_apps', fake_installed)
+        snapshot_id = asyncio.run(manager.create_snapshot('before'))
+
+        env = manager.get_snapshot(snapshot_id).environment_vars
+        assert env['LANG'] == 'C.UTF-8'
+        assert set(env) <= rollback_system._SNAPSHOT_ENV_VARS
+        assert b'ghp_secret' not in gzip.decompress(manager.snapshots_file.read_bytes())
+
+    def test_stored_secrets_scrubbed(self, manager):
+        """Test environment variables stored by older snapshots are removed from disk"""
+        lines = [
+            {'id': 's0', 'timestamp': 0.0, 'description': 'old', 'installed_apps': [],
+             'environment_vars': {'LANG': 'C', 'AWS_SECRET_ACCESS_KEY': 'hunter2'}},
+            {'id': 's1', 'timestamp': 1.0, 'description': 'old', 'installed_apps': [],
+             'parent_id': 's0', 'env_diff': {'GITHUB_TOKEN': 'ghp_secret'}},
+        ]
+        manager.snapshots_file.write_bytes(gzip.compress(
+            b''.join(json.dumps(line).encode() + b'\n' for line in lines)
+        ))
+
+        reloaded = RollbackManager(event_bus=manager.event_bus)
+        assert [s.environment_vars for s in reloaded.snapshots.values()] == [{'LANG': 'C'}] * 2
+        on_disk = gzip.decompress(manager.snapshots_file.read_bytes())
+        assert b'hunter2' not in on_disk and b'ghp_secret' not in on_disk
+
+    def test_environment_delta(self, manager):
+        """Test environments after the first are stored as changes and restored in full"""
+        envs = [
+            {'HOME': '/home/koala', 'LANG': 'C', 'EDITOR': 'vi'},
+            {'HOME': '/home/koala', 'LANG': 'en_US.UTF-8', 'TERM': 'xterm'},
+        ]
+        for i, env in enumerate(envs):
+            snapshot = SystemSnapshot(id=f'snapshot_{i}', timestamp=float(i), description='test',
+                                      environment_vars=env)
+            parent = next(reversed(manager.snapshots.values()), None)
+            manager.snapshots[snapshot.id] = snapshot
+            manager._append_snapshot(snapshot, parent)
+
+        lines = [json.loads(line) for line in gzip.decompress(manager.snapshots_file.read_bytes()).splitlines()]
+        assert lines[0]['environment_vars'] == envs[0]
+        assert lines[1]['parent_id'] == 'snapshot_0'
+        assert lines[1]['env_diff'] == {'LANG': 'en_US.UTF-8', 'TERM': 'xterm', 'EDITOR': None}
+
+        reloaded = RollbackManager(event_bus=manager.event_bus)
+        assert [s.environment_vars for s in reloaded.snapshots.values()] == envs
+
+        # Deleting the base snapshot rebases the one after it
+        reloaded.delete_snapshot('snapshot_0')
+        again = RollbackManager(event_bus=manager.event_bus)
+        assert again.get_snapshot('snapshot_1').environment_vars == envs[1]
+
+    def store_chain(self, manager, count):
+        """Store count snapshots whose environments each change one variable"""
+        for i in range(count):
+            manager._store_snapshot(SystemSnapshot(
+                id=f's{i}', timestamp=float(i), description='test',
+                environment_vars={'HOME': 'x', 'LANG': str(i)}, installed_apps=[make_app(f'app{i}')]
+            ))
+
+    def disk_lines(self, manager):
+        """Decoded lines of the snapshots file"""
+        return gzip.decompress(manager.snapshots_file.read_bytes()).splitlines()
+
+    @pytest.mark.parametrize('corrupt,lost', [(1, [1, 2]), (3, [3, 4, 5]), (6, [6])])
+    def test_corrupt_line_loses_chain(self, manager, monkeypatch, corrupt, lost, caplog):
+        """Test a corrupt line loses the diffs chained after it up to the next full environment"""
+        monkeypatch.setattr(RollbackManager, 'ENV_KEYFRAME_INTERVAL', 3)
+        self.store_chain(manager, 7)
+        lines = self.disk_lines(manager)
+        lines[corrupt] = b'{not json'
+        manager.snapshots_file.write_bytes(gzip.compress(b'\n'.join(lines) + b'\n'))
+
+        reloaded = RollbackManager(event_bus=manager.event_bus)
+        expected = [f's{i}' for i in range(7) if i not in lost]
+        assert list(reloaded.snapshots) == expected
+        for snapshot_id in expected:
+            assert reloaded.get_snapshot(snapshot_id).environment_vars == {
+                'HOME': 'x', 'LANG': snapshot_id[1:]
+            }
+        assert 'unreadable' in caplog.text
+
+        assert len(self.disk_lines(reloaded)) == len(expected)
+        assert list(RollbackManager(event_bus=manager.event_bus).snapshots) == expected
+
+    def test_full_environment_every_interval(self, manager, monkeypatch):
+        """Test appends and rewrites store a full environment every ENV_KEYFRAME_INTERVAL lines"""
+        monkeypatch.setattr(manager, 'ENV_KEYFRAME_INTERVAL', 3)
+        self.store_chain(manager, 7)
+
+        def full_lines():
+            return [i for i, line in enumerate(self.disk_lines(manager))
+                    if 'environment_vars' in json.loads(line)]
+
+        assert full_lines() == [0, 3, 6]
+        manager._save_snapshots()
+        assert full_lines() == [0, 3, 6]
+
+
+class TestRetention:
+    """Test the snapshot retention limit"""
+
+    def store(self, manager, count):
+        """Store count snapshots with increasing timestamps"""
+        for i in range(count):
+            manager._store_snapshot(SystemSnapshot(id=f'snapshot_{i}', timestamp=float(i),
+                                                   description='test', environment_vars={'LANG': str(i)}))
+
+    def test_oldest_dropped(self, tmp_path, monkeypatch):
+        """Test only the newest max_snapshots snapshots are kept"""
+        monkeypatch.setenv('HOME', str(tmp_path))
+        manager = RollbackManager(event_bus=EventBus(enable_logging=False), max_snapshots=3)
+        self.store(manager, 5)
+
+        assert list(manager.snapshots) == ['snapshot_2', 'snapshot_3', 'snapshot_4']
+        reloaded = RollbackManager(event_bus=manager.event_bus, max_snapshots=3)
+        assert list(reloaded.snapshots) == ['snapshot_2', 'snapshot_3', 'snapshot_4']
+        assert reloaded.get_snapshot('snapshot_4').environment_vars == {'LANG': '4'}
+
+    def test_compacts_after_limit_of_stale_lines(self, tmp_path, monkeypatch):
+        """Test dropped snapshots are appended over until a rewrite clears them"""
+        monkeypatch.setenv('HOME', str(tmp_path))
+        manager = RollbackManager(event_bus=EventBus(enable_logging=False), max_snapshots=3)
+
+        def lines_on_disk():
+            return len(gzip.decompress(manager.snapshots_file.read_bytes()).splitlines())
+
+        self.store(manager, 5)
+        assert lines_on_disk() == 5
+
+        manager._store_snapshot(SystemSnapshot(id='snapshot_5', timestamp=5.0, description='test'))
+        assert lines_on_disk() == 3
+
+
+class TestEventEmission:
+    """Test background event emission"""
+
+    def test_emit_off_critical_path(self, manager, monkeypatch):
+        """Test snapshot creation returns before slow subscribers finish"""
+        seen = []
+
+        async def fake_installed():
+            return []
+
+        async def slow_handler(event):
+            await asyncio.sleep(0.05)
+            seen.append(event.data['snapshot_id'])
+
+        monkeypatch.setattr(manager, '_get_installed_apps', fake_installed)
+        manager.event_bus.on(EventType.SNAPSHOT_CREATED, slow_handler)
+
+        async def run():
+            snapshot_id = await manager.create_snapshot('before')
+            assert seen == []
+            await manager.drain_events()
+            return snapshot_id
+
+        snapshot_id = asyncio.run(run())
+        assert seen == [snapshot_id]
+
+
+class TestRunQuery:
+    """Test running package manager queries"""
+
+    def collect(self, manager, cmd, **kwargs):
+        """Run a query and gather the lines it yields"""
+        async def run():
+            return [line async for line in manager._run_lines(cmd, **kwargs)]
+
+        return asyncio.run(run())
+
+    def test_yields_lines(self, manager):
+        """Test a query's stdout comes back one line at a time"""
+        lines = self.collect(manager, [sys.executable, '-c', 'print("git 2.43.0"); print("jq 1.7")'])
+        assert [line.strip() for line in lines] == [b'git 2.43.0', b'jq 1.7']
+
+    def test_timeout(self, manager):
+        """Test a query that runs too long is killed"""
+        with pytest.raises(asyncio.TimeoutError):
+            self.collect(manager, [sys.executable, '-c', 'import time; time.sleep(10)'], timeout=0.2)
+
+    def test_read_all(self, manager):
+        """Test a whole-document query returns its stdout and checks its status"""
+        output = asyncio.run(manager._read_all([sys.executable, '-c', 'print("{}")']))
+        assert output.strip() == b'{}'
+
+        failing = [sys.executable, '-c', 'import sys; print("{}"); sys.exit(1)']
+        with pytest.raises(RuntimeError):
+            asyncio.run(manager._read_all(failing))
+        assert asyncio.run(manager._read_all(failing, check=False)).strip() == b'{}'
+
+    def test_read_all_timeout(self, manager):
+        """Test a whole-document query that runs too long is killed"""
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(manager._read_all([sys.executable, '-c', 'import time; time.sleep(10)'], timeout=0.2))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the self-test module
+Tests category orchestration and result persistence
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import self_test as self_test_module
+from src.core.self_test import SelfTest
+
+CATEGORIES = [
+    'test_cli_commands', 'test_core_systems', 'test_package_operations',
+    'test_file_system', 'test_error_handling', 'test_performance',
+    'test_dependencies', 'test_security'
+]
+
+
+@pytest.fixture
+def self_test(tmp_path, monkeypatch):
+    """Self-test whose results directory lives in a temporary home"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    return SelfTest()
+
+
+def fake_categories(self_test, monkeypatch, delay=0.0, crash=()):
+    """Replace every category with one that yields a single passing result"""
+    running = {'now': 0, 'peak': 0, 'alongside_cli': 0}
+
+    def make(name):
+        async def category():
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+            await asyncio.sleep(delay)
+            if name == 'test_cli_commands':
+                running['alongside_cli'] = running['now'] - 1
+            running['now'] -= 1
+            if name in crash:
+                raise RuntimeError('boom')
+            return [self_test_module.TestResult(name=name, passed=True, message='ok', duration_ms=1.0)]
+        category.__name__ = name
+        return category
+
+    for name in CATEGORIES:
+        monkeypatch.setattr(self_test, name, make(name))
+    return running
+
+
+class TestSuiteTally:
+    """Test suite pass tallies"""
+
+    def test_counts(self):
+        """Test pass rate and summary follow added results"""
+        suite = self_test_module.TestSuite(name='tally')
+        assert suite.pass_rate == 0.0
+        for passed in (True, True, False, True):
+            suite.add_result(self_test_module.TestResult(
+                name='t', passed=passed, message='', duration_ms=0
+            ))
+
+        assert not suite.passed
+        assert suite.pass_rate == 75.0
+        assert suite.summary() == 'Passed: 3/4 (75.0%), Failed: 1'
+
+    def test_slotted(self):
+        """Test results and suites carry no per-instance __dict__"""
+        result = self_test_module.TestResult(name='t', passed=True, message='', duration_ms=0)
+        suite = self_test_module.TestSuite(name='slots')
+        assert not hasattr(result, '__dict__')
+        assert not hasattr(suite, '__dict__')
+
+
+class TestRunAllTests:
+    """Test running every test category"""
+
+    def test_categories_overlap(self, self_test, monkeypatch):
+        """Test subprocess categories overlap while the in-process CLI checks run alone"""
+        running = fake_categories(self_test, monkeypatch, delay=0.01)
+
+        suite = asyncio.run(self_test.run_all_tests())
+
+        assert running['peak'] == len(CATEGORIES) - 1
+        assert running['alongside_cli'] == 0
+        assert [r.name for r in suite.results] == CATEGORIES
+        assert suite.passed
+
+    def test_crashed_category(self, self_test, monkeypatch):
+        """Test a crashing category becomes one failing result"""
+        fake_categories(self_test, monkeypatch, crash={'test_performance'})
+
+        suite = asyncio.run(self_test.run_all_tests())
+
+        failed = [r for r in suite.results if not r.passed]
+        assert len(suite.results) == len(CATEGORIES)
+        assert [r.name for r in failed] == ['Category: test_performance']
+        assert 'boom' in failed[0].message
+
+
+class TestSavedResults:
+    """Test saving and loading suite results"""
+
+    def test_round_trip(self, self_test, monkeypatch):
+        """Test the latest saved suite loads back intact"""
+        fake_categories(self_test, monkeypatch)
+        suite = asyncio.run(self_test.run_all_tests())
+
+        loaded = self_test.get_last_test_results()
+        assert loaded.name == suite.name
+        assert [r.name for r in loaded.results] == CATEGORIES
+        assert loaded.summary() == suite.summary()
+        assert loaded.start_time == suite.start_time
+        assert loaded.end_time == suite.end_time
+        assert (self_test.results_dir /
+                f"test_{suite.start_time.strftime('%Y%m%d_%H%M%S')}.json").exists()
+
+    def test_parse_cached(self, self_test, monkeypatch):
+        """Test an unchanged results file is parsed only once"""
+        fake_categories(self_test, monkeypatch)
+        asyncio.run(self_test.run_all_tests())
+        self_test_module._read_results.cache_clear()
+
+        first = self_test.get_last_test_results()
+        first.results[0].details['changed'] = True
+        second = self_test.get_last_test_results()
+
+        assert self_test_module._read_results.cache_info().hits == 1
+        assert second.results[0].details == {}
+
+    def test_latest_by_name(self, self_test):
+        """Test the newest results file is chosen and other files are ignored"""
+        for stamp, name in [('20260101_000000', 'old'), ('20260301_000000', 'new'),
+                            ('20260201_000000', 'middle')]:
+            (self_test.results_dir / f'test_{stamp}.json').write_text(
+                f'{{"suite_name": "{name}", "start_time": "2026-01-01T00:00:00", '
+                f'"end_time": null, "results": []}}'
+            )
+        (self_test.results_dir / 'test_99999999_999999.json.tmp').write_text('partial')
+
+        assert self_test.get_last_test_results().name == 'new'
+
+    def test_no_results(self, self_test):
+        """Test there is nothing to load before the first run"""
+        assert self_test.get_last_test_results() is None
+
+
+class TestFileSystem:
+    """Test file system checks"""
+
+    def test_existing_and_missing(self, self_test, tmp_path, monkeypatch):
+        """Test present paths pass and missing ones fail, one listing per parent"""
+        forge = tmp_path / '.koalas-forge'
+        (forge / 'plugins').mkdir(parents=True)
+        (forge / 'cache').mkdir()
+
+        scanned = []
+        real_scandir = self_test_module.os.scandir
+
+        def counting_scandir(path):
+            scanned.append(Path(path))
+            return real_scandir(path)
+
+        monkeypatch.setattr(self_test_module.os, 'scandir', counting_scandir)
+        results = {r.name: r for r in asyncio.run(self_test.test_file_system())}
+
+        assert results['FileSystem: Plugins directory'].passed
+        assert results['FileSystem: Plugins directory'].details['readable']
+        assert not results['FileSystem: History directory'].passed
+        assert results['FileSystem: Package database file'].passed
+        assert len(scanned) == len(set(scanned)) == 3
+
+
+class TestPerformance:
+    """Test performance checks"""
+
+    @pytest.fixture(autouse=True)
+    def fast_version(self, self_test, monkeypatch):
+        """Answer the version command instantly"""
+        async def fake_run(cmd, timeout=5, cwd=None):
+            return 0, b'1.9.0', b''
+
+        monkeypatch.setattr(self_test, '_run_cmd', fake_run)
+
+    def test_memory_usage(self, self_test, monkeypatch):
+        """Test resident memory is read from the shared process handle"""
+        class FakeProcess:
+            def memory_info(self):
+                return type('MemInfo', (), {'rss': 64 << 20})()
+
+        monkeypatch.setattr(self_test_module, '_process', lambda: FakeProcess())
+        results = {r.name: r for r in asyncio.run(self_test.test_performance())}
+
+        assert results['Memory Usage'].passed
+        assert results['Memory Usage'].details['memory_mb'] == 64.0
+
+    def test_without_psutil(self, self_test, monkeypatch):
+        """Test the memory check is skipped when psutil is missing"""
+        monkeypatch.setattr(self_test_module, '_process', lambda: None)
+        results = {r.name: r for r in asyncio.run(self_test.test_performance())}
+
+        assert results['Memory Usage'].passed
+        assert 'skipped' in results['Memory Usage'].message
+
+
+class TestRunCmd:
+    """Test running commands for the self-tests"""
+
+    def test_output(self, self_test):
+        """Test exit code and raw output are returned"""
+        script = 'import sys; print("out"); sys.stderr.write("err"); sys.exit(3)'
+        result = asyncio.run(self_test._run_cmd([sys.executable, '-c', script]))
+        assert result == (3, b'out\n', b'err')
+
+    def test_dependency_version_decoded(self, self_test, monkeypatch):
+        """Test only the kept slice of a dependency's output is decoded"""
+        async def fake_run(cmd, timeout=5, cwd=None):
+            return 0, b'git version 2.43.0\n' + b'x' * 10000, b''
+
+        monkeypatch.setattr(self_test, '_run_cmd', fake_run)
+        results = asyncio.run(self_test.test_dependencies())
+
+        version = results[0].details['version']
+        assert version.startswith('git version 2.43.0')
+        assert len(version) == 100
+
+    def test_timeout_follows_deadline(self, self_test, monkeypatch):
+        """Test commands get the per-command cap until the suite budget runs low"""
+        assert self_test._timeout() == self_test_module._CMD_TIMEOUT
+
+        self_test._deadline = self_test_module.time.monotonic() + 60
+        assert self_test._timeout() == self_test_module._CMD_TIMEOUT
+
+        self_test._deadline = self_test_module.time.monotonic() + 1
+        assert 0.5 < self_test._timeout() <= 1
+
+        self_test._deadline = self_test_module.time.monotonic() - 5
+        assert self_test._timeout() == 0.5
+
+    def test_timeout(self, self_test):
+        """Test a command outliving its timeout is killed"""
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(self_test._run_cmd(
+                [sys.executable, '-c', 'import time; time.sleep(10)'], timeout=0.2
+            ))
+
+
+class TestRunKoala:
+    """Test running the koala script for the self-tests"""
+
+    def test_one_at_a_time(self, self_test, monkeypatch):
+        """Test script runs queue during a full run and time only themselves"""
+        running = {'now': 0, 'peak': 0}
+        commands = []
+
+        async def fake_run(cmd, timeout=None, cwd=None):
+            commands.append(cmd)
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+            await asyncio.sleep(0.02)
+            running['now'] -= 1
+            return 0, b'', b''
+
+        monkeypatch.setattr(self_test, '_run_cmd', fake_run)
+
+        async def run():
+            self_test._koala_lock = asyncio.Lock()
+            return await asyncio.gather(*[self_test._run_koala(['version']) for _ in range(4)])
+
+        results = asyncio.run(run())
+        assert running['peak'] == 1
+        assert commands == [['./koala', 'version']] * 4
+        assert all(duration < 60 for *_, duration in results)
+
+    def test_timeouts_reported(self, self_test, monkeypatch):
+        """Test a timed-out command says so rather than reporting a blank error"""
+        async def hung(cmd, timeout=None, cwd=None):
+            raise asyncio.TimeoutError()
+
+        monkeypatch.setattr(self_test, '_run_cmd', hung)
+        results = asyncio.run(self_test.test_error_handling())
+        results += asyncio.run(self_test.test_dependencies())
+
+        assert [r.message for r in results] == ['Command timed out'] * len(results)
+        assert not any(r.passed for r in results)
+
+
+class TestRunCli:
+    """Test running koala commands in-process"""
+
+    @pytest.fixture
+    def fake_cli(self, self_test, tmp_path):
+        """Point the self-test at a stand-in koala script"""
+        (tmp_path / 'koala').write_text(
+            'import sys\n'
+            'calls = []\n'
+            'async def main(argv=None):\n'
+            '    calls.append(argv)\n'
+            '    if argv == ["--help"]:\n'
+            '        print("usage")\n'
+            '        sys.exit(0)\n'
+            '    if argv == ["bad"]:\n'
+            '        sys.stderr.write("unknown")\n'
+            '        sys.exit(2)\n'
+            '    print(" ".join(argv))\n'
+        )
+        self_test.koala_dir = tmp_path
+        self_test_module._load_cli.cache_clear()
+        yield self_test
+        self_test_module._load_cli.cache_clear()
+
+    def test_captures_output(self, fake_cli):
+        """Test output and exit codes, including SystemExit, are captured"""
+        assert asyncio.run(fake_cli._run_cli(['version'])) == (0, 'version\n', '')
+        assert asyncio.run(fake_cli._run_cli(['--help'])) == (0, 'usage\n', '')
+        assert asyncio.run(fake_cli._run_cli(['bad'])) == (2, '', 'unknown')
+
+    def test_cli_commands_in_process(self, fake_cli):
+        """Test CLI checks import the script once and pass through arguments"""
+        results = asyncio.run(fake_cli.test_cli_commands())
+
+        assert all(r.passed for r in results)
+        cli = self_test_module._load_cli(str(fake_cli.koala_dir / 'koala'))
+        assert ['version'] in cli.calls
+        assert self_test_module._load_cli.cache_info().misses == 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the update checker module
+Tests release fetching, conditional requests and caching
+"""
+
+import json
+import urllib.error
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.core import updater as updater_module
+from src.core.updater import UpdateChecker
+
+RELEASE = {
+    'tag_name': 'v2.0.0',
+    'html_url': 'https://example.com/releases/v2.0.0',
+    'body': 'Notes',
+    'published_at': '2026-01-01T00:00:00Z',
+}
+
+
+class FakeResponse:
+    """Minimal stand-in for an opener response"""
+
+    def __init__(self, body, headers):
+        self.body = body
+        self.headers = headers
+
+    def read(self):
+        return self.body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def checker(tmp_path, monkeypatch):
+    """Update checker whose cache lives in a temporary home"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    return UpdateChecker('1.9.0')
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Record requests and answer with the configured response"""
+    state = {'requests': [], 'status': 200}
+
+    def fake_urlopen(request, timeout=None):
+        state['requests'].append(request)
+        if state['status'] == 304:
+            raise urllib.error.HTTPError(request.full_url, 304, 'Not Modified', {}, None)
+        return FakeResponse(json.dumps(RELEASE).encode(), {'ETag': '"abc"'})
+
+    monkeypatch.setattr(updater_module._OPENER, 'open', fake_urlopen)
+    return state
+
+
+class TestCheckForUpdates:
+    """Test fetching the latest release"""
+
+    def test_newer_release(self, checker, server):
+        """Test a newer release is reported and cached with its ETag"""
+        result = checker.check_for_updates()
+
+        assert result['update_available'] is True
+        assert result['latest_version'] == '2.0.0'
+        assert checker._load_cache()['etag'] == '"abc"'
+
+    def test_silent_uses_fresh_cache(self, checker, server):
+        """Test silent checks skip the network while the cache is fresh"""
+        checker.check_for_updates()
+        checker.check_for_updates(silent=True)
+        assert len(server['requests']) == 1
+
+    def test_not_modified(self, checker, server):
+        """Test a 304 reuses the cached release and refreshes its timestamp"""
+        checker.check_for_updates()
+        cache = checker._read_cache()
+        cache['timestamp'] = '2000-01-01T00:00:00'
+        checker.cache_file.write_text(json.dumps(cache))
+
+        server['status'] = 304
+        result = checker.check_for_updates(silent=True)
+
+        assert server['requests'][-1].get_header('If-none-match') == '"abc"'
+        assert result['latest_version'] == '2.0.0'
+        assert checker._load_cache() is not None
+
+    def test_network_error(self, checker, monkeypatch):
+        """Test network failures are swallowed"""
+        def failing_urlopen(request, timeout=None):
+            raise urllib.error.URLError('offline')
+
+        monkeypatch.setattr(updater_module._OPENER, 'open', failing_urlopen)
+        assert checker.check_for_updates() is None
+
+
+class TestVersionCompare:
+    """Test version ordering"""
+
+    @pytest.mark.parametrize('current,latest,newer', [
+        ('1.9.0', '2.0.0', True),
+        ('1.9.0', '1.10.0', True),
+        ('1.9.0', '1.9', False),
+        ('1.9', '1.9.1', True),
+        ('1.9.0', '1.9.0-rc1', False),
+        ('1.9.0-rc1', '1.9.0', True),
+        ('1.9.0-rc1', '1.9.0-rc2', True),
+        ('1.9.0', 'v2.0.0', True),
+        ('1.9.0', 'nightly', False),
+        ('1.9.0', '', False),
+    ])
+    def test_is_newer(self, current, latest, newer):
+        """Test numeric, padded and pre-release comparisons"""
+        assert UpdateChecker(current)._is_newer_version(latest) is newer
+
+
+class TestNotify:
+    """Test the startup update notification"""
+
+    def test_prints_from_cache(self, checker, server, capsys):
+        """Test a fresh cache is reported without touching the network"""
+        checker.check_for_updates()
+        server['requests'].clear()
+
+        checker.notify_if_update_available()
+
+        assert 'v2.0.0' in capsys.readouterr().out
+        assert checker._refresh_thread is None
+        assert server['requests'] == []
+
+    def test_refreshes_in_background(self, checker, server, capsys):
+        """Test a missing cache is fetched on a daemon thread for the next run"""
+        checker.notify_if_update_available()
+        assert capsys.readouterr().out == ''
+
+        checker._refresh_thread.join(timeout=5)
+        assert checker._refresh_thread.daemon
+        assert checker._load_cache()['latest_version'] == '2.0.0'
+
+    def test_stale_cache_after_upgrade(self, checker, server, capsys):
+        """Test a cached release no newer than the running version stays quiet"""
+        checker.check_for_updates()
+        UpdateChecker('2.0.0').notify_if_update_available()
+        assert capsys.readouterr().out == ''
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])